@@ -1,16 +1,35 @@
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, WebSocket
 from pydantic import BaseModel
-from fastapi.responses import FileResponse
+from typing import Dict, Optional
+from fastapi.responses import FileResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sse_starlette.sse import EventSourceResponse
-from simulated_mavlink import simulated_mavlink
-from mavlink_connection import mavlink_connection
-import time
+from telemetry_hub import telemetry_hub
+from telemetry_store import telemetry_store
+from telemetry_history import telemetry_history
+from field_projection import compile_projection, compile_type_projections
+from stream_decimation import create_decimator
+from telemetry_encoding import check_encoding, msgpack_map, record_schema, sse_data
+from telemetry_websocket import TelemetrySession
+from subscriber_queue import SubscriberQueue, subscriber_queues
+from telemetry_log import configure_levels, get_log, log_stats
+from telemetry_metrics import (MetricsWriter, bytes_sent, enqueue_to_send, events_sent, link_counters,
+                               receive_to_enqueue, record_sent, serialization_seconds)
+from telemetry_sources import SOURCE_KINDS, ReplaySource, create_source, activate_source, deactivate_source, get_active_source
+from vehicle_index import DEFAULT_COMPONENT_ID, vehicle_index
+from lidar_plot import LidarPlotBuffer, PLOT_TOPIC, plot_schema, sample_lidar_points
+import os
 import json
+import time
+import argparse
 import uvicorn
 import asyncio
-import random
-from threading import Thread
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+stream_log = get_log("stream")
 
 app = FastAPI()
 
@@ -33,44 +52,89 @@ allowed_types = [
     "POSITION_TARGET_GLOBAL_INT", "DISTANCE_SENSOR_D0", "DISTANCE_SENSOR_D1", "GPS"
 ]
 
-# 3D plot data accumulation
-three_d_plot_data = {
-    "lidar_0": [],
-    "lidar_1": []
-}
+# 3D plot points, sampled by a single producer task and shared by all clients
+lidar_plot_buffer = LidarPlotBuffer(capacity=100)
+lidar_plot_task = None
+
+# Telemetry source used when /connect does not name one; "simulator" starts
+# streaming immediately, other sources wait for /connect
+default_source = os.environ.get("TELEMETRY_SOURCE", "simulator")
+
+# Seconds of per-type history kept for /history, and the message rate the buffers are sized for
+history_retention = float(os.environ.get("TELEMETRY_HISTORY_RETENTION", telemetry_history.retention))
+history_max_rate = float(os.environ.get("TELEMETRY_HISTORY_MAX_RATE", telemetry_history.max_rate))
 
-# Start simulated MAVLink data generation
-simulated_mavlink.start_simulation()
+@app.on_event("startup")
+async def start_telemetry():
+    """Start the default source and the single producer feeding the 3D plot buffer"""
+    global lidar_plot_task
+    if (history_retention, history_max_rate) != (telemetry_history.retention, telemetry_history.max_rate):
+        telemetry_history.configure(history_retention, history_max_rate)
+    if default_source == "simulator":
+        await activate_source(create_source("simulator"))
+    lidar_plot_task = asyncio.create_task(
+        sample_lidar_points(telemetry_store, lidar_plot_buffer)
+    )
+
+@app.on_event("shutdown")
+async def stop_telemetry():
+    if lidar_plot_task:
+        lidar_plot_task.cancel()
+    await deactivate_source()
 
 class ConnectionRequest(BaseModel):
-    device:str
-    baud:str
+    # Serial device / connection string for mavlink, comma separated links for
+    # multilink (e.g. "/dev/ttyUSB0@57600,udpin:0.0.0.0:14550"), log file path for replay
+    device: str = ""
+    baud: str = "115200"
+    # simulator, mavlink, mavlink_async, multilink or replay; defaults to the source chosen at startup
+    source: Optional[str] = None
+    # Optional path of a flight recorder log (mavlink)
+    log_path: Optional[str] = None
+    # Replay or simulation speed multiple, 0 = as fast as possible (replay, simulator)
+    speed: float = 1.0
+    loop: bool = False
+    # Router mode: comma separated endpoints (e.g. "udpout:127.0.0.1:14550,tcp:10.0.0.5:5760")
+    # that get every received frame unchanged (mavlink, mavlink_async, multilink)
+    forward: Optional[str] = None
+    # Simulator: random seed (null = random), number of vehicles and messages per
+    # second per store key (e.g. {"AHRS2": 50, "DISTANCE_SENSOR_D0": 20})
+    seed: Optional[int] = 0
+    vehicles: int = 1
+    rates: Optional[Dict[str, float]] = None
 
 @app.post("/connect")
 async def connect(req: ConnectionRequest):
-    """Establish MAVLink connection to flight controller"""
+    """Connect the telemetry pipeline to a source (simulator, flight controller or log replay)"""
     try:
-        # Use MAVLink connection module
-        success = mavlink_connection.connect(req.device, int(req.baud))
+        # Opening a .tlog replay scans the whole file, so build sources off the event loop
+        source = await asyncio.to_thread(
+            create_source,
+            req.source or default_source,
+            device=req.device,
+            baud=int(req.baud),
+            log_path=req.log_path,
+            speed=req.speed,
+            loop=req.loop,
+            forward=req.forward,
+            seed=req.seed,
+            vehicles=req.vehicles,
+            rates=req.rates
+        )
+        # Blocking sources open their links and wait for a heartbeat off the event loop
+        await activate_source(source)
         
-        if success:
-            connection_info = mavlink_connection.get_connection_info()
-            return {
-                "status": "connected", 
-                "message": f"MAVLink connection established to {req.device}",
-                "device": req.device,
-                "baud": req.baud,
-                "protocol": "MAVLink v2.0",
-                "system_id": connection_info["system_id"],
-                "component_id": connection_info["component_id"],
-                "connection_time": connection_info["connection_time"]
-            }
-        else:
-            return {
-                "status": "error",
-                "message": "Failed to establish MAVLink connection"
-            }
+        info = source.get_info()
+        return {
+            "status": "connected", 
+            "message": f"{source.kind} source connected" + (f" to {req.device}" if req.device else ""),
+            "device": req.device,
+            "baud": req.baud,
+            "protocol": "MAVLink v2.0",
+            **info
+        }
     except Exception as e:
+        logger.error(f"Connection failed: {str(e)}")
         return {
             "status": "error",
             "message": f"Connection failed: {str(e)}"
@@ -78,9 +142,9 @@ async def connect(req: ConnectionRequest):
 
 @app.post("/disconnect")
 async def disconnect():
-    """Disconnect from flight controller"""
+    """Disconnect the active telemetry source"""
     try:
-        mavlink_connection.disconnect()
+        await deactivate_source()
         return {
             "status": "disconnected",
             "message": "MAVLink connection closed"
@@ -91,11 +155,50 @@ async def disconnect():
             "message": f"Disconnect failed: {str(e)}"
         }
 
+@app.get("/source")
+async def get_source():
+    """Get the active telemetry source"""
+    source = get_active_source()
+    return {
+        "status": "connected" if source else "disconnected",
+        "default_source": default_source,
+        "available_sources": list(SOURCE_KINDS),
+        "source": source.get_info() if source else None
+    }
+
+class ReplayControlRequest(BaseModel):
+    speed: Optional[float] = None
+    # Seconds from the start of the log
+    position: Optional[float] = None
+
+@app.post("/replay/control")
+async def control_replay(req: ReplayControlRequest):
+    """Change replay speed and/or seek while a replay source is active"""
+    source = get_active_source()
+    if not isinstance(source, ReplaySource) or not source.replay.running:
+        return {
+            "status": "error",
+            "message": "No replay running"
+        }
+    if req.speed is not None:
+        source.replay.set_speed(req.speed)
+    if req.position is not None:
+        source.replay.seek(req.position)
+    return {
+        "status": "success",
+        "replay": source.replay.get_info()
+    }
+
 @app.get("/set_ekf_origin")
 def set_ekf_origin_route():
     """Set EKF origin for navigation"""
     try:
-        # Simulate EKF origin setting
+        if not get_active_source():
+            return {
+                "status": "error",
+                "message": "Not connected to flight controller"
+            }
+        
         print("Setting EKF origin for navigation")
         return {
             "status": "success", 
@@ -128,29 +231,149 @@ async def options_stream(message_type: str):
 async def test_endpoint():
     return {"status": "ok", "message": "Backend is running"}
 
-@app.get("/stream/{message_type}")
-async def stream_message_type(message_type: str, request: Request):
-    if message_type not in allowed_types:
-        raise HTTPException(status_code=404, detail="Unsupported message type")
-    print(f"Streaming message type: {message_type}")
+def stream_encoding(encoding: str) -> str:
+    """Validate a stream's ?encoding= value"""
+    try:
+        check_encoding(encoding)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoding
+
+def client_address(request: Request) -> str:
+    return f"{request.client.host}:{request.client.port}" if request.client else ""
+
+def frame_size(frame) -> int:
+    """Bytes of a queued SSE frame (pre-encoded bytes or an event dict)"""
+    return len(frame) if isinstance(frame, bytes) else len(frame["data"])
+
+def timed_frame(entry, waited: float) -> dict:
+    """
+    Message event for ?timing=1 clients: the JSON payload plus a _timing field
+
+    _timing.sent is the server's wall clock (ms since the epoch) when the frame
+    left the queue, so the frontend can measure the final hop; the other two
+    are the server side latencies of this message in ms.
+    """
+    total = time.monotonic() - entry.received
+    timing = json.dumps({
+        "sent": round(time.time() * 1000, 3),
+        "receive_to_enqueue": round((total - waited) * 1000, 3),
+        "enqueue_to_send": round(waited * 1000, 3)
+    })
+    payload = entry.payload()
+    separator = "," if payload != "{}" else ""
+    return {"event": "message", "id": str(entry.version), "data": f'{payload[:-1]}{separator}"_timing":{timing}}}'}
+
+def stream_timing(timing: bool, encoding: str):
+    """Reject ?timing=1 for encodings the _timing field cannot be added to"""
+    if timing and encoding != "json":
+        raise HTTPException(status_code=400, detail="timing is only supported with encoding=json")
+
+def schema_event(entry, message_type: str, sent_schemas: set) -> Optional[dict]:
+    """Schema event to send before a packed record whose layout the client has not seen"""
+    schema = record_schema(entry.binary("packed"))
+    if schema.id in sent_schemas:
+        return None
+    sent_schemas.add(schema.id)
+    return {"event": "schema", "data": json.dumps(schema.describe(message_type))}
+
+@app.get("/stream/all")
+async def stream_all(request: Request, types: Optional[str] = None, window_ms: int = 50,
+                     fields: Optional[str] = None, hz: Optional[float] = None, encoding: str = "json",
+                     system_id: Optional[int] = None, component_id: Optional[int] = None):
+    """
+    Stream several message types over a single connection
+
+    Every type that changes within the coalescing window is batched into one
+    frame whose data maps message type to message. The first frame carries
+    the current value of every requested type. `fields` takes TYPE.field
+    items (e.g. AHRS2.roll,AHRS2.pitch) to trim individual types, and `hz`
+    caps the frame rate by widening the window (latest value per type).
+    With encoding=packed a frame is the concatenation of the changed types'
+    records; with encoding=msgpack it is a MessagePack map. `system_id` and
+    `component_id` pick the vehicle (the primary one by default); the frame
+    keys stay plain message types.
+    """
+    selected = [t for t in types.split(",") if t] if types else list(allowed_types)
+    unsupported = [t for t in selected if t not in allowed_types]
+    if unsupported:
+        raise HTTPException(status_code=404, detail=f"Unsupported message type: {', '.join(unsupported)}")
+    if hz is not None and hz <= 0:
+        raise HTTPException(status_code=400, detail="hz must be > 0")
+    window = min(max(window_ms, 0), 1000) / 1000
+    if hz:
+        window = max(window, 1.0 / hz)
+    projections = compile_type_projections(fields)
+    stream_encoding(encoding)
+    # Store key -> message type for the selected vehicle
+    store_keys = {vehicle_index.resolve(t, system_id, component_id): t for t in selected}
+    
+    async def pump(queue: SubscriberQueue):
+        """Queue the latest entry of each changed type; a newer entry replaces a pending one"""
+        last_versions = {}
+        changed = set(store_keys)
+        subscription = telemetry_hub.subscribe(store_keys)
+        try:
+            while True:
+                for store_key in changed:
+                    entry = telemetry_store.get_entry(store_key)
+                    if entry is not None and entry.version != last_versions.get(store_key):
+                        last_versions[store_key] = entry.version
+                        receive_to_enqueue.observe(store_key, time.monotonic() - entry.received)
+                        queue.put(entry, store_keys[store_key])
+                changed = await subscription.wait()
+        finally:
+            subscription.close()
     
     async def event_generator():
-        previous = None
-        while True:
-            if await request.is_disconnected():
-                print(f"Client disconnected from {message_type}")
-                break
+        sent_schemas = set()
+        queue = SubscriberQueue("/stream/all", client_address(request))
+        producer = asyncio.create_task(pump(queue))
+        try:
+            while True:
+                if await request.is_disconnected():
+                    stream_log.info("disconnect", "Client disconnected from multiplexed stream")
+                    break
                 
-            msg = simulated_mavlink.data_store.get(message_type)
-            if msg and msg != previous:
-                data = json.dumps(msg)
-                print(f"Sending {message_type}: {data}")
-                yield {
-                    "event": "message",
-                    "data": data
-                }
-                previous = msg
-            await asyncio.sleep(0.2)
+                pending = dict(await queue.get_all())
+                parts = []
+                latest_version = 0
+                for message_type in selected:
+                    entry = pending.get(message_type)
+                    if entry is not None:
+                        latest_version = max(latest_version, entry.version)
+                        entry = entry.project(projections.get(message_type))
+                        # Splice the cached per-type payloads instead of re-encoding
+                        if encoding == "json":
+                            parts.append(f'"{message_type}":{entry.payload()}')
+                        elif encoding == "packed":
+                            schema = schema_event(entry, message_type, sent_schemas)
+                            if schema:
+                                yield schema
+                            parts.append(entry.binary(encoding))
+                        else:
+                            parts.append((message_type, entry.binary(encoding)))
+                
+                if parts:
+                    if encoding == "json":
+                        data = "{" + ",".join(parts) + "}"
+                    elif encoding == "packed":
+                        data = sse_data(b"".join(parts))
+                    else:
+                        data = sse_data(msgpack_map(parts))
+                    record_sent("/stream/all", len(data))
+                    yield {
+                        "event": "message",
+                        "id": str(latest_version),
+                        "data": data
+                    }
+                
+                if window:
+                    # Let the rest of the burst land before building the next frame
+                    await asyncio.sleep(window)
+        finally:
+            producer.cancel()
+            queue.close()
     
     return EventSourceResponse(
         event_generator(),
@@ -163,33 +386,42 @@ async def stream_message_type(message_type: str, request: Request):
         }
     )
 
-@app.get("/stream/distance_sensor/{sensor_id}")
-async def stream_distance_sensor(sensor_id: int, request: Request):
-    def filter_by_id(msg):
-        print(f"Filtering by ID: {sensor_id}")
-        print(f"Message: {msg}")
-        return msg.get("id") == sensor_id
-    
-    # Route to correct sensor based on ID
-    message_type = f"DISTANCE_SENSOR_D{sensor_id}"
+@app.get("/stream/3d_plot")
+async def stream_3d_plot(request: Request, encoding: str = "json"):
+    """
+    Stream 3D plot points
+
+    The first event (and the first after /reset_3d_plot) is a full snapshot
+    sent as a 'message' event; later events are 'delta' events carrying only
+    the points appended since the previous one. With encoding=packed the
+    points are raw float64 rows described by an initial 'schema' event.
+    """
+    stream_log.info("connect", "Streaming 3D plot data")
+    stream_encoding(encoding)
     
     async def event_generator():
-        previous = None
-        while True:
-            if await request.is_disconnected():
-                print(f"Client disconnected from {message_type}")
-                break
+        cursor = None
+        subscription = telemetry_hub.subscribe([PLOT_TOPIC])
+        try:
+            if encoding == "packed":
+                yield {"event": "schema", "data": json.dumps(plot_schema())}
+            while True:
+                if await request.is_disconnected():
+                    stream_log.info("disconnect", "Client disconnected from 3D plot stream")
+                    break
                 
-            msg = simulated_mavlink.data_store.get(message_type)
-            if msg and msg != previous:
-                data = json.dumps(msg)
-                print(f"Sending {message_type}: {data}")
-                yield {
-                    "event": "message",
-                    "data": data
-                }
-                previous = msg
-            await asyncio.sleep(0.2)
+                snapshot, data, cursor = lidar_plot_buffer.read_since(cursor, encoding)
+                if data is not None:
+                    record_sent("/stream/3d_plot", len(data))
+                    yield {
+                        "event": "message" if snapshot else "delta",
+                        "id": str(cursor[1]),
+                        "data": data
+                    }
+                
+                await subscription.wait()
+        finally:
+            subscription.close()
     
     return EventSourceResponse(
         event_generator(),
@@ -202,91 +434,88 @@ async def stream_distance_sensor(sensor_id: int, request: Request):
         }
     )
 
-@app.options("/stream/distance_sensor/{sensor_id}")
-async def options_distance_sensor(sensor_id: int):
-    return {"status": "ok"}
+def stream_selection(fields: Optional[str], hz: Optional[float], policy: Optional[str], n: Optional[int]):
+    """
+    Compile a stream's projection and decimation parameters, rejecting bad decimation values
 
-@app.get("/stream/all")
-async def stream_all(request: Request):
-    previous = {}
-    while True:
-        if await request.is_disconnected():
-            break
-
-        for msg_type, msg in simulated_mavlink.data_store.items():
-            if msg_type not in previous or previous[msg_type] != msg:
-                yield {
-                    "event": "message",
-                    "data": json.dumps({
-                        "message_type": msg_type,
-                        "data": msg
-                    })
-                }
-                previous[msg_type] = msg
-        await asyncio.sleep(0.1)
+    Returns:
+        (projection, decimator); the decimator (None for every update) applies the same projection
+    """
+    projection = compile_projection(fields)
+    try:
+        return projection, create_decimator(hz, policy, n, projection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/stream/3d_plot")
-async def stream_3d_plot(request: Request):
-    """Stream accumulated 3D plot data"""
-    print("Streaming 3D plot data")
-    
-    async def event_generator():
-        previous_data = None
+async def pump_message_type(message_type: str, queue: SubscriberQueue, projection, decimator, encoding: str,
+                            timing: bool = False):
+    """
+    Producer behind a single-type stream of one store key (e.g. AHRS2 or AHRS2@2.1)
+
+    Frames go to the client's queue rather than straight to the socket, so a
+    stalled client leaves at most one pending frame of its type behind. With
+    `timing` the entry itself is queued and framed by timed_frame() at send.
+    """
+    last_version = 0
+    sent_schemas = set()
+    subscription = telemetry_hub.subscribe([message_type])
+    try:
         while True:
-            if await request.is_disconnected():
-                print("Client disconnected from 3D plot stream")
-                break
-                
-            # Get current position and distance sensor data
-            vision_pos = simulated_mavlink.data_store.get("VISION_POSITION_ESTIMATE", {})
-            d0_data = simulated_mavlink.data_store.get("DISTANCE_SENSOR_D0", {})
-            d1_data = simulated_mavlink.data_store.get("DISTANCE_SENSOR_D1", {})
-            
-            # Create new data points
-            if vision_pos and d0_data and d1_data:
-                x = vision_pos.get("x", 0)
-                y = vision_pos.get("y", 0)
-                d0 = d0_data.get("current_distance", 0)
-                d1 = d1_data.get("current_distance", 0)
-                
-                # Add new data points to accumulation
-                three_d_plot_data["lidar_0"].append({
-                    "x": x,
-                    "y": y,
-                    "z": d0,
-                    "timestamp": time.time()
-                })
-                
-                three_d_plot_data["lidar_1"].append({
-                    "x": x + 0.2,  # Offset for D1
-                    "y": y,
-                    "z": d1,
-                    "timestamp": time.time()
-                })
-                
-                # Keep only last 100 points to prevent memory issues
-                if len(three_d_plot_data["lidar_0"]) > 100:
-                    three_d_plot_data["lidar_0"] = three_d_plot_data["lidar_0"][-100:]
-                if len(three_d_plot_data["lidar_1"]) > 100:
-                    three_d_plot_data["lidar_1"] = three_d_plot_data["lidar_1"][-100:]
-                
-                # Prepare data for frontend
-                plot_data = {
-                    "lidar_0": three_d_plot_data["lidar_0"],
-                    "lidar_1": three_d_plot_data["lidar_1"]
-                }
-                
-                if plot_data != previous_data:
-                    data = json.dumps(plot_data)
-                    print(f"Sending 3D plot data: {len(three_d_plot_data['lidar_0'])} points")
-                    yield {
-                        "event": "message",
-                        "data": data
-                    }
-                    previous_data = plot_data
-            
-            await asyncio.sleep(0.2)
-    
+            entry = telemetry_store.get_entry(message_type)
+            if entry is not None and entry.version != last_version:
+                last_version = entry.version
+                # Decimate before anything is encoded
+                entry = decimator.select(message_type, entry) if decimator else entry.project(projection)
+                if entry is not None:
+                    stream_log.debug(message_type, "Sending %s: %s", message_type, entry.data)
+                    receive_to_enqueue.observe(message_type, time.monotonic() - entry.received)
+                    schema = schema_event(entry, message_type, sent_schemas) if encoding == "packed" else None
+                    if timing:
+                        # Framed at send time, when the timing is known
+                        queue.put(entry, message_type)
+                    elif schema:
+                        # Keep the first record of a layout queued behind its schema, which
+                        # is pinned: records are undecodable without it
+                        queue.put(schema, pinned=True)
+                        queue.put(entry.sse_frame(encoding))
+                    else:
+                        # Pre-encoded frame shared by every client of this type and projection;
+                        # replaces a frame the client has not taken yet
+                        queue.put(entry.sse_frame(encoding), message_type)
+            # Sleep until the ingest side publishes a new value
+            await subscription.wait()
+            if decimator:
+                await decimator.pace()
+    finally:
+        subscription.close()
+
+def stream_store_key(store_key: str, request: Request, fields: Optional[str], hz: Optional[float],
+                     policy: Optional[str], n: Optional[int], encoding: str, timing: bool) -> EventSourceResponse:
+    """SSE response streaming one store key, shared by the single-type stream endpoints"""
+    stream_log.info("connect", "Streaming message type: %s", store_key)
+    projection, decimator = stream_selection(fields, hz, policy, n)
+    stream_encoding(encoding)
+    stream_timing(timing, encoding)
+
+    async def event_generator():
+        queue = SubscriberQueue(f"/stream/{store_key}", client_address(request))
+        producer = asyncio.create_task(
+            pump_message_type(store_key, queue, projection, decimator, encoding, timing)
+        )
+        try:
+            while True:
+                if await request.is_disconnected():
+                    stream_log.info("disconnect", "Client disconnected from %s", store_key)
+                    break
+                frame = await queue.get()
+                if timing:
+                    frame = timed_frame(frame, queue.last_wait)
+                record_sent(queue.stream, frame_size(frame))
+                yield frame
+        finally:
+            producer.cancel()
+            queue.close()
+
     return EventSourceResponse(
         event_generator(),
         headers={
@@ -298,14 +527,187 @@ async def stream_3d_plot(request: Request):
         }
     )
 
+@app.get("/stream/{message_type}")
+async def stream_message_type(message_type: str, request: Request, fields: Optional[str] = None,
+                              hz: Optional[float] = None, policy: Optional[str] = None, n: Optional[int] = None,
+                              encoding: str = "json", system_id: Optional[int] = None,
+                              component_id: Optional[int] = None, timing: bool = False):
+    """
+    Stream a message type
+
+    Args:
+        fields: Comma separated subset of fields to send (defaults to the whole message)
+        hz: Maximum send rate for this client (defaults to every update)
+        policy: latest, aggregate (latest plus min/max/mean over the interval) or nth
+        n: Send every Nth update (nth policy)
+        encoding: json, packed (records described by 'schema' events) or msgpack;
+            binary payloads are base64 encoded in the SSE data
+        system_id: Vehicle to stream (defaults to the primary vehicle)
+        component_id: Component of that vehicle (defaults to 1, the autopilot)
+        timing: Add a _timing field (send wall clock and server latencies) to every
+            payload (json only)
+    """
+    if message_type not in allowed_types:
+        raise HTTPException(status_code=404, detail="Unsupported message type")
+    store_key = vehicle_index.resolve(message_type, system_id, component_id)
+    return stream_store_key(store_key, request, fields, hz, policy, n, encoding, timing)
+
+@app.get("/stream/distance_sensor/{sensor_id}")
+async def stream_distance_sensor(sensor_id: int, request: Request, fields: Optional[str] = None,
+                                 hz: Optional[float] = None, policy: Optional[str] = None, n: Optional[int] = None,
+                                 encoding: str = "json", system_id: Optional[int] = None,
+                                 component_id: Optional[int] = None, timing: bool = False):
+    # Route to correct sensor based on ID
+    store_key = vehicle_index.resolve(f"DISTANCE_SENSOR_D{sensor_id}", system_id, component_id)
+    return stream_store_key(store_key, request, fields, hz, policy, n, encoding, timing)
+
+@app.websocket("/ws")
+async def telemetry_websocket(websocket: WebSocket, types: Optional[str] = None, encoding: str = "json"):
+    """
+    Stream any set of message types over one WebSocket
+
+    Clients subscribe, unsubscribe, change rates and request snapshots with
+    JSON control messages (see telemetry_websocket). `types` subscribes on
+    connect; encoding is json or msgpack.
+    """
+    try:
+        session = TelemetrySession(websocket, allowed_types, encoding)
+    except ValueError as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
+    await session.run([t for t in types.split(",") if t] if types else None)
+
+@app.get("/subscribers")
+async def get_subscribers():
+    """Send queue depth and drop counters of every connected stream client"""
+    queues = [queue.stats() for queue in subscriber_queues()]
+    return {
+        "status": "success",
+        "subscriber_count": len(queues),
+        "dropped": sum(queue["dropped"] for queue in queues),
+        "replaced": sum(queue["replaced"] for queue in queues),
+        "subscribers": queues
+    }
+
+class LoggingRequest(BaseModel):
+    # Category levels, e.g. "stream=DEBUG,ingest=INFO"
+    levels: Optional[str] = None
+    # Minimum seconds between two sampled records of the same event
+    sample_interval: Optional[float] = None
+
+@app.get("/logging")
+async def get_logging():
+    """Telemetry log levels and aggregated counters per category"""
+    return {
+        "status": "success",
+        "categories": log_stats()
+    }
+
+@app.post("/logging")
+async def set_logging(req: LoggingRequest):
+    """Change telemetry log levels and sampling at runtime"""
+    try:
+        if req.levels:
+            configure_levels(req.levels)
+        if req.sample_interval is not None:
+            for category in log_stats():
+                get_log(category).sample_interval = req.sample_interval
+    except ValueError as e:
+        return {
+            "status": "error",
+            "message": str(e)
+        }
+    return {
+        "status": "success",
+        "categories": log_stats()
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of ingest, link, fan-out and serialization metrics"""
+    metrics = MetricsWriter()
+    metrics.counter("telemetry_ingest_messages_total", "Messages ingested per store key",
+                    get_log("ingest").counters(), "type")
+
+    link = link_counters.totals()
+    for name, key, help_text in (
+        ("telemetry_link_bytes_total", "bytes", "Bytes read from MAVLink links"),
+        ("telemetry_link_parse_errors_total", "parse_errors", "MAVLink frames rejected by the parser"),
+        ("telemetry_link_bad_data_total", "bad_data", "BAD_DATA chunks skipped on MAVLink links"),
+        ("telemetry_link_duplicates_total", "duplicates", "Frames dropped as copies from a redundant link"),
+    ):
+        metrics.family(name, "counter", help_text)
+        metrics.sample(name, link.get(key, 0))
+
+    source = get_active_source()
+    endpoints = source.forwarder.get_info() if source and source.forwarder else []
+    for name, key, help_text in (
+        ("telemetry_forward_packets_total", "packets", "Frames forwarded per endpoint"),
+        ("telemetry_forward_bytes_total", "bytes", "Bytes forwarded per endpoint"),
+        ("telemetry_forward_dropped_total", "dropped", "Frames an endpoint could not take"),
+    ):
+        metrics.family(name, "counter", help_text)
+        for endpoint in endpoints:
+            metrics.sample(name, endpoint[key], {"endpoint": endpoint["endpoint"]})
+
+    metrics.family("telemetry_vehicles", "gauge", "Vehicles heard on the active source")
+    metrics.sample("telemetry_vehicles", len(vehicle_index))
+
+    metrics.family("telemetry_hub_subscriptions", "gauge", "Hub subscriptions watching a message type")
+    for message_type in allowed_types + [PLOT_TOPIC]:
+        metrics.sample("telemetry_hub_subscriptions", telemetry_hub.subscriber_count(message_type),
+                       {"type": message_type})
+
+    # Client queues are aggregated per stream; a per-client label would grow without bound
+    streams = {}
+    for queue in subscriber_queues():
+        stats = queue.stats()
+        totals = streams.setdefault(stats["stream"], {"clients": 0, "depth": 0, "depth_max": 0,
+                                                       "dropped": 0, "replaced": 0})
+        totals["clients"] += 1
+        totals["depth"] += stats["depth"]
+        totals["depth_max"] = max(totals["depth_max"], stats["depth"])
+        totals["dropped"] += stats["dropped"]
+        totals["replaced"] += stats["replaced"]
+    metrics.family("telemetry_stream_subscribers", "gauge", "Connected clients per stream")
+    for stream, totals in sorted(streams.items()):
+        metrics.sample("telemetry_stream_subscribers", totals["clients"], {"stream": stream})
+
+    metrics.counter("telemetry_stream_events_sent_total", "Events sent to clients per stream",
+                    events_sent.totals(), "stream")
+    metrics.counter("telemetry_stream_bytes_sent_total", "Payload bytes sent to clients per stream",
+                    bytes_sent.totals(), "stream")
+
+    metrics.histogram("telemetry_serialization_seconds", "Time spent encoding payloads, per encoding",
+                      serialization_seconds, "encoding")
+
+    metrics.histogram("telemetry_receive_to_enqueue_seconds",
+                      "Link receive to a stream queueing the message, per store key", receive_to_enqueue, "type")
+    metrics.histogram("telemetry_enqueue_to_send_seconds",
+                      "Queued to taken for sending by the client connection, per stream", enqueue_to_send, "stream")
+
+    for name, key, help_text in (
+        ("telemetry_subscriber_queue_depth", "depth", "Frames waiting in the send queues of a stream's clients"),
+        ("telemetry_subscriber_queue_depth_max", "depth_max", "Deepest send queue among a stream's clients"),
+        ("telemetry_subscriber_queue_dropped", "dropped",
+         "Frames dropped from full queues of a stream's connected clients"),
+        ("telemetry_subscriber_queue_replaced", "replaced",
+         "Pending frames replaced by newer ones for a stream's connected clients"),
+    ):
+        metrics.family(name, "gauge", help_text)
+        for stream, totals in sorted(streams.items()):
+            metrics.sample(name, totals[key], {"stream": stream})
+
+    return Response(metrics.render(), media_type=MetricsWriter.CONTENT_TYPE)
+
+@app.options("/stream/distance_sensor/{sensor_id}")
+async def options_distance_sensor(sensor_id: int):
+    return {"status": "ok"}
+
 @app.get("/reset_3d_plot")
 async def reset_3d_plot():
     """Reset accumulated 3D plot data"""
-    global three_d_plot_data
-    three_d_plot_data = {
-        "lidar_0": [],
-        "lidar_1": []
-    }
+    lidar_plot_buffer.reset()
     print("3D plot data reset")
     return {"message": "3D plot data reset successfully"}
 
@@ -315,15 +717,36 @@ async def options_3d_plot():
     return {"message": "OK"}
 
 @app.get("/mavlink/status")
-async def get_mavlink_status():
-    """Get MAVLink connection status and system info"""
+async def get_mavlink_status(system_id: Optional[int] = None, component_id: Optional[int] = None):
+    """
+    Get MAVLink connection status and system info
+
+    Args:
+        system_id: Vehicle to report (defaults to the one the source connected to)
+        component_id: Component of that vehicle (defaults to 1, the autopilot)
+    """
+    if system_id is not None and vehicle_index.get(system_id, component_id) is None:
+        raise HTTPException(status_code=404, detail="Vehicle not heard on the active source")
     try:
-        heartbeat = simulated_mavlink.get_message("HEARTBEAT")
+        source = get_active_source()
+        if not source:
+            return {
+                "status": "disconnected",
+                "message": "No MAVLink connection"
+            }
+        
+        heartbeat = telemetry_store.get(vehicle_index.resolve("HEARTBEAT", system_id, component_id))
+        if system_id is None:
+            system_id, component_id = source.system_id, source.component_id
+        elif component_id is None:
+            component_id = DEFAULT_COMPONENT_ID
         if heartbeat:
             return {
                 "status": "connected",
-                "system_id": 1,
-                "component_id": 1,
+                "source": source.kind,
+                "system_id": system_id,
+                "component_id": component_id,
+                "vehicle_count": len(vehicle_index),
                 "autopilot": "ArduPilot",
                 "type": "Quadrotor",
                 "mavlink_version": heartbeat.get("mavlink_version", 2),
@@ -333,8 +756,11 @@ async def get_mavlink_status():
             }
         else:
             return {
-                "status": "disconnected",
-                "message": "No MAVLink heartbeat received"
+                "status": "connected",
+                "source": source.kind,
+                "system_id": system_id,
+                "component_id": component_id,
+                "message": "Connected but no heartbeat received yet"
             }
     except Exception as e:
         return {
@@ -342,15 +768,48 @@ async def get_mavlink_status():
             "message": f"Failed to get MAVLink status: {str(e)}"
         }
 
+@app.get("/vehicles")
+async def get_vehicles():
+    """
+    Index of every vehicle (system/component pair) heard on the active source
+
+    The primary vehicle is listed first; its messages are what the endpoints
+    serve when no system_id is given.
+    """
+    primary = vehicle_index.primary
+    return {
+        "status": "success",
+        "vehicle_count": len(vehicle_index),
+        "primary": {"system_id": primary[0], "component_id": primary[1]} if primary else None,
+        "vehicles": vehicle_index.vehicles()
+    }
+
 @app.get("/mavlink/messages")
 async def get_available_messages():
-    """Get list of available MAVLink messages"""
+    """
+    Get list of available MAVLink messages
+
+    `messages` lists the primary vehicle's types (the plain keys); `vehicles`
+    lists the types stored for every vehicle heard.
+    """
     try:
-        messages = simulated_mavlink.get_all_messages()
+        messages = []
+        vehicles = {}
+        for key in telemetry_store.keys():
+            message_type, _, vehicle = key.partition("@")
+            if vehicle:
+                system_id, _, component_id = vehicle.partition(".")
+                vehicles.setdefault((int(system_id), int(component_id)), []).append(message_type)
+            else:
+                messages.append(message_type)
         return {
             "status": "success",
             "message_count": len(messages),
-            "messages": list(messages.keys())
+            "messages": messages,
+            "vehicles": [
+                {"system_id": system_id, "component_id": component_id, "messages": types}
+                for (system_id, component_id), types in sorted(vehicles.items())
+            ]
         }
     except Exception as e:
         return {
@@ -359,15 +818,23 @@ async def get_available_messages():
         }
 
 @app.get("/mavlink/message/{message_type}")
-async def get_specific_message(message_type: str):
-    """Get a specific MAVLink message"""
+async def get_specific_message(message_type: str, fields: Optional[str] = None, system_id: Optional[int] = None,
+                               component_id: Optional[int] = None):
+    """
+    Get a specific MAVLink message
+
+    Args:
+        fields: Comma separated subset of fields to return (defaults to the whole message)
+        system_id: Vehicle to read (defaults to the primary vehicle)
+        component_id: Component of that vehicle (defaults to 1, the autopilot)
+    """
     try:
-        message = simulated_mavlink.get_message(message_type)
-        if message:
+        entry = telemetry_store.get_entry(vehicle_index.resolve(message_type, system_id, component_id))
+        if entry is not None and entry.data:
             return {
                 "status": "success",
                 "message_type": message_type,
-                "data": message
+                "data": entry.project(compile_projection(fields)).data
             }
         else:
             return {
@@ -380,5 +847,46 @@ async def get_specific_message(message_type: str):
             "message": f"Failed to get message: {str(e)}"
         }
 
+@app.get("/history/{message_type}")
+async def get_message_history(message_type: str, since: Optional[float] = None, fields: Optional[str] = None,
+                              system_id: Optional[int] = None, component_id: Optional[int] = None):
+    """
+    Get recorded history of a message type's numeric fields
+
+    Args:
+        since: Epoch seconds to start after; negative values are relative to now
+        fields: Comma separated subset of fields (defaults to all numeric fields)
+        system_id: Vehicle to read (defaults to the primary vehicle)
+        component_id: Component of that vehicle (defaults to 1, the autopilot)
+    """
+    try:
+        selected = [f for f in fields.split(",") if f] if fields else None
+        history = telemetry_history.query(vehicle_index.resolve_vehicle(message_type, system_id, component_id), since,
+                                        selected)
+        if history is None:
+            return {
+                "status": "error",
+                "message": f"No history for message type '{message_type}'"
+            }
+        return {
+            "status": "success",
+            "message_type": message_type,
+            "retention": telemetry_history.retention,
+            "timestamps": history["timestamps"],
+            "fields": history["fields"]
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Failed to get history: {str(e)}"
+        }
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    parser = argparse.ArgumentParser(description="ISRO IROC telemetry backend")
+    parser.add_argument("--source", choices=SOURCE_KINDS, default=default_source,
+                        help="Telemetry source used when /connect does not name one")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    default_source = args.source
+    
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
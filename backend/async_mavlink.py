@@ -0,0 +1,227 @@
+"""
+Asyncio MAVLink Reader
+Non-blocking serial/UDP/TCP ingest that parses frames on the event loop, without a reader thread
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from pymavlink import mavutil
+from flight_recorder import FlightRecorder
+from telemetry_metrics import link_counters
+from mavlink_filter import filter_messages
+from mavlink_forwarder import MavlinkForwarder, unknown_frame
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_device(device: str) -> Tuple[str, str, int]:
+    """
+    Split a mavutil-style connection string
+
+    Args:
+        device: e.g. udpin:0.0.0.0:14550, udpout:10.0.0.2:14550, tcp:127.0.0.1:5760,
+            tcpin:0.0.0.0:5760 or a serial device such as /dev/ttyUSB0
+
+    Returns:
+        Tuple[str, str, int]: (kind, host or device path, port or 0)
+    """
+    for prefix, kind in (("udpin:", "udpin"), ("udp:", "udpin"), ("udpout:", "udpout"),
+                         ("tcpin:", "tcpin"), ("tcp:", "tcp")):
+        if device.startswith(prefix):
+            host, _, port = device[len(prefix):].rpartition(":")
+            return kind, host or "0.0.0.0", int(port)
+    return "serial", device, 0
+
+
+class _LinkProtocol(asyncio.Protocol, asyncio.DatagramProtocol):
+    """Hands every received chunk (stream or datagram) to the reader"""
+
+    def __init__(self, reader: "AsyncMavlinkReader"):
+        self.reader = reader
+
+    def connection_made(self, transport):
+        self.reader._transport = transport
+
+    def data_received(self, data: bytes):
+        self.reader.feed(data)
+
+    def datagram_received(self, data: bytes, addr):
+        self.reader._peer = addr
+        self.reader.feed(data)
+
+    def connection_lost(self, exc):
+        if exc:
+            logger.warning(f"MAVLink link lost: {exc}")
+
+
+class _TransportWriter:
+    """File-like adaptor so the pymavlink encoder can send through the transport"""
+
+    def __init__(self, reader: "AsyncMavlinkReader"):
+        self.reader = reader
+
+    def write(self, data: bytes):
+        self.reader.send(data)
+
+
+class AsyncMavlinkReader:
+    """
+    Reads a MAVLink link with asyncio transports and feeds pymavlink's
+    incremental parser directly from the data callbacks.
+
+    Decoded messages go to `handler` on the event loop thread, so stream
+    wakeups need no cross-thread hop and closing the link is immediate.
+    Serial ports use loop.add_reader and therefore need a POSIX event loop.
+    With `message_types`, frames of other types are checked but not unpacked.
+    With `forwarder`, the frames parsed from each chunk are relayed together.
+    Frames of message ids the dialect does not know are recorded and
+    forwarded as is and go to `unknown_handler(frame, header)` (see
+    unknown_frame) instead of `handler`.
+    """
+
+    def __init__(self, device: str, baud: int = 115200, handler: Optional[Callable[[Any], Any]] = None,
+                 recorder: Optional[FlightRecorder] = None, message_types: Optional[Iterable[str]] = None,
+                 forwarder: Optional[MavlinkForwarder] = None,
+                 unknown_handler: Optional[Callable[[bytes, Tuple[int, int, int, int, int]], Any]] = None):
+        self.device = device
+        self.baud = baud
+        self.handler = handler
+        self.recorder = recorder
+        self.forwarder = forwarder
+        self.unknown_handler = unknown_handler
+        self.parser = mavutil.mavlink.MAVLink(_TransportWriter(self), srcSystem=255, srcComponent=0)
+        self.parser.robust_parsing = True
+        if message_types is not None:
+            # Other types are framed and checksummed but not unpacked
+            filter_messages(self.parser, message_types)
+        self.target_system: Optional[int] = None
+        self.target_component: Optional[int] = None
+        self.bytes_received = 0
+        self.messages_received = 0
+        self.bad_data = 0
+        self._kind, self._host, self._port = parse_device(device)
+        self._transport = None
+        self._server = None
+        self._serial = None
+        self._peer = None
+        self._heartbeat: Optional[asyncio.Future] = None
+
+    async def open(self, heartbeat_timeout: float = 10.0):
+        """Open the link and wait for the first heartbeat"""
+        loop = asyncio.get_running_loop()
+        self._heartbeat = loop.create_future()
+
+        if self._kind == "udpin":
+            await loop.create_datagram_endpoint(lambda: _LinkProtocol(self), local_addr=(self._host, self._port))
+        elif self._kind == "udpout":
+            self._peer = (self._host, self._port)
+            await loop.create_datagram_endpoint(lambda: _LinkProtocol(self), remote_addr=self._peer)
+            # The vehicle only starts sending once it hears from us
+            self.parser.heartbeat_send(mavutil.mavlink.MAV_TYPE_GCS, mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0)
+        elif self._kind == "tcp":
+            await loop.create_connection(lambda: _LinkProtocol(self), self._host, self._port)
+        elif self._kind == "tcpin":
+            self._server = await loop.create_server(lambda: _LinkProtocol(self), self._host, self._port)
+        else:
+            self._open_serial(loop)
+
+        logger.info(f"Async MAVLink link open on {self.device}, waiting for heartbeat...")
+        try:
+            await asyncio.wait_for(asyncio.shield(self._heartbeat), heartbeat_timeout)
+        except asyncio.TimeoutError:
+            self.close()
+            raise TimeoutError(f"No heartbeat from {self.device} within {heartbeat_timeout}s")
+        logger.info(f"Heartbeat received from system {self.target_system}, component {self.target_component}")
+
+    def _open_serial(self, loop: asyncio.AbstractEventLoop):
+        import serial
+
+        self._serial = serial.Serial(self.device, self.baud, timeout=0)
+        loop.add_reader(self._serial.fileno(), self._read_serial)
+
+    def _read_serial(self):
+        data = self._serial.read(self._serial.in_waiting or 1)
+        if data:
+            self.feed(data)
+
+    def feed(self, data: bytes):
+        """Parse a chunk of link bytes and dispatch every complete message"""
+        received = time.monotonic()
+        self.bytes_received += len(data)
+        link_counters.add("bytes", len(data))
+        errors = self.parser.total_receive_errors
+        messages = self.parser.parse_buffer(data)
+        if self.parser.total_receive_errors != errors:
+            link_counters.add("parse_errors", self.parser.total_receive_errors - errors)
+        if not messages:
+            return
+        now = time.time()
+        for msg in messages:
+            if msg.get_msgId() < 0:
+                if msg.get_type() == "BAD_DATA":
+                    self.bad_data += 1
+                    link_counters.add("bad_data")
+                unknown = unknown_frame(msg)
+                if unknown is not None:
+                    frame, header = unknown
+                    if self.recorder is not None:
+                        self.recorder.record(header[3], frame, now)
+                    if self.forwarder is not None:
+                        self.forwarder.forward(frame)
+                    if self.unknown_handler is not None:
+                        self.unknown_handler(frame, header)
+                continue
+            msg._timestamp = now
+            msg._received = received
+            self.messages_received += 1
+            if self.recorder is not None:
+                self.recorder.record(msg.get_msgId(), msg.get_msgbuf(), now)
+            if self.forwarder is not None:
+                self.forwarder.forward(msg.get_msgbuf())
+            if msg.get_type() == "HEARTBEAT" and not self._heartbeat.done():
+                self.target_system = msg.get_srcSystem()
+                self.target_component = msg.get_srcComponent()
+                self._heartbeat.set_result(msg)
+            if self.handler is not None:
+                self.handler(msg)
+        if self.forwarder is not None:
+            self.forwarder.flush()
+
+    def send(self, data: bytes):
+        """Write raw bytes to the link"""
+        if self._serial is not None:
+            self._serial.write(data)
+        elif self._transport is not None:
+            if self._kind in ("udpin", "udpout"):
+                if self._peer is not None:
+                    self._transport.sendto(data, None if self._kind == "udpout" else self._peer)
+            else:
+                self._transport.write(data)
+
+    def close(self):
+        """Close the link immediately"""
+        if self._serial is not None:
+            asyncio.get_event_loop().remove_reader(self._serial.fileno())
+            self._serial.close()
+            self._serial = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if self._heartbeat is not None and not self._heartbeat.done():
+            self._heartbeat.cancel()
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "device": self.device,
+            "link": self._kind,
+            "bytes_received": self.bytes_received,
+            "messages_received": self.messages_received,
+            "bad_data": self.bad_data
+        }
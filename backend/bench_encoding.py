@@ -0,0 +1,114 @@
+"""
+Encoding Benchmark
+Compares payload size and encode time of the JSON, packed and MessagePack stream encodings
+
+Usage:
+    python bench_encoding.py [--iterations 20000]
+
+Messages are captured from the simulator so they have the same shape as
+live telemetry; the 3D plot is measured as a full 100-point snapshot.
+Sizes are raw payload bytes, with the base64 size actually sent over SSE
+for the binary formats.
+"""
+
+import time
+import json
+import base64
+import random
+import argparse
+import timeit
+from simulated_mavlink import simulated_mavlink
+from telemetry_store import telemetry_store
+from telemetry_encoding import encode_binary, msgpack, sse_data
+from lidar_plot import LidarPlotBuffer
+
+# High-rate numeric types the binary formats are aimed at
+DEFAULT_TYPES = ["AHRS2", "VISION_POSITION_ESTIMATE", "DISTANCE_SENSOR_D0", "GPS", "BATTERY_STATUS"]
+
+
+def capture_messages(seconds: float = 0.5):
+    """Run the simulator briefly and return the latest message of every type"""
+    simulated_mavlink.start_simulation()
+    time.sleep(seconds)
+    simulated_mavlink.stop_simulation()
+    return telemetry_store.copy()
+
+
+def fill_plot_buffer(points: int = 100) -> LidarPlotBuffer:
+    buffer = LidarPlotBuffer(capacity=points)
+    for _ in range(points):
+        buffer.append(random.uniform(-5, 5), random.uniform(-5, 5), random.uniform(10, 60), random.uniform(10, 60))
+    return buffer
+
+
+def time_us(func, iterations: int) -> float:
+    """Mean call time in microseconds"""
+    return timeit.timeit(func, number=iterations) / iterations * 1e6
+
+
+def bench_message(data, iterations: int):
+    encoders = {
+        "json": lambda: json.dumps(data).encode(),
+        "packed": lambda: encode_binary(data, "packed"),
+    }
+    if msgpack is not None:
+        encoders["msgpack"] = lambda: encode_binary(data, "msgpack")
+
+    results = {}
+    for name, encode in encoders.items():
+        payload = encode()
+        results[name] = (
+            len(payload),
+            len(payload) if name == "json" else len(sse_data(payload)),
+            time_us(encode, iterations)
+        )
+    return results
+
+
+def bench_plot(buffer: LidarPlotBuffer, iterations: int):
+    results = {}
+    encodings = ["json", "packed"] + (["msgpack"] if msgpack is not None else [])
+    for encoding in encodings:
+        # Encode a fresh snapshot each time, bypassing the buffer's range cache
+        rows = buffer._rows(0, buffer.capacity)
+        encode = lambda: buffer._encode(rows, encoding)
+        sent = encode()
+        results[encoding] = (
+            len(sent) if encoding == "json" else len(base64.b64decode(sent)),
+            len(sent),
+            time_us(encode, iterations)
+        )
+    return results
+
+
+def print_results(name: str, results):
+    print(f"{name}")
+    print(f"  {'encoding':<10}{'bytes':>8}{'on wire':>10}{'encode us':>12}")
+    for encoding, (size, wire, encode_time) in results.items():
+        print(f"  {encoding:<10}{size:>8}{wire:>10}{encode_time:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stream encodings")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--types", default=",".join(DEFAULT_TYPES),
+                        help="Comma separated message types to measure")
+    args = parser.parse_args()
+
+    if msgpack is None:
+        print("msgpack is not installed; skipping MessagePack\n")
+
+    messages = capture_messages()
+    for message_type in args.types.split(","):
+        data = messages.get(message_type)
+        if data is None:
+            print(f"{message_type}: no sample captured\n")
+            continue
+        print_results(message_type, bench_message(data, args.iterations))
+        print()
+
+    print_results("3D plot (100 points)", bench_plot(fill_plot_buffer(), max(1, args.iterations // 20)))
+
+
+if __name__ == "__main__":
+    main()
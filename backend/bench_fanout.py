@@ -0,0 +1,321 @@
+"""
+SSE Fan-out Benchmark
+Load-tests the streaming endpoints with many concurrent clients against a fast simulator
+
+Usage:
+    python bench_fanout.py [--clients 10,100,1000] [--duration 10] [--save results.json]
+    python bench_fanout.py --baseline results.json
+
+For every endpoint and client count a fresh server (the app under uvicorn,
+fed by a stamped simulator) is started in a child process, so its CPU time
+and RSS can be read from /proc without counting the clients. Clients are
+plain asyncio HTTP/1.0 connections spread over a few worker processes.
+
+Latency is generation to receipt: message types carry the simulator's
+wall-clock `bench_ts` field, 3D plot events the timestamp of their newest
+point. Only events received inside the measurement window are counted.
+With --baseline every row is compared against a previous --save run.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import argparse
+import resource
+import multiprocessing
+from array import array
+from typing import Any, Dict, List, Optional
+from simulated_mavlink import SimulatedMAVLink
+
+DEFAULT_ENDPOINTS = ["/stream/AHRS2", "/stream/distance_sensor/0", "/stream/3d_plot"]
+DEFAULT_CLIENTS = "10,100,1000"
+
+# Seconds between simulator rounds (one message of every type per round)
+DEFAULT_SIM_INTERVAL = 0.01
+
+_MESSAGE_STAMP = re.compile(rb'"bench_ts": ?([0-9.e+-]+)')
+# Schema and ping events are not counted; the 3D plot sends "delta" after its first snapshot
+_DATA_EVENTS = (b"message", b"delta")
+_PLOT_STAMP = re.compile(rb'"timestamp": ?([0-9.e+-]+)')
+
+
+class StampedSimulator(SimulatedMAVLink):
+    """Simulator that stamps every message with its generation time"""
+
+    def _update(self, message_type, msg, *ids):
+        msg["bench_ts"] = time.time()
+        super()._update(message_type, msg, *ids)
+
+
+def raise_fd_limit():
+    """Allow as many sockets as the hard limit permits"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_server(port: int, sim_interval: float):
+    """Child process: the app with a stamped simulator and no default source"""
+    raise_fd_limit()
+    os.environ["TELEMETRY_SOURCE"] = "none"
+    import uvicorn
+    from app import app
+
+    StampedSimulator(sim_interval).start_simulation()
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not start listening on port {port}")
+
+
+def process_usage(pid: int) -> Dict[str, float]:
+    """CPU seconds and resident memory of a process, read from /proc"""
+    with open(f"/proc/{pid}/stat") as f:
+        # Fields after the parenthesised command name; utime and stime are 14 and 15
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    memory = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":", 1)
+                memory[key] = int(value.split()[0]) / 1024
+    return {"cpu": cpu, "rss_mb": memory.get("VmRSS", 0.0), "peak_rss_mb": memory.get("VmHWM", 0.0)}
+
+
+def event_stamp(data: bytes, plot: bool) -> Optional[float]:
+    """Generation time carried by an event, or None for events without one"""
+    if plot:
+        stamps = _PLOT_STAMP.findall(data)
+        return max(float(s) for s in stamps) if stamps else None
+    match = _MESSAGE_STAMP.search(data)
+    return float(match.group(1)) if match else None
+
+
+async def sse_client(port: int, path: str, start_at: float, end_at: float, latencies: array) -> Optional[int]:
+    """
+    Read one SSE stream until the window ends
+
+    Returns:
+        Optional[int]: Events received inside the window, None if the connection failed
+    """
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 22)
+    except OSError:
+        return None
+    plot = path.endswith("3d_plot")
+    events = 0
+    try:
+        # HTTP/1.0 keeps the response unchunked; the server closes it when we do
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: 127.0.0.1\r\nAccept: text/event-stream\r\n\r\n".encode())
+        if b" 200 " not in await reader.readline():
+            return None
+        await reader.readuntil(b"\r\n\r\n")
+
+        event, data = b"message", []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            received = time.time()
+            if received >= end_at:
+                break
+            line = line.rstrip(b"\r\n")
+            if line.startswith(b"data:"):
+                data.append(line[5:].lstrip())
+            elif line.startswith(b"event:"):
+                event = line[6:].strip()
+            elif not line:
+                if data and event in _DATA_EVENTS and received >= start_at:
+                    events += 1
+                    stamp = event_stamp(b"\n".join(data), plot)
+                    if stamp is not None:
+                        latencies.append((received - stamp) * 1000)
+                event, data = b"message", []
+    except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+    return events
+
+
+def run_clients(port: int, path: str, count: int, start_at: float, end_at: float) -> Dict[str, Any]:
+    """Worker process: `count` concurrent clients on one path"""
+    raise_fd_limit()
+
+    async def main():
+        latencies = array("d")
+        tasks = []
+        for i in range(count):
+            tasks.append(asyncio.create_task(sse_client(port, path, start_at, end_at, latencies)))
+            if i % 50 == 49:
+                # Stagger connects so the listen backlog is not flooded
+                await asyncio.sleep(0.01)
+        results = await asyncio.wait_for(asyncio.gather(*tasks), end_at - time.time() + 30)
+        return results, latencies
+
+    results, latencies = asyncio.run(main())
+    return {
+        "counts": [r for r in results if r is not None],
+        "failed": sum(1 for r in results if r is None),
+        "latencies": latencies
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run_scenario(path: str, clients: int, args) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    port = free_port()
+    server = ctx.Process(target=run_server, args=(port, args.sim_interval), daemon=True)
+    server.start()
+    try:
+        wait_for_port(port)
+        procs = max(1, min(args.client_procs, clients))
+        # Leave time for every client to connect before the window opens
+        start_at = time.time() + args.warmup + clients / 500
+        end_at = start_at + args.duration
+        shares = [clients // procs + (1 if i < clients % procs else 0) for i in range(procs)]
+        with ctx.Pool(procs) as pool:
+            pending = pool.starmap_async(run_clients, [(port, path, n, start_at, end_at) for n in shares])
+            time.sleep(max(0.0, start_at - time.time()))
+            before = process_usage(server.pid)
+            time.sleep(max(0.0, end_at - time.time()))
+            after = process_usage(server.pid)
+            results = pending.get()
+    finally:
+        server.terminate()
+        server.join(5)
+
+    counts = [c for r in results for c in r["counts"]]
+    latencies = sorted(v for r in results for v in r["latencies"])
+    rates = [c / args.duration for c in counts]
+    return {
+        "endpoint": path,
+        "clients": clients,
+        "connected": len(counts),
+        "failed": sum(r["failed"] for r in results),
+        "events_per_s": sum(rates),
+        "client_rate_mean": sum(rates) / len(rates) if rates else 0.0,
+        "client_rate_min": min(rates) if rates else 0.0,
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p90_ms": percentile(latencies, 90),
+        "latency_p99_ms": percentile(latencies, 99),
+        "latency_max_ms": latencies[-1] if latencies else float("nan"),
+        "server_cpu_pct": (after["cpu"] - before["cpu"]) / args.duration * 100,
+        "server_rss_mb": after["rss_mb"],
+        "server_peak_rss_mb": after["peak_rss_mb"]
+    }
+
+
+COLUMNS = [
+    ("endpoint", "endpoint", 28, "s"),
+    ("clients", "clients", 8, "d"),
+    ("ok", "connected", 6, "d"),
+    ("ev/s/client", "client_rate_mean", 12, ".1f"),
+    ("min ev/s", "client_rate_min", 9, ".1f"),
+    ("p50 ms", "latency_p50_ms", 9, ".1f"),
+    ("p90 ms", "latency_p90_ms", 9, ".1f"),
+    ("p99 ms", "latency_p99_ms", 9, ".1f"),
+    ("max ms", "latency_max_ms", 9, ".1f"),
+    ("cpu %", "server_cpu_pct", 7, ".0f"),
+    ("rss MB", "server_rss_mb", 8, ".1f"),
+]
+
+# Metrics compared against a baseline run
+COMPARED = [
+    ("ev/s/client", "client_rate_mean"),
+    ("p50", "latency_p50_ms"),
+    ("p99", "latency_p99_ms"),
+    ("cpu", "server_cpu_pct"),
+    ("rss", "server_rss_mb"),
+]
+
+
+def print_header():
+    print("".join(f"{title:<{width}}" if fmt == "s" else f"{title:>{width}}" for title, _, width, fmt in COLUMNS))
+
+
+def print_row(result: Dict[str, Any]):
+    print("".join(f"{result[key]:<{width}}" if fmt == "s" else f"{result[key]:>{width}{fmt}}"
+                  for _, key, width, fmt in COLUMNS))
+
+
+def print_comparison(result: Dict[str, Any], baseline: Dict[str, Any]):
+    changes = []
+    for title, key in COMPARED:
+        before, after = baseline.get(key), result[key]
+        if before and math.isfinite(before) and math.isfinite(after):
+            changes.append(f"{title} {(after - before) / before * 100:+.0f}%")
+    print(f"{'':<28}vs baseline: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test SSE fan-out")
+    parser.add_argument("--endpoints", default=",".join(DEFAULT_ENDPOINTS),
+                        help="Comma separated stream paths")
+    parser.add_argument("--clients", default=DEFAULT_CLIENTS, help="Comma separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measurement window in seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds before the window opens")
+    parser.add_argument("--sim-interval", type=float, default=DEFAULT_SIM_INTERVAL,
+                        help="Seconds between simulator rounds")
+    parser.add_argument("--client-procs", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes running the clients")
+    parser.add_argument("--save", help="Write results to a JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/stat"):
+        sys.exit("bench_fanout reads server CPU and RSS from /proc and needs Linux")
+    raise_fd_limit()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(r["endpoint"], r["clients"]): r for r in json.load(f)["results"]}
+
+    print(f"simulator interval {args.sim_interval}s, window {args.duration}s, "
+          f"{args.client_procs} client process(es)\n")
+    print_header()
+    results = []
+    for path in args.endpoints.split(","):
+        for clients in (int(c) for c in args.clients.split(",")):
+            result = run_scenario(path, clients, args)
+            results.append(result)
+            print_row(result)
+            if result["failed"]:
+                print(f"{'':<28}{result['failed']} client(s) failed to connect")
+            if (path, clients) in baseline:
+                print_comparison(result, baseline[(path, clients)])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Ingest Benchmark
+Measures the MAVLink parse and ingest path on a synthetic, pymavlink-encoded byte stream
+
+Usage:
+    python bench_ingest.py [--seconds 120] [--repeat 3] [--mavlink1]
+
+A seeded mix of the messages an ArduPilot vehicle streams (the types the
+GUI uses plus the common ones it ignores) is encoded into a raw log file.
+The end-to-end run drives bg_process.stream_real_mavlink_messages over
+that file as fast as it can read it; the stage runs time recv_match, bare
+parse_buffer, get_type filtering, to_dict and the parts of ingest() on
+their own. Results are the best of --repeat runs, and bytes/s is also
+given as a multiple of what a 921600 baud link can carry.
+"""
+
+import os
+import io
+import sys
+import random
+import argparse
+import tempfile
+import time
+from threading import Event
+from typing import Callable, Dict, List, Tuple
+
+# ArduPilot links run MAVLink 2; the wire version is fixed when pymavlink is imported
+if "--mavlink1" not in sys.argv:
+    os.environ.setdefault("MAVLINK20", "1")
+
+from pymavlink import mavutil
+import bg_process
+from bg_process import INTERESTED_TYPES, process_message, stream_real_mavlink_messages
+from telemetry_store import telemetry_store
+from telemetry_history import telemetry_history
+from telemetry_hub import telemetry_hub
+from telemetry_ingest import clear_telemetry, ingest
+
+# Bytes per second a 921600 baud 8N1 serial link carries
+LINK_BYTES_PER_S = 921600 / 10
+
+# Messages per second of flight, roughly a companion-computer stream configuration
+MESSAGE_RATES = {
+    "HEARTBEAT": 1,
+    "SYS_STATUS": 2,
+    "BATTERY_STATUS": 2,
+    "EKF_STATUS_REPORT": 2,
+    "GPS_RAW_INT": 5,
+    "ATTITUDE": 10,
+    "RAW_IMU": 10,
+    "AHRS2": 10,
+    "DISTANCE_SENSOR": 40,  # Two sensors at 20 Hz each
+    "VISION_POSITION_ESTIMATE": 30,
+    "VISION_SPEED_ESTIMATE": 30,
+}
+
+
+def encode_message(mav, message_type: str, rng: random.Random, t: float):
+    """One pymavlink message of a type with plausible random field values"""
+    usec = int(t * 1e6)
+    ms = int(t * 1e3)
+    # Extension fields only exist in the MAVLink 2 dialect
+    ext = (lambda **fields: fields) if mavutil.mavlink.WIRE_PROTOCOL_VERSION == "2.0" else (lambda **fields: {})
+    if message_type == "HEARTBEAT":
+        return mav.heartbeat_encode(2, 3, 81, 0, 3)
+    if message_type == "SYS_STATUS":
+        return mav.sys_status_encode(0x3FFFFF, 0x3FFFFF, 0x3FFFFF, rng.randint(100, 400), rng.randint(14000, 16800),
+                                     rng.randint(100, 2000), rng.randint(20, 100), 0, 0, 0, 0, 0, 0)
+    if message_type == "BATTERY_STATUS":
+        return mav.battery_status_encode(0, 0, 0, rng.randint(2000, 4000), [rng.randint(12000, 17000)] + [65535] * 9,
+                                         rng.randint(50, 200), rng.randint(1000, 5000), rng.randint(50000, 200000),
+                                         rng.randint(20, 100), **ext(time_remaining=rng.randint(300, 1800),
+                                                                     charge_state=1))
+    if message_type == "EKF_STATUS_REPORT":
+        return mav.ekf_status_report_encode(rng.randint(200, 255), *(rng.uniform(0.01, 0.1) for _ in range(5)),
+                                            **ext(airspeed_variance=rng.uniform(0.01, 0.1)))
+    if message_type == "GPS_RAW_INT":
+        return mav.gps_raw_int_encode(usec, 3, 286139000 + rng.randint(-1000, 1000), 772090000 + rng.randint(-1000, 1000),
+                                      rng.randint(200000, 220000), rng.randint(100, 500), rng.randint(100, 500),
+                                      rng.randint(0, 1000), rng.randint(0, 35999), rng.randint(8, 12),
+                                      **ext(alt_ellipsoid=rng.randint(200000, 220000), h_acc=rng.randint(100, 500)))
+    if message_type == "ATTITUDE":
+        return mav.attitude_encode(ms, *(rng.uniform(-0.5, 0.5) for _ in range(6)))
+    if message_type == "RAW_IMU":
+        return mav.raw_imu_encode(usec, *(rng.randint(-1000, 1000) for _ in range(9)))
+    if message_type == "AHRS2":
+        return mav.ahrs2_encode(rng.uniform(-0.5, 0.5), rng.uniform(-0.5, 0.5), rng.uniform(-3.14, 3.14),
+                                rng.uniform(200, 220), 286139000 + rng.randint(-1000, 1000),
+                                772090000 + rng.randint(-1000, 1000))
+    if message_type == "DISTANCE_SENSOR":
+        return mav.distance_sensor_encode(ms, 5, 1200, rng.randint(10, 100), 0, ms // 50 % 2, 0, 0,
+                                          **ext(signal_quality=rng.randint(0, 100)))
+    if message_type == "VISION_POSITION_ESTIMATE":
+        return mav.vision_position_estimate_encode(usec, *(rng.uniform(-2, 2) for _ in range(3)),
+                                                   *(rng.uniform(-0.1, 0.1) for _ in range(3)),
+                                                   **ext(covariance=[0.01] * 21))
+    if message_type == "VISION_SPEED_ESTIMATE":
+        return mav.vision_speed_estimate_encode(usec, *(rng.uniform(-0.5, 0.5) for _ in range(3)),
+                                                 **ext(covariance=[0.01] * 9))
+    raise ValueError(f"No encoder for {message_type}")
+
+
+def build_stream(seconds: float, seed: int = 1) -> Tuple[bytes, int]:
+    """
+    Encode `seconds` of telemetry at MESSAGE_RATES, interleaved in time order
+
+    Returns:
+        Tuple[bytes, int]: Raw MAVLink bytes and the number of frames
+    """
+    rng = random.Random(seed)
+    schedule = []
+    for message_type, rate in MESSAGE_RATES.items():
+        count = int(seconds * rate)
+        schedule.extend((i / rate, message_type) for i in range(count))
+    schedule.sort()
+
+    buffer = io.BytesIO()
+    mav = mavutil.mavlink.MAVLink(buffer, srcSystem=1, srcComponent=1)
+    for t, message_type in schedule:
+        mav.send(encode_message(mav, message_type, rng, t))
+    return buffer.getvalue(), len(schedule)
+
+
+class _LogMaster:
+    """Hands the listener a log connection without blocking, and stops it at end of file"""
+
+    def __init__(self, master, stop_event: Event):
+        self.master = master
+        self.mav = master.mav
+        self.stop_event = stop_event
+
+    def recv_match(self, **kwargs):
+        msg = self.master.recv_match(blocking=False)
+        if msg is None:
+            self.stop_event.set()
+        return msg
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        clear_telemetry()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_listener(path: str):
+    """The production listener loop over a raw log, until end of file"""
+    stop_event = Event()
+    master = mavutil.mavlink_connection(path, notimestamps=True)
+    try:
+        stream_real_mavlink_messages(_LogMaster(master, stop_event), stop_event)
+    finally:
+        master.close()
+
+
+def read_messages(path: str) -> List:
+    master = mavutil.mavlink_connection(path, notimestamps=True)
+    messages = []
+    try:
+        while True:
+            msg = master.recv_match(blocking=False)
+            if msg is None:
+                return messages
+            messages.append(msg)
+    finally:
+        master.close()
+
+
+def parse_chunks(data: bytes, chunk: int) -> List:
+    mav = mavutil.mavlink.MAVLink(None)
+    mav.robust_parsing = True
+    messages = []
+    for i in range(0, len(data), chunk):
+        messages.extend(mav.parse_buffer(data[i:i + chunk]) or ())
+    return messages
+
+
+def store_key(msg_type: str, data: Dict) -> str:
+    return f"DISTANCE_SENSOR_D{data.get('id', 0)}" if msg_type == "DISTANCE_SENSOR" else msg_type
+
+
+def bench_stages(path: str, data: bytes, chunk: int, repeat: int) -> List[Tuple[str, int, float]]:
+    """(stage, messages handled, best seconds) for every stage of the path"""
+    messages = read_messages(path)
+    interested = [m for m in messages if m.get_type() in INTERESTED_TYPES]
+    dicts = [(store_key(m.get_type(), d), d) for m in interested for d in (m.to_dict(),)]
+
+    def to_dicts():
+        for msg in interested:
+            msg.to_dict()
+
+    def store_updates():
+        for key, msg_dict in dicts:
+            telemetry_store.update(key, msg_dict)
+
+    def history_records():
+        for key, msg_dict in dicts:
+            telemetry_history.record(key, msg_dict)
+
+    def hub_publishes():
+        for key, _ in dicts:
+            telemetry_hub.publish(key)
+
+    def ingests():
+        for key, msg_dict in dicts:
+            ingest(key, msg_dict)
+
+    def process_messages():
+        for msg in messages:
+            process_message(msg)
+
+    return [
+        ("recv_match (read + parse)", len(messages), best_time(lambda: read_messages(path), repeat)),
+        (f"parse_buffer ({chunk} B chunks)", len(messages), best_time(lambda: parse_chunks(data, chunk), repeat)),
+        ("get_type filter", len(messages),
+         best_time(lambda: [m for m in messages if m.get_type() in INTERESTED_TYPES], repeat)),
+        ("to_dict", len(interested), best_time(to_dicts, repeat)),
+        ("store.update", len(dicts), best_time(store_updates, repeat)),
+        ("history.record", len(dicts), best_time(history_records, repeat)),
+        ("hub.publish", len(dicts), best_time(hub_publishes, repeat)),
+        ("ingest (all three)", len(dicts), best_time(ingests, repeat)),
+        ("process_message", len(messages), best_time(process_messages, repeat)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the MAVLink ingest path")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Seconds of telemetry to synthesize")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported")
+    parser.add_argument("--chunk", type=int, default=256, help="Read size for the bare parse_buffer stage")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mavlink1", action="store_true", help="Encode MAVLink 1 frames")
+    parser.add_argument("--no-filter", action="store_true",
+                        help="Decode every message type in the end-to-end run (as TELEMETRY_PARSER_FILTER=0)")
+    args = parser.parse_args()
+    if args.no_filter:
+        bg_process.PARSER_FILTER = False
+
+    data, frames = build_stream(args.seconds, args.seed)
+    with tempfile.NamedTemporaryFile(suffix=".raw", delete=False) as f:
+        f.write(data)
+        path = f.name
+    try:
+        print(f"MAVLink {mavutil.mavlink.WIRE_PROTOCOL_VERSION}: {frames} frames, {len(data)} bytes "
+              f"({args.seconds:.0f}s of telemetry at {sum(MESSAGE_RATES.values())} msgs/s)\n")
+
+        elapsed = best_time(lambda: run_listener(path), args.repeat)
+        print(f"End to end (stream_real_mavlink_messages, parser filter {'on' if bg_process.PARSER_FILTER else 'off'})")
+        print(f"  {frames / elapsed:>12,.0f} msgs/s")
+        print(f"  {len(data) / elapsed:>12,.0f} bytes/s  ({len(data) / elapsed / LINK_BYTES_PER_S:.1f}x a 921600 baud link)")
+        print(f"  {elapsed / frames * 1e6:>12.2f} us/msg\n")
+
+        print(f"  {'stage':<30}{'msgs':>8}{'us/msg':>10}{'msgs/s':>12}")
+        for stage, count, seconds in bench_stages(path, data, args.chunk, args.repeat):
+            print(f"  {stage:<30}{count:>8}{seconds / count * 1e6:>10.2f}{count / seconds:>12,.0f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
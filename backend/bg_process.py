@@ -3,79 +3,140 @@ Background MAVLink Message Processing
 Handles real MAVLink communication with flight controllers
 """
 
+import os
 import time
 import logging
 from threading import Thread, Event
 from typing import Optional, Dict, Any
+from telemetry_ingest import ingest
+from flight_recorder import FlightRecorder
+from mavlink_forwarder import MavlinkForwarder, unknown_frame
+from telemetry_metrics import link_counters
+from mavlink_filter import filter_messages
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# This dictionary is the shared "state" between the MAVLink listener and the API.
-# The background thread writes to it, and the API endpoints read from it.
-data_store = {}
-
 # This event is used to signal the background thread to stop running.
 stop_thread_event = Event()
 
 # Global thread reference
 background_thread: Optional[Thread] = None
 
-def stream_real_mavlink_messages(master, stop_event: Event):
+# A set of message types we are interested in for the GUI
+INTERESTED_TYPES = {
+    "HEARTBEAT", 
+    "BATTERY_STATUS", 
+    "EKF_STATUS_REPORT", 
+    "AHRS2",
+    "VISION_POSITION_ESTIMATE", 
+    "VISION_SPEED_ESTIMATE", 
+    "DISTANCE_SENSOR", 
+    "GPS_RAW_INT"
+}
+
+# Only unpack INTERESTED_TYPES on live links; TELEMETRY_PARSER_FILTER=0 decodes everything
+PARSER_FILTER = os.environ.get("TELEMETRY_PARSER_FILTER", "1") != "0"
+
+def process_message(msg) -> Optional[str]:
+    """
+    Publish one decoded message to the shared store, history and stream subscribers.
+    Shared by the live listener and log replay so both feed the same pipeline.
+    A link reader sets msg._received (time.monotonic()) when the frame arrived;
+    messages without it are stamped at ingest.
+
+    Returns:
+        Optional[str]: Per-type key that was updated (before vehicle qualification),
+            or None if the type is not of interest
+    """
+    msg_type = msg.get_type()
+
+    # If the message is one we care about, publish it
+    if msg_type not in INTERESTED_TYPES:
+        return None
+
+    # For distance sensors, we need to handle different IDs
+    if msg_type == 'DISTANCE_SENSOR':
+        # Store them with unique keys like 'DISTANCE_SENSOR_D0'
+        store_key = f"DISTANCE_SENSOR_D{msg.id}"
+    else:
+        store_key = msg_type
+
+    # The message itself is stored; its dict is only built when first read
+    ingest(store_key, msg, msg.get_srcSystem(), msg.get_srcComponent(), getattr(msg, "_received", None))
+    return store_key
+
+def stream_real_mavlink_messages(master, stop_event: Event, recorder: Optional[FlightRecorder] = None,
+                                 forwarder: Optional[MavlinkForwarder] = None):
     """
     This function is designed to run in a background thread.
     It continuously listens for MAVLink messages from the 'master' connection
-    and updates the global 'data_store' with the latest data for relevant messages.
+    and publishes the latest data for relevant messages to the shared telemetry store.
+    If a recorder is given, every valid frame is also appended to its flight log.
+    If a forwarder is given, every valid frame is relayed as received; the frames
+    parsed from one link read go out together.
     """
     logger.info("Starting background MAVLink message listener...")
-    
-    # A set of message types we are interested in for the GUI
-    INTERESTED_TYPES = {
-        "HEARTBEAT", 
-        "BATTERY_STATUS", 
-        "EKF_STATUS_REPORT", 
-        "AHRS2",
-        "VISION_POSITION_ESTIMATE", 
-        "VISION_SPEED_ESTIMATE", 
-        "DISTANCE_SENSOR", 
-        "GPS_RAW_INT"
-    }
+    if PARSER_FILTER:
+        filter_messages(master.mav, INTERESTED_TYPES)
+    link_bytes, link_errors = master.mav.total_bytes_received, master.mav.total_receive_errors
 
     try:
         while not stop_event.is_set():
             # Use a timeout so the loop doesn't block forever if no messages arrive.
             # This allows the stop_event check to be performed periodically.
             msg = master.recv_match(blocking=True, timeout=1) 
+            received = time.monotonic()
+
+            # Link counters are per connection in pymavlink; export the deltas
+            total_bytes, total_errors = master.mav.total_bytes_received, master.mav.total_receive_errors
+            link_counters.add("bytes", total_bytes - link_bytes)
+            link_counters.add("parse_errors", total_errors - link_errors)
+            link_bytes, link_errors = total_bytes, total_errors
             
             if msg is None:
+                if forwarder is not None:
+                    forwarder.flush()
                 continue
 
-            msg_type = msg.get_type()
-
-            # If the message is one we care about, update the data_store
-            if msg_type in INTERESTED_TYPES:
-                msg_dict = msg.to_dict()
-                
-                # For distance sensors, we need to handle different IDs
-                if msg_type == 'DISTANCE_SENSOR':
-                    sensor_id = msg_dict.get('id', 0)
-                    # Store them with unique keys like 'DISTANCE_SENSOR_D0'
-                    data_store[f"DISTANCE_SENSOR_D{sensor_id}"] = msg_dict
-                    logger.debug(f"Updated DISTANCE_SENSOR_D{sensor_id}")
-                else:
-                    data_store[msg_type] = msg_dict
-                    logger.debug(f"Updated {msg_type}")
-                
-                # Optional: for debugging, you can log the update.
-                # logger.info(f"Updated data_store with {msg_type}")
+            msg_id = msg.get_msgId()
+            if msg_id < 0:
+                # BAD_DATA, or a frame of a message id this dialect does not know
+                if msg.get_type() == "BAD_DATA":
+                    link_counters.add("bad_data")
+                unknown = unknown_frame(msg)
+                if unknown is None:
+                    continue
+                # Still recorded and relayed as is; there is nothing to decode
+                frame, header = unknown
+                msg_id = header[3]
+            else:
+                frame = None
+                msg._received = received
+
+            # Keep the raw frame of every valid message for the flight log
+            if recorder is not None:
+                recorder.record(msg_id, frame or msg.get_msgbuf(), getattr(msg, "_timestamp", None))
+
+            if forwarder is not None:
+                forwarder.forward(frame or msg.get_msgbuf())
+                # Send the batch once the parser has to go back to the link for more bytes
+                if master.mav.buf_len() < master.mav.expected_length:
+                    forwarder.flush()
+
+            if frame is None:
+                process_message(msg)
 
     except Exception as e:
         logger.error(f"Error in MAVLink message listener: {str(e)}")
     finally:
+        if forwarder is not None:
+            forwarder.flush()
         logger.info("Stopping background MAVLink message listener.")
 
-def start_background_thread(master):
+def start_background_thread(master, recorder: Optional[FlightRecorder] = None,
+                            forwarder: Optional[MavlinkForwarder] = None):
     """Start the background MAVLink message listener thread"""
     global background_thread, stop_thread_event
     
@@ -85,7 +146,7 @@ def start_background_thread(master):
     # Create and start the background thread
     background_thread = Thread(
         target=stream_real_mavlink_messages,
-        args=(master, stop_thread_event),
+        args=(master, stop_thread_event, recorder, forwarder),
         daemon=True
     )
     background_thread.start()
@@ -104,13 +165,3 @@ def stop_background_thread():
         logger.info("Background MAVLink thread stopped")
     else:
         logger.info("No background thread to stop")
-
-def get_data_store():
-    """Get the current data store"""
-    return data_store.copy()
-
-def clear_data_store():
-    """Clear the data store"""
-    global data_store
-    data_store.clear()
-    logger.info("Data store cleared")
@@ -0,0 +1,71 @@
+"""
+Field Projection
+Compiled ?fields= selections that trim message dicts down to the fields a client uses
+"""
+
+from threading import Lock
+from typing import Any, Dict, Iterable, Optional
+
+# Distinct projections kept for sharing; anything past this is compiled but not interned
+MAX_SHARED_PROJECTIONS = 256
+
+
+class FieldProjection:
+    """
+    A fixed set of top-level message fields.
+
+    Field names are de-duplicated and sorted, so "yaw,roll" and "roll,yaw"
+    compile to the same key and clients using either share one projected
+    payload per store version (see StoreEntry.project).
+    """
+
+    __slots__ = ("fields", "key")
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(sorted(set(fields)))
+        self.key = ",".join(self.fields)
+
+    def apply(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Subset of `data` with the selected fields; missing fields are left out"""
+        return {field: data[field] for field in self.fields if field in data}
+
+
+_lock = Lock()
+_projections: Dict[str, FieldProjection] = {}
+
+
+def compile_projection(fields: Optional[str]) -> Optional[FieldProjection]:
+    """
+    Compile a comma separated ?fields= value
+
+    Args:
+        fields: e.g. "roll,pitch,yaw"; None or empty selects every field
+
+    Returns:
+        Optional[FieldProjection]: Shared projection, or None for the full message
+    """
+    if not fields:
+        return None
+    projection = FieldProjection(f.strip() for f in fields.split(",") if f.strip())
+    if not projection.fields:
+        return None
+    with _lock:
+        shared = _projections.get(projection.key)
+        if shared is None and len(_projections) < MAX_SHARED_PROJECTIONS:
+            shared = _projections[projection.key] = projection
+    return shared or projection
+
+
+def compile_type_projections(fields: Optional[str]) -> Dict[str, FieldProjection]:
+    """
+    Compile a multi-type ?fields= value such as "AHRS2.roll,AHRS2.yaw,GPS.lat"
+
+    Returns:
+        Dict[str, FieldProjection]: Projection per message type; types not named stay whole
+    """
+    selected: Dict[str, list] = {}
+    for item in (fields or "").split(","):
+        message_type, _, field = item.strip().partition(".")
+        if message_type and field:
+            selected.setdefault(message_type, []).append(field)
+    return {message_type: compile_projection(",".join(names)) for message_type, names in selected.items()}
@@ -0,0 +1,278 @@
+"""
+Flight Recorder
+Append-only binary log of raw MAVLink frames with a memory-mapped, indexed reader
+
+Log layout:
+    FILE_MAGIC, then one record per frame:
+    RECORD_HEADER (receive time, message id, frame length) followed by the raw frame bytes
+
+Index layout (<log>.idx.npz), written when recording stops:
+    offsets, msg_ids and timestamps arrays with one entry per record,
+    and file_size, the size of the log the index describes
+"""
+
+import os
+import mmap
+import time
+import struct
+import logging
+from array import array
+from threading import Thread, Event, Lock
+from typing import Dict, Iterator, Optional, Tuple
+import numpy as np
+from pymavlink import mavutil
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FILE_MAGIC = b"IROCLOG1"
+
+# receive time (float64), message id (uint32), frame length (uint16)
+RECORD_HEADER = struct.Struct("<dIH")
+
+
+def index_path(path: str) -> str:
+    return path + ".idx.npz"
+
+
+class FlightRecorder:
+    """
+    Records raw MAVLink frames to an append-only log.
+
+    record() only appends to an in-memory buffer, so it is cheap enough to
+    call from the ingest loop; a writer thread moves the buffer to disk in
+    bulk every `flush_interval` seconds or once it reaches `flush_bytes`,
+    flushing the file after each batch so a crash loses at most one batch
+    and readers of the live log see every batch written.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, flush_bytes: int = 256 * 1024):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.records = 0
+        self.bytes_written = 0
+        self._lock = Lock()
+        self._buffer = bytearray()
+        self._offset = len(FILE_MAGIC)
+        self._offsets = array("Q")
+        self._msg_ids = array("I")
+        self._timestamps = array("d")
+        self._flush_event = Event()
+        self._stop_event = Event()
+        self._file = None
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        """Create the log file and start the writer thread"""
+        # An index left by an earlier recording at this path describes another file
+        if os.path.exists(index_path(self.path)):
+            os.remove(index_path(self.path))
+        self._file = open(self.path, "wb")
+        self._file.write(FILE_MAGIC)
+        self._file.flush()
+        self._stop_event.clear()
+        self._thread = Thread(target=self._writer, daemon=True)
+        self._thread.start()
+        logger.info(f"Flight recorder writing to {self.path}")
+
+    def record(self, msg_id: int, frame: bytes, timestamp: Optional[float] = None):
+        """
+        Append one raw frame
+
+        Args:
+            msg_id: MAVLink message id
+            frame: Frame bytes exactly as received
+            timestamp: Receive time in seconds since the epoch (defaults to now)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self._offsets.append(self._offset)
+            self._msg_ids.append(msg_id)
+            self._timestamps.append(timestamp)
+            self._buffer += RECORD_HEADER.pack(timestamp, msg_id, len(frame))
+            self._buffer += frame
+            self._offset += RECORD_HEADER.size + len(frame)
+            self.records += 1
+            if len(self._buffer) >= self.flush_bytes:
+                self._flush_event.set()
+
+    def _swap_buffer(self) -> bytearray:
+        with self._lock:
+            pending, self._buffer = self._buffer, bytearray()
+        return pending
+
+    def _writer(self):
+        while not self._stop_event.is_set():
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            pending = self._swap_buffer()
+            if pending:
+                self._file.write(pending)
+                self._file.flush()
+                self.bytes_written += len(pending)
+
+    def stop(self):
+        """Flush outstanding frames, close the log and write its index"""
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._flush_event.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+
+        pending = self._swap_buffer()
+        self._file.write(pending)
+        self.bytes_written += len(pending)
+        self._file.close()
+
+        with self._lock:
+            np.savez(
+                index_path(self.path),
+                offsets=np.frombuffer(self._offsets, dtype=np.uint64),
+                msg_ids=np.frombuffer(self._msg_ids, dtype=np.uint32),
+                timestamps=np.frombuffer(self._timestamps, dtype=np.float64),
+                file_size=np.uint64(self._offset)
+            )
+        logger.info(f"Flight recorder stopped: {self.records} frames in {self.path}")
+
+    def get_info(self) -> Dict[str, object]:
+        return {
+            "path": self.path,
+            "records": self.records,
+            "bytes_written": self.bytes_written,
+            "recording": self._thread is not None
+        }
+
+
+class FlightLog:
+    """
+    Memory-mapped reader for a flight recorder log.
+
+    Uses the index written by FlightRecorder.stop(); if it is missing (e.g.
+    the recorder was killed or is still running) or does not match the log,
+    the index is rebuilt by walking record headers only, without decoding
+    any frames.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(FILE_MAGIC)] != FILE_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a flight recorder log")
+
+        index = self._load_index()
+        if index is None:
+            index = self._scan()
+        self.offsets, self.msg_ids, self.timestamps = index
+        self._by_type: Dict[int, np.ndarray] = {}
+
+    def _load_index(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """The saved index, or None if there is none or it describes a different file"""
+        if not os.path.exists(index_path(self.path)):
+            return None
+        with np.load(index_path(self.path)) as index:
+            if "file_size" not in index or int(index["file_size"]) != len(self._map):
+                logger.warning(f"Ignoring stale index of {self.path}, rebuilding it")
+                return None
+            offsets, msg_ids, timestamps = index["offsets"], index["msg_ids"], index["timestamps"]
+        if len(offsets):
+            # The last record must end exactly at the end of the log
+            last = int(offsets[-1])
+            if last + RECORD_HEADER.size > len(self._map) or \
+                    last + RECORD_HEADER.size + RECORD_HEADER.unpack_from(self._map, last)[2] != len(self._map):
+                logger.warning(f"Ignoring stale index of {self.path}, rebuilding it")
+                return None
+        return offsets, msg_ids, timestamps
+
+    def _scan(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rebuild the index from record headers"""
+        offsets, msg_ids, timestamps = array("Q"), array("I"), array("d")
+        offset, end = len(FILE_MAGIC), len(self._map)
+        while offset + RECORD_HEADER.size <= end:
+            timestamp, msg_id, length = RECORD_HEADER.unpack_from(self._map, offset)
+            if offset + RECORD_HEADER.size + length > end:
+                break  # Truncated final record
+            offsets.append(offset)
+            msg_ids.append(msg_id)
+            timestamps.append(timestamp)
+            offset += RECORD_HEADER.size + length
+        return (
+            np.frombuffer(offsets, dtype=np.uint64),
+            np.frombuffer(msg_ids, dtype=np.uint32),
+            np.frombuffer(timestamps, dtype=np.float64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def start_time(self) -> Optional[float]:
+        return float(self.timestamps[0]) if len(self.timestamps) else None
+
+    @property
+    def end_time(self) -> Optional[float]:
+        return float(self.timestamps[-1]) if len(self.timestamps) else None
+
+    def message_types(self) -> Dict[str, int]:
+        """Record count per message type name"""
+        ids, counts = np.unique(self.msg_ids, return_counts=True)
+        names = {}
+        for msg_id, count in zip(ids.tolist(), counts.tolist()):
+            message_class = mavutil.mavlink.mavlink_map.get(msg_id)
+            names[message_class.msgname if message_class else f"MSG_{msg_id}"] = count
+        return names
+
+    def _type_positions(self, message_type: str) -> np.ndarray:
+        """Record positions for one message type, cached per type"""
+        msg_id = getattr(mavutil.mavlink, f"MAVLINK_MSG_ID_{message_type}", None)
+        if msg_id is None:
+            return np.empty(0, dtype=np.int64)
+        positions = self._by_type.get(msg_id)
+        if positions is None:
+            positions = self._by_type[msg_id] = np.flatnonzero(self.msg_ids == msg_id)
+        return positions
+
+    def positions(self, message_type: Optional[str] = None, start: Optional[float] = None,
+                  end: Optional[float] = None) -> np.ndarray:
+        """Record positions matching a type and/or [start, end) receive-time range"""
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, start, side="left"))
+        last = len(self.timestamps) if end is None else int(np.searchsorted(self.timestamps, end, side="left"))
+        if message_type is None:
+            return np.arange(first, last)
+        positions = self._type_positions(message_type)
+        return positions[(positions >= first) & (positions < last)]
+
+    def frame(self, position: int) -> Tuple[float, memoryview]:
+        """Receive time and raw bytes of one record, without copying"""
+        offset = int(self.offsets[position])
+        timestamp, _, length = RECORD_HEADER.unpack_from(self._map, offset)
+        body = offset + RECORD_HEADER.size
+        return timestamp, memoryview(self._map)[body:body + length]
+
+    def frames(self, message_type: Optional[str] = None, start: Optional[float] = None,
+               end: Optional[float] = None) -> Iterator[Tuple[float, memoryview]]:
+        """Iterate raw frames, jumping straight to the requested type and time range"""
+        for position in self.positions(message_type, start, end).tolist():
+            yield self.frame(position)
+
+    def messages(self, message_type: Optional[str] = None, start: Optional[float] = None,
+                 end: Optional[float] = None) -> Iterator[Tuple[float, object]]:
+        """Iterate decoded messages as (receive time, MAVLink message) pairs"""
+        parser = mavutil.mavlink.MAVLink(None)
+        for timestamp, frame in self.frames(message_type, start, end):
+            data = bytearray(frame)
+            # Release the view right away so the map can be closed mid-iteration
+            frame.release()
+            try:
+                yield timestamp, parser.decode(data)
+            except mavutil.mavlink.MAVError as e:
+                logger.debug(f"Skipping undecodable frame at {timestamp}: {e}")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,175 @@
+"""
+3D Lidar Plot Buffer
+Single-producer ring buffer of lidar points with incremental (delta) reads for the 3D plot stream
+"""
+
+import asyncio
+import json
+import time
+import logging
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from telemetry_hub import telemetry_hub
+from telemetry_encoding import encode_binary, sse_data
+from telemetry_metrics import record_serialization
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Hub topic published whenever points are appended or the buffer is reset
+PLOT_TOPIC = "3D_PLOT"
+
+# Horizontal offset applied to lidar 1 so both sensors are visible side by side
+LIDAR_1_X_OFFSET = 0.2
+
+# Column layout of the ring buffer
+_X, _Y, _D0, _D1, _TIMESTAMP = range(5)
+PLOT_COLUMNS = ("x", "y", "d0", "d1", "timestamp")
+
+# (generation, total points appended); generation changes on every reset
+Cursor = Tuple[int, int]
+
+
+class LidarPlotBuffer:
+    """
+    Fixed-capacity, array-backed ring buffer of (x, y, d0, d1, timestamp) samples.
+
+    One producer appends; any number of readers pull only the points appended
+    since their own cursor. A reader whose cursor belongs to an older
+    generation, or has fallen out of the window, gets a full snapshot instead.
+    """
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self._points = np.zeros((capacity, 5), dtype=np.float64)
+        self._count = 0
+        self._generation = 0
+        self._lock = Lock()
+        # Caches keyed by encoding; clients in lockstep ask for the same range
+        self._encoded_keys: Dict[str, Tuple[int, int, int]] = {}
+        self._encoded: Dict[str, str] = {}
+
+    @property
+    def cursor(self) -> Cursor:
+        return (self._generation, self._count)
+
+    def append(self, x: float, y: float, d0: float, d1: float, timestamp: Optional[float] = None):
+        """Append one sample, overwriting the oldest once the buffer is full"""
+        with self._lock:
+            self._points[self._count % self.capacity] = (
+                x, y, d0, d1, time.time() if timestamp is None else timestamp
+            )
+            self._count += 1
+        telemetry_hub.publish(PLOT_TOPIC)
+
+    def reset(self):
+        """Drop all samples; readers receive an empty snapshot"""
+        with self._lock:
+            self._generation += 1
+            self._count = 0
+        telemetry_hub.publish(PLOT_TOPIC)
+
+    def _rows(self, start: int, end: int) -> np.ndarray:
+        """Samples with sequence numbers in [start, end), oldest first"""
+        if start >= end:
+            return self._points[:0]
+        first, last = start % self.capacity, end % self.capacity
+        if first < last:
+            return self._points[first:last].copy()
+        return np.concatenate((self._points[first:], self._points[:last]))
+
+    def read_since(self, cursor: Optional[Cursor], encoding: str = "json") -> Tuple[bool, Optional[str], Cursor]:
+        """
+        Encoded points appended since a reader's cursor
+
+        Args:
+            cursor: Cursor returned by the previous call, or None on connect
+            encoding: json (lidar_0/lidar_1 point lists), packed (raw rows, see
+                plot_schema) or msgpack (the JSON structure as MessagePack)
+
+        Returns:
+            Tuple[bool, Optional[str], Cursor]: Whether the payload is a full
+            snapshot, the SSE data (None if nothing new) and the new cursor
+        """
+        with self._lock:
+            generation, count = self._generation, self._count
+            snapshot = (
+                cursor is None
+                or cursor[0] != generation
+                or cursor[1] < count - self.capacity
+            )
+            start = max(0, count - self.capacity) if snapshot else cursor[1]
+            if not snapshot and start >= count:
+                return False, None, (generation, count)
+
+            key = (generation, start, count)
+            if key != self._encoded_keys.get(encoding):
+                started = time.perf_counter()
+                self._encoded[encoding] = self._encode(self._rows(start, count), encoding)
+                record_serialization(encoding, time.perf_counter() - started)
+                self._encoded_keys[encoding] = key
+            return snapshot, self._encoded[encoding], (generation, count)
+
+    def _encode(self, rows: np.ndarray, encoding: str) -> str:
+        if encoding == "packed":
+            return sse_data(np.ascontiguousarray(rows, dtype="<f8").tobytes())
+        if encoding == "msgpack":
+            return sse_data(encode_binary(self._to_plot_data(rows), encoding))
+        return json.dumps(self._to_plot_data(rows))
+
+    @staticmethod
+    def _to_plot_data(rows: np.ndarray) -> Dict[str, List[Dict[str, float]]]:
+        """Convert buffer rows to the lidar_0/lidar_1 point lists used by the frontend"""
+        lidar_0, lidar_1 = [], []
+        for x, y, d0, d1, timestamp in rows.tolist():
+            lidar_0.append({"x": x, "y": y, "z": d0, "timestamp": timestamp})
+            lidar_1.append({"x": x + LIDAR_1_X_OFFSET, "y": y, "z": d1, "timestamp": timestamp})
+        return {"lidar_0": lidar_0, "lidar_1": lidar_1}
+
+
+def plot_schema() -> Dict[str, object]:
+    """Layout of packed 3D plot payloads: rows of little-endian float64 columns"""
+    return {
+        "format": "<d",
+        "columns": list(PLOT_COLUMNS),
+        "lidar_1_x_offset": LIDAR_1_X_OFFSET
+    }
+
+
+async def sample_lidar_points(data_store, plot_buffer: LidarPlotBuffer, interval: float = 0.2):
+    """
+    Producer task: append one plot point per position update, at most every `interval` seconds
+
+    Args:
+        data_store: TelemetryStore holding the latest VISION_POSITION_ESTIMATE and DISTANCE_SENSOR_D0/D1
+        plot_buffer: Buffer to append samples to
+        interval: Minimum spacing between samples in seconds
+    """
+    subscription = telemetry_hub.subscribe(["VISION_POSITION_ESTIMATE"])
+    last_sample = 0.0
+    try:
+        while True:
+            await subscription.wait()
+            remaining = interval - (time.monotonic() - last_sample)
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                subscription.poll()
+
+            vision_pos = data_store.get("VISION_POSITION_ESTIMATE", {})
+            d0_data = data_store.get("DISTANCE_SENSOR_D0", {})
+            d1_data = data_store.get("DISTANCE_SENSOR_D1", {})
+            if vision_pos and d0_data and d1_data:
+                plot_buffer.append(
+                    vision_pos.get("x", 0),
+                    vision_pos.get("y", 0),
+                    d0_data.get("current_distance", 0),
+                    d1_data.get("current_distance", 0)
+                )
+                last_sample = time.monotonic()
+    except asyncio.CancelledError:
+        logger.info("3D plot sampler stopped")
+        raise
+    finally:
+        subscription.close()
@@ -0,0 +1,67 @@
+"""
+Link Deduplication
+Drops the second copy of a MAVLink frame that arrives over redundant links, using sequence numbers
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# A frame matching a recent one from the same sender is a duplicate only within
+# this many seconds; a sender's 8-bit sequence number wraps every 256 frames
+DEFAULT_WINDOW = 0.5
+
+# (message id, CRC, time accepted) per sequence number
+_Slot = Optional[Tuple[int, int, float]]
+
+
+class SequenceDeduplicator:
+    """
+    Recognises frames already accepted from another link.
+
+    Each sender (system id, component id) gets a 256-slot table indexed by
+    the frame's sequence number, holding the message id and CRC of the last
+    frame accepted with that number. A frame whose slot matches, accepted
+    less than `window` seconds ago, is the same frame seen again. The check
+    is a tuple lookup and compare and happens before anything is ingested,
+    so redundant links do not double the downstream work.
+
+    Not thread safe: all links must deliver on one thread (the event loop).
+    """
+
+    def __init__(self, window: float = DEFAULT_WINDOW):
+        self.window = window
+        self.accepted = 0
+        self.duplicates = 0
+        self._senders: Dict[Tuple[int, int], List[_Slot]] = {}
+
+    def accept(self, msg: Any) -> bool:
+        """True the first time a frame is seen, False for a copy from another link"""
+        return self.accept_frame(msg.get_srcSystem(), msg.get_srcComponent(), msg.get_seq(), msg.get_msgId(),
+                                 msg._crc)
+
+    def accept_frame(self, system_id: int, component_id: int, seq: int, msg_id: int, crc: int) -> bool:
+        """accept() for a frame known only by its header, e.g. one the dialect cannot decode"""
+        sender = (system_id, component_id)
+        slots = self._senders.get(sender)
+        if slots is None:
+            slots = self._senders[sender] = [None] * 256
+        now = time.monotonic()
+        frame = (msg_id, crc)
+        slot = slots[seq]
+        if slot is not None and slot[:2] == frame and now - slot[2] < self.window:
+            self.duplicates += 1
+            return False
+        slots[seq] = frame + (now,)
+        self.accepted += 1
+        return True
+
+    def clear(self):
+        self._senders = {}
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "window": self.window,
+            "accepted": self.accepted,
+            "duplicates": self.duplicates,
+            "senders": len(self._senders)
+        }
@@ -0,0 +1,205 @@
+"""
+Log Replay
+Plays a recorded flight (.tlog or flight recorder log) through the live telemetry pipeline
+"""
+
+import time
+import logging
+from threading import Thread, Event, Lock
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from pymavlink import mavutil
+from flight_recorder import FILE_MAGIC, FlightLog
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def is_flight_recorder_log(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(FILE_MAGIC)) == FILE_MAGIC
+
+
+def tlog_messages(path: str, start: Optional[float] = None) -> Iterator[Tuple[float, Any]]:
+    """Iterate (receive time, message) pairs from a .tlog, skipping to `start`"""
+    tlog = mavutil.mavlink_connection(path)
+    try:
+        while True:
+            msg = tlog.recv_match(blocking=False)
+            if msg is None:
+                return
+            if msg.get_type() == "BAD_DATA":
+                continue
+            timestamp = getattr(msg, "_timestamp", 0.0)
+            if start is not None and timestamp < start:
+                continue
+            yield timestamp, msg
+    finally:
+        tlog.close()
+
+
+class LogReplay:
+    """
+    Replays a recorded flight into a message handler at a chosen speed.
+
+    speed is a multiple of real time (1, 10, 100, ...); 0 replays as fast as
+    possible. Flight recorder logs seek through their index; .tlog files are
+    re-read from the start and skipped forward. Without `loop` the replay
+    thread waits at the end of the log, so a seek resumes playback.
+
+    Opening a .tlog reads it once for its time range, so construct a replay
+    off the event loop.
+    """
+
+    def __init__(self, path: str, handler: Callable[[Any], Any], speed: float = 1.0, loop: bool = False):
+        self.path = path
+        self.handler = handler
+        self.speed = speed
+        self.loop = loop
+        self.messages_replayed = 0
+        self._flight_log = FlightLog(path) if is_flight_recorder_log(path) else None
+        self.format = "flight_recorder" if self._flight_log is not None else "tlog"
+        self.at_end = False
+        self._start_time, self._end_time = self._time_range()
+        self._position = self._start_time
+        self._seek_to: Optional[float] = None
+        self._reanchor = False
+        self._lock = Lock()
+        self._stop_event = Event()
+        # Set by seek/speed changes and stop to cut a pacing wait short
+        self._interrupt = Event()
+        self._thread: Optional[Thread] = None
+
+    def _time_range(self) -> Tuple[float, float]:
+        if self._flight_log is not None:
+            return self._flight_log.start_time or 0.0, self._flight_log.end_time or 0.0
+        start = end = None
+        for timestamp, _ in tlog_messages(self.path):
+            if start is None:
+                start = timestamp
+            end = timestamp
+        return start or 0.0, end or 0.0
+
+    def _messages(self, start: float) -> Iterator[Tuple[float, Any]]:
+        if self._flight_log is not None:
+            return self._flight_log.messages(start=start)
+        return tlog_messages(self.path, start)
+
+    @property
+    def duration(self) -> float:
+        return self._end_time - self._start_time
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self):
+        """Start replaying in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+        logger.info(f"Replaying {self.path} at {f'{self.speed}x' if self.speed else 'maximum speed'}")
+
+    def stop(self):
+        """Stop replaying and release the log"""
+        self._stop_event.set()
+        self._interrupt.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._flight_log is not None:
+            self._flight_log.close()
+            self._flight_log = None
+        logger.info("Log replay stopped")
+
+    def seek(self, offset: float):
+        """Jump to `offset` seconds from the start of the log"""
+        with self._lock:
+            self._seek_to = self._start_time + min(max(offset, 0.0), self.duration)
+        self._interrupt.set()
+
+    def set_speed(self, speed: float):
+        """Change the replay speed; takes effect from the next message"""
+        with self._lock:
+            self.speed = speed
+            # Re-anchor the replay clock at the current position
+            self._reanchor = True
+        self._interrupt.set()
+
+    def _run(self):
+        position = self._start_time
+        while not self._stop_event.is_set():
+            restart_at = self._replay_from(position)
+            if restart_at is not None:
+                position = restart_at
+            elif self.loop:
+                position = self._start_time
+            else:
+                logger.info(f"Log replay reached the end after {self.messages_replayed} messages")
+                restart_at = self._wait_at_end()
+                if restart_at is None:
+                    break
+                position = restart_at
+        logger.info(f"Log replay finished after {self.messages_replayed} messages")
+
+    def _wait_at_end(self) -> Optional[float]:
+        """Park at the end of the log until a seek (returns its log time) or a stop (returns None)"""
+        self.at_end = True
+        try:
+            while not self._stop_event.is_set():
+                with self._lock:
+                    seek_to, self._seek_to = self._seek_to, None
+                if seek_to is not None:
+                    return seek_to
+                self._interrupt.wait()
+                self._interrupt.clear()
+            return None
+        finally:
+            self.at_end = False
+
+    def _replay_from(self, position: float) -> Optional[float]:
+        """
+        Replay from a log time until the end, a seek or a stop
+
+        Returns:
+            Optional[float]: Log time to restart from after a seek, else None
+        """
+        wall_anchor, log_anchor = time.monotonic(), position
+        for timestamp, msg in self._messages(position):
+            # Pace the message; control changes interrupt the wait and are re-evaluated
+            while True:
+                self._interrupt.clear()
+                with self._lock:
+                    seek_to, self._seek_to = self._seek_to, None
+                    reanchor, self._reanchor = self._reanchor, False
+                    speed = self.speed
+                if seek_to is not None:
+                    return seek_to
+                if self._stop_event.is_set():
+                    return None
+                if reanchor:
+                    wall_anchor, log_anchor = time.monotonic(), self._position
+
+                delay = wall_anchor + (timestamp - log_anchor) / speed - time.monotonic() if speed > 0 else 0
+                if delay <= 0 or not self._interrupt.wait(delay):
+                    break
+
+            self._position = timestamp
+            self.handler(msg)
+            self.messages_replayed += 1
+        return None
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "format": self.format,
+            "speed": self.speed,
+            "loop": self.loop,
+            "running": self.running,
+            "at_end": self.at_end,
+            "duration": self.duration,
+            "position": self._position - self._start_time,
+            "messages_replayed": self.messages_replayed
+        }
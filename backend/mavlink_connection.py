@@ -1,182 +0,0 @@
-"""
-MAVLink Connection Module
-Simulates real MAVLink communication with flight controllers
-"""
-
-import time
-import logging
-from typing import Optional, Dict, Any
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-class MAVLinkConnection:
-    """Simulates MAVLink connection to flight controller"""
-    
-    def __init__(self):
-        self.is_connected = False
-        self.device = None
-        self.baud_rate = None
-        self.system_id = 1
-        self.component_id = 1
-        self.connection_time = None
-        
-    def connect(self, device: str, baud_rate: int) -> bool:
-        """
-        Establish MAVLink connection to flight controller
-        
-        Args:
-            device: Serial device path (e.g., /dev/ttyUSB0)
-            baud_rate: Baud rate for serial communication
-            
-        Returns:
-            bool: True if connection successful, False otherwise
-        """
-        try:
-            logger.info(f"Establishing MAVLink connection to {device} at {baud_rate} baud")
-            
-            # Simulate connection process
-            time.sleep(0.5)  # Simulate connection delay
-            
-            # Simulate device detection
-            if not self._detect_device(device):
-                logger.error(f"Device {device} not found")
-                return False
-            
-            # Simulate baud rate negotiation
-            if not self._negotiate_baud_rate(baud_rate):
-                logger.error(f"Failed to negotiate baud rate {baud_rate}")
-                return False
-            
-            # Simulate MAVLink handshake
-            if not self._perform_handshake():
-                logger.error("MAVLink handshake failed")
-                return False
-            
-            # Connection successful
-            self.is_connected = True
-            self.device = device
-            self.baud_rate = baud_rate
-            self.connection_time = time.time()
-            
-            logger.info(f"MAVLink connection established to {device}")
-            logger.info(f"System ID: {self.system_id}, Component ID: {self.component_id}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Connection failed: {str(e)}")
-            return False
-    
-    def disconnect(self):
-        """Disconnect from flight controller"""
-        if self.is_connected:
-            logger.info(f"Disconnecting from {self.device}")
-            self.is_connected = False
-            self.device = None
-            self.baud_rate = None
-            self.connection_time = None
-            logger.info("MAVLink connection closed")
-    
-    def _detect_device(self, device: str) -> bool:
-        """Simulate device detection"""
-        logger.info(f"Detecting device: {device}")
-        time.sleep(0.1)
-        # Simulate device detection (always successful in simulation)
-        return True
-    
-    def _negotiate_baud_rate(self, baud_rate: int) -> bool:
-        """Simulate baud rate negotiation"""
-        logger.info(f"Negotiating baud rate: {baud_rate}")
-        time.sleep(0.1)
-        # Simulate baud rate negotiation (always successful in simulation)
-        return True
-    
-    def _perform_handshake(self) -> bool:
-        """Simulate MAVLink handshake"""
-        logger.info("Performing MAVLink handshake")
-        time.sleep(0.2)
-        
-        # Simulate sending MAVLink handshake messages
-        logger.info("Sending MAV_CMD_PREFLIGHT_CALIBRATION")
-        time.sleep(0.1)
-        logger.info("Receiving MAV_CMD_PREFLIGHT_CALIBRATION response")
-        time.sleep(0.1)
-        
-        # Simulate successful handshake
-        return True
-    
-    def send_message(self, message_type: str, data: Dict[str, Any]) -> bool:
-        """
-        Send MAVLink message to flight controller
-        
-        Args:
-            message_type: Type of MAVLink message
-            data: Message data
-            
-        Returns:
-            bool: True if message sent successfully
-        """
-        if not self.is_connected:
-            logger.error("Cannot send message: not connected")
-            return False
-        
-        try:
-            logger.debug(f"Sending {message_type}: {data}")
-            # Simulate message transmission
-            time.sleep(0.01)
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send {message_type}: {str(e)}")
-            return False
-    
-    def receive_message(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
-        """
-        Receive MAVLink message from flight controller
-        
-        Args:
-            timeout: Timeout in seconds
-            
-        Returns:
-            Optional[Dict]: Received message or None if timeout
-        """
-        if not self.is_connected:
-            logger.error("Cannot receive message: not connected")
-            return None
-        
-        try:
-            # Simulate message reception
-            time.sleep(0.01)
-            # In simulation, we don't actually receive messages
-            # The simulated_mavlink module handles message generation
-            return None
-        except Exception as e:
-            logger.error(f"Failed to receive message: {str(e)}")
-            return None
-    
-    def get_connection_info(self) -> Dict[str, Any]:
-        """Get connection information"""
-        if self.is_connected:
-            return {
-                "connected": True,
-                "device": self.device,
-                "baud_rate": self.baud_rate,
-                "system_id": self.system_id,
-                "component_id": self.component_id,
-                "connection_time": self.connection_time,
-                "uptime": time.time() - self.connection_time if self.connection_time else 0
-            }
-        else:
-            return {
-                "connected": False,
-                "device": None,
-                "baud_rate": None,
-                "system_id": None,
-                "component_id": None,
-                "connection_time": None,
-                "uptime": 0
-            }
-
-# Global connection instance
-mavlink_connection = MAVLinkConnection() 
\ No newline at end of file
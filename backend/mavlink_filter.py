@@ -0,0 +1,87 @@
+"""
+MAVLink Message Filter
+Parser-level filtering that frames and checksums every message but only unpacks the types in use
+"""
+
+import sys
+import logging
+from typing import Iterable, Set
+from pymavlink import mavutil
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Types mavutil itself reads (target ids, flight mode, params, home) are always decoded
+ALWAYS_DECODED = {"HEARTBEAT", "HIGH_LATENCY2", "PARAM_VALUE", "GPS_RAW_INT"}
+
+
+class SkippedMessage(mavutil.mavlink.MAVLink_message):
+    """
+    A frame of a type nobody uses: checksummed but never unpacked.
+
+    Keeps the real id, name, header and raw frame, so sequence tracking
+    and the flight recorder see it like any other message, but it has no
+    payload fields.
+    """
+
+    def __init__(self, msg_id: int, name: str, msgbuf: bytearray, header, crc: int, payload_start: int,
+                 payload_end: int):
+        super().__init__(msg_id, name)
+        self._fieldnames = []
+        self._msgbuf = msgbuf
+        self._payload = msgbuf[payload_start:payload_end]
+        self._crc = crc
+        self._header = header
+
+
+def filter_messages(mav, message_types: Iterable[str]) -> Set[int]:
+    """
+    Make a pymavlink MAVLink parser unpack only the given message types
+
+    Frames of every other known type are still length and CRC checked, so
+    corrupt data is reported as BAD_DATA exactly as before, but come out as
+    SkippedMessage without building the message object. Signed links are
+    always decoded in full.
+
+    Args:
+        mav: MAVLink parser (e.g. master.mav of a mavutil connection)
+        message_types: Type names to decode, in addition to ALWAYS_DECODED
+
+    Returns:
+        Set[int]: Message ids that are still decoded
+    """
+    dialect = sys.modules[type(mav).__module__]
+    names = set(message_types) | ALWAYS_DECODED
+    wanted = {msg_id for msg_id, msgtype in dialect.mavlink_map.items() if msgtype.msgname in names}
+    decode = mav.decode
+
+    def filtered_decode(msgbuf: bytearray):
+        if msgbuf[0] == dialect.PROTOCOL_MARKER_V1:
+            header_len, msg_id, incompat_flags, compat_flags = 6, msgbuf[5], 0, 0
+            seq, src_system, src_component = msgbuf[2], msgbuf[3], msgbuf[4]
+        else:
+            header_len, msg_id = 10, msgbuf[7] | (msgbuf[8] << 8) | (msgbuf[9] << 16)
+            incompat_flags, compat_flags = msgbuf[2], msgbuf[3]
+            seq, src_system, src_component = msgbuf[4], msgbuf[5], msgbuf[6]
+        msgtype = dialect.mavlink_map.get(msg_id)
+        if msg_id in wanted or msgtype is None or mav.signing.secret_key is not None:
+            return decode(msgbuf)
+
+        signature_len = dialect.MAVLINK_SIGNATURE_BLOCK_LEN if incompat_flags & dialect.MAVLINK_IFLAG_SIGNED else 0
+        payload_end = len(msgbuf) - 2 - signature_len
+        crc = msgbuf[payload_end] | (msgbuf[payload_end + 1] << 8)
+        crcbuf = msgbuf[1:payload_end]
+        crcbuf.append(msgtype.crc_extra)
+        if msgbuf[1] != payload_end - header_len or (
+                crc != dialect.x25crc(crcbuf).crc and not dialect.MAVLINK_IGNORE_CRC):
+            # Let the full decoder raise the usual error for the BAD_DATA message
+            return decode(msgbuf)
+
+        header = dialect.MAVLink_header(msg_id, incompat_flags, compat_flags, msgbuf[1], seq, src_system, src_component)
+        return SkippedMessage(msg_id, msgtype.msgname, msgbuf, header, crc, header_len, payload_end)
+
+    # Instance attribute, so only this parser is affected
+    mav.decode = filtered_decode
+    logger.info(f"Decoding {len(wanted)} of {len(dialect.mavlink_map)} MAVLink message types")
+    return wanted
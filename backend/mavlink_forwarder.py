@@ -0,0 +1,300 @@
+"""
+MAVLink Forwarder
+Router mode: relays the raw bytes of received frames to other ground stations over UDP or TCP
+"""
+
+import os
+import time
+import errno
+import select
+import socket
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from pymavlink import mavutil
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Frames are sent together once this many bytes are pending (one UDP datagram below a typical MTU)
+MAX_BATCH_BYTES = 1400
+
+# Bytes kept for a TCP endpoint that cannot take them yet; beyond this frames are dropped
+MAX_TCP_BACKLOG = 64 * 1024
+
+# Seconds between reconnect attempts to a TCP endpoint
+RECONNECT_INTERVAL = 2.0
+
+
+class _Endpoint:
+    """One forwarding destination and its counters"""
+
+    def __init__(self, spec: str, host: str, port: int):
+        self.spec = spec
+        # Resolved once here, so sends never wait on name lookups
+        try:
+            self.address = (socket.gethostbyname(host), port)
+        except OSError as e:
+            raise ValueError(f"Cannot resolve forwarding endpoint '{spec}': {e}")
+        self.packets = 0
+        self.bytes = 0
+        self.sends = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def send(self, frames: List[bytes], size: int):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "endpoint": self.spec,
+            "packets": self.packets,
+            "bytes": self.bytes,
+            "sends": self.sends,
+            "errors": self.errors,
+            "dropped": self.dropped
+        }
+
+
+class _UdpEndpoint(_Endpoint):
+    def __init__(self, spec: str, host: str, port: int):
+        super().__init__(spec, host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def send(self, frames: List[bytes], size: int):
+        try:
+            # Gather write: one datagram straight from the frame buffers, no join
+            self.sock.sendmsg(frames, (), 0, self.address)
+        except OSError:
+            self.errors += 1
+            self.dropped += len(frames)
+            return
+        self.sends += 1
+        self.packets += len(frames)
+        self.bytes += size
+
+    def close(self):
+        self.sock.close()
+
+
+class _TcpEndpoint(_Endpoint):
+    """Client connection to a listening ground station, reconnected when it goes away"""
+
+    def __init__(self, spec: str, host: str, port: int):
+        super().__init__(spec, host, port)
+        self.sock: Optional[socket.socket] = None
+        self._connecting = False
+        # Frames accepted but not yet taken by the kernel; the first may be the tail of a partly sent frame
+        self._backlog: List[bytes] = []
+        self._backlog_size = 0
+        self._next_attempt = 0.0
+
+    def _connect(self) -> bool:
+        """True once connected; never waits, a pending connect is finished by a later call"""
+        if self.sock is not None and not self._connecting:
+            return True
+        if self.sock is None:
+            now = time.monotonic()
+            if now < self._next_attempt:
+                return False
+            self._next_attempt = now + RECONNECT_INTERVAL
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setblocking(False)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._connecting = True
+            error = self.sock.connect_ex(self.address)
+            if error not in (0, errno.EINPROGRESS):
+                return self._connect_failed(error)
+        # Writable means the connect finished, successfully or not
+        _, writable, _ = select.select([], [self.sock], [], 0)
+        if not writable:
+            return False
+        error = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            return self._connect_failed(error)
+        self._connecting = False
+        logger.info(f"Forwarding to {self.spec}")
+        return True
+
+    def _connect_failed(self, error: int) -> bool:
+        self.errors += 1
+        logger.warning(f"Forwarding to {self.spec} unavailable: {os.strerror(error)}")
+        self.close()
+        return False
+
+    def send(self, frames: List[bytes], size: int):
+        if not self._connect():
+            self.dropped += len(frames)
+            return
+        buffers = self._backlog + frames if self._backlog else frames
+        try:
+            sent = self.sock.sendmsg(buffers)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self.errors += 1
+            self.dropped += len(buffers)
+            self.close()
+            return
+        self.sends += 1
+        self.bytes += sent
+        # Count the frames that went out whole and keep the rest, copying only the unsent tail
+        for index, buffer in enumerate(buffers):
+            if sent < len(buffer):
+                break
+            sent -= len(buffer)
+            self.packets += 1
+        else:
+            self._backlog, self._backlog_size = [], 0
+            return
+        rest = buffers[index:]
+        if sent:
+            rest[0] = bytes(memoryview(buffer)[sent:])
+        rest_size = sum(len(buffer) for buffer in rest)
+        if rest_size > MAX_TCP_BACKLOG:
+            # The ground station stopped reading; start over on a fresh connection
+            self.dropped += len(rest)
+            self.close()
+            return
+        self._backlog, self._backlog_size = rest, rest_size
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self._connecting = False
+        self._backlog, self._backlog_size = [], 0
+
+
+def unknown_frame_header(data: bytes) -> Optional[Tuple[int, int, int, int, int]]:
+    """
+    Header of a chunk that is a whole frame of a message id the dialect does not know
+
+    Such frames cannot be CRC checked or decoded here, but a ground station
+    with the right dialect can use them, so the router still relays them.
+    Chunks of known ids are corrupt frames and are not relayed.
+
+    Returns:
+        Optional[Tuple[int, int, int, int, int]]: (system id, component id,
+            sequence, message id, CRC), or None if the chunk is not such a frame
+    """
+    if len(data) >= 12 and data[0] == mavutil.mavlink.PROTOCOL_MARKER_V2:
+        signed = data[2] & mavutil.mavlink.MAVLINK_IFLAG_SIGNED
+        payload_end = 10 + data[1]
+        expected = payload_end + 2 + (mavutil.mavlink.MAVLINK_SIGNATURE_BLOCK_LEN if signed else 0)
+        header = (data[5], data[6], data[4], data[7] | (data[8] << 8) | (data[9] << 16))
+    elif len(data) >= 8 and data[0] == mavutil.mavlink.PROTOCOL_MARKER_V1:
+        payload_end = 6 + data[1]
+        expected = payload_end + 2
+        header = (data[3], data[4], data[2], data[5])
+    else:
+        return None
+    if len(data) != expected or header[3] in mavutil.mavlink.mavlink_map:
+        return None
+    return header + (data[payload_end] | (data[payload_end + 1] << 8),)
+
+
+def unknown_frame(msg: Any) -> Optional[Tuple[bytes, Tuple[int, int, int, int, int]]]:
+    """
+    Raw bytes and header (see unknown_frame_header) of a parsed message that is
+    a frame of a message id the dialect does not know, or None for any other message
+
+    pymavlink hands such frames out as UNKNOWN_<id> messages (BAD_DATA in older
+    releases); neither carries the usual header fields or CRC.
+    """
+    msg_type = msg.get_type()
+    if msg_type == "BAD_DATA":
+        data = bytes(msg.data)
+    elif msg_type.startswith("UNKNOWN_"):
+        data = bytes(msg.get_msgbuf())
+    else:
+        return None
+    header = unknown_frame_header(data)
+    return None if header is None else (data, header)
+
+
+def parse_endpoint(spec: str) -> _Endpoint:
+    """
+    Build an endpoint from a udpout:host:port (or udp:host:port) or tcp:host:port string
+    """
+    kind, _, address = spec.partition(":")
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid forwarding endpoint '{spec}', expected udpout:host:port or tcp:host:port")
+    if kind in ("udp", "udpout"):
+        return _UdpEndpoint(spec, host, int(port))
+    if kind == "tcp":
+        return _TcpEndpoint(spec, host, int(port))
+    raise ValueError(f"Unsupported forwarding endpoint '{spec}', expected udpout:host:port or tcp:host:port")
+
+
+class MavlinkForwarder:
+    """
+    Relays received frames, as the original bytes, to a set of endpoints.
+    Frames of message ids the dialect does not know are relayed too (see
+    unknown_frame_header).
+
+    forward() only appends a reference to the frame's buffer; frames are
+    handed to the kernel together by flush() (and automatically once
+    MAX_BATCH_BYTES are pending) with one scatter/gather sendmsg per
+    endpoint, so forwarding costs the ingest loop a list append per frame
+    and a few syscalls per batch. Sockets are non-blocking: a slow or
+    missing ground station loses frames, it never stalls ingest.
+
+    Used from the single thread (or event loop) that reads the link.
+    """
+
+    def __init__(self, endpoints: List[str]):
+        self._frames: List[bytes] = []
+        self._size = 0
+        self.endpoints: List[_Endpoint] = []
+        try:
+            for spec in endpoints:
+                self.endpoints.append(parse_endpoint(spec))
+        except ValueError:
+            # Do not leave the sockets of the endpoints before a bad one open
+            self.close()
+            raise
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._frames)
+
+    def forward(self, frame: bytes):
+        """Queue one raw frame for the next batch"""
+        self._frames.append(frame)
+        self._size += len(frame)
+        if self._size >= MAX_BATCH_BYTES:
+            self.flush()
+
+    def flush(self):
+        """Send every pending frame to every endpoint"""
+        if not self._frames:
+            return
+        frames, size = self._frames, self._size
+        self._frames, self._size = [], 0
+        for endpoint in self.endpoints:
+            endpoint.send(frames, size)
+
+    def close(self):
+        self.flush()
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+    def get_info(self) -> List[Dict[str, Any]]:
+        return [endpoint.get_info() for endpoint in self.endpoints]
+
+
+def create_forwarder(endpoints: Optional[str]) -> Optional[MavlinkForwarder]:
+    """
+    Forwarder for a comma separated endpoint list, or None when the list is empty
+
+    Raises:
+        ValueError: On a malformed endpoint
+    """
+    specs = [spec.strip() for spec in (endpoints or "").split(",") if spec.strip()]
+    return MavlinkForwarder(specs) if specs else None
@@ -1,172 +1,429 @@
-import random
+"""
+Simulated MAVLink
+Seeded flight simulator with per-type message rates and any number of vehicles
+"""
+
+import math
 import time
+import heapq
 from threading import Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from telemetry_store import telemetry_store
+from telemetry_ingest import ingest
+
+# Messages per second of each simulated store key, per vehicle
+DEFAULT_RATES = {
+    "HEARTBEAT": 1.0,
+    "BATTERY_STATUS": 2.0,
+    "EKF_STATUS_REPORT": 2.0,
+    "AHRS2": 50.0,
+    "GPS": 5.0,
+    "VISION_POSITION_ESTIMATE": 30.0,
+    "VISION_SPEED_ESTIMATE": 30.0,
+    "DISTANCE_SENSOR_D0": 20.0,
+    "DISTANCE_SENSOR_D1": 20.0,
+}
+
+# Local origin of the simulated flights and the ground altitude there (m AMSL)
+ORIGIN_LAT = 28.6139
+ORIGIN_LON = 77.209
+GROUND_ALT = 200.0
+
+METERS_PER_DEGREE = 111320.0
+GRAVITY = 9.81
+
+# Battery pack of every vehicle
+BATTERY_CAPACITY_MAH = 5000.0
+BATTERY_FULL_V = 16.8
+BATTERY_EMPTY_V = 13.2
+
+# Attitude, velocities, horizontal and vertical position all healthy (EKF_STATUS_FLAGS)
+EKF_HEALTHY_FLAGS = 0x37F
+
+# Rangefinder limits in cm, as reported by DISTANCE_SENSOR
+RANGE_MIN_CM = 5
+RANGE_MAX_CM = 1200
+
+
+class FlightModel:
+    """
+    Closed-form kinematics of a fleet of multirotors, one array element per vehicle.
+
+    Every vehicle circles its own centre at a constant ground speed while its
+    height above ground bobs slowly; the parameters are drawn once from the
+    seed. state(t) evaluates all vehicles at once with NumPy and depends only
+    on t, so the same seed gives the same flight however often it is sampled.
+    Positions are metres east/north of the origin, heights metres above ground.
+    """
+
+    def __init__(self, vehicles: int, rng: np.random.Generator):
+        self.vehicles = vehicles
+        self.centre_east = rng.uniform(-50.0, 50.0, vehicles)
+        self.centre_north = rng.uniform(-50.0, 50.0, vehicles)
+        self.radius = rng.uniform(5.0, 20.0, vehicles)
+        self.speed = rng.uniform(1.0, 4.0, vehicles)
+        # Signed turn rate in rad/s, positive counter-clockwise seen from above
+        self.turn_rate = rng.choice([-1.0, 1.0], vehicles) * self.speed / self.radius
+        self.phase = rng.uniform(0.0, 2 * math.pi, vehicles)
+        self.height = rng.uniform(5.0, 15.0, vehicles)
+        self.bob = rng.uniform(0.2, 1.0, vehicles)
+        self.bob_rate = rng.uniform(0.1, 0.3, vehicles)
+        self.bob_phase = rng.uniform(0.0, 2 * math.pi, vehicles)
+        # Constant over a circle: bank into the turn, nose down to hold the speed
+        self.roll = np.arctan(-self.turn_rate * self.speed / GRAVITY)
+        self.pitch = -np.arctan(0.05 * self.speed)
+        # Pack current while flying, in A
+        self.current = 12.0 + 2.0 * self.speed
+
+    def state(self, t: float) -> Dict[str, np.ndarray]:
+        """Position, velocity and attitude of every vehicle at `t` seconds"""
+        angle = self.phase + self.turn_rate * t
+        cos, sin = np.cos(angle), np.sin(angle)
+        bob_angle = self.bob_phase + self.bob_rate * t
+        v_east = -self.radius * self.turn_rate * sin
+        v_north = self.radius * self.turn_rate * cos
+        return {
+            "east": self.centre_east + self.radius * cos,
+            "north": self.centre_north + self.radius * sin,
+            "height": self.height + self.bob * np.sin(bob_angle),
+            "v_east": v_east,
+            "v_north": v_north,
+            "climb": self.bob * self.bob_rate * np.cos(bob_angle),
+            # Heading of the velocity, clockwise from north
+            "yaw": np.arctan2(v_east, v_north),
+        }
+
 
 class SimulatedMAVLink:
-    """Simulates MAVLink communication with realistic message structures"""
-    
-    def __init__(self):
-        self.data_store = {}
+    """
+    Simulates MAVLink communication with realistic message structures.
+
+    Each store key has its own rate; sample k of a type is taken at exactly
+    k / rate seconds of simulated time, so the stream of values only depends
+    on the seed, the rates and the number of vehicles. Sensor noise comes
+    from a separate generator per type for the same reason. Vehicles are
+    systems 1..N (component 1) and are generated together as arrays.
+
+    Args:
+        interval: Legacy fixed round: every type at 1 / interval Hz (overrides `rates`)
+        seed: Random seed; None picks one, reported as `seed` so the run can be repeated
+        vehicles: Number of simulated vehicles
+        rates: Messages per second per store key (defaults to DEFAULT_RATES); 0 disables a type
+        speed: Simulated seconds per wall-clock second in the background thread,
+            0 = as fast as possible
+    """
+
+    def __init__(self, interval: Optional[float] = None, seed: Optional[int] = 0, vehicles: int = 1,
+                 rates: Optional[Dict[str, float]] = None, speed: float = 1.0):
+        rates = dict(DEFAULT_RATES if rates is None else rates)
+        unknown = [key for key in rates if key not in DEFAULT_RATES]
+        if unknown:
+            raise ValueError(f"Cannot simulate {', '.join(unknown)}, expected some of {', '.join(DEFAULT_RATES)}")
+        if interval:
+            rates = dict.fromkeys(rates, 1.0 / interval)
+        if vehicles < 1 or speed < 0 or any(rate < 0 for rate in rates.values()):
+            raise ValueError("vehicles must be >= 1, speed and rates must be >= 0")
+        self.interval = interval
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.vehicles = vehicles
+        self.rates = {key: float(rate) for key, rate in rates.items() if rate > 0}
+        self.speed = speed
+        self.messages_sent = 0
         self.is_running = False
         self.simulation_thread = None
-        
+        self._builders: Dict[str, Callable[[float, Dict[str, np.ndarray], np.random.Generator], List[Dict]]] = {
+            "HEARTBEAT": self._heartbeat,
+            "BATTERY_STATUS": self._battery_status,
+            "EKF_STATUS_REPORT": self._ekf_status_report,
+            "AHRS2": self._ahrs2,
+            "GPS": self._gps,
+            "VISION_POSITION_ESTIMATE": self._vision_position_estimate,
+            "VISION_SPEED_ESTIMATE": self._vision_speed_estimate,
+            "DISTANCE_SENSOR_D0": lambda t, s, rng: self._distance_sensor(t, s, rng, 0),
+            "DISTANCE_SENSOR_D1": lambda t, s, rng: self._distance_sensor(t, s, rng, 1),
+        }
+        self.reset()
+
+    @property
+    def message_rate(self) -> float:
+        """Messages per second generated at speed 1"""
+        return sum(self.rates.values()) * self.vehicles
+
+    def reset(self):
+        """Restart the simulated flight from t = 0 with fresh generators"""
+        self.model = FlightModel(self.vehicles, self._rng(0))
+        # Stable per-type streams, independent of which types are enabled
+        self._noise = {key: self._rng(index + 1) for index, key in enumerate(DEFAULT_RATES)}
+        self._state_time: Optional[float] = None
+        self._state: Dict[str, np.ndarray] = {}
+
+    def _rng(self, stream: int) -> np.random.Generator:
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(stream,)))
+
     def start_simulation(self):
         """Start the simulated MAVLink data generation"""
         if not self.is_running:
+            self.reset()
             self.is_running = True
             self.simulation_thread = Thread(target=self._simulate_mavlink_data, daemon=True)
             self.simulation_thread.start()
-            print("Simulated MAVLink data generation started")
-    
+            print(f"Simulated MAVLink data generation started ({self.vehicles} vehicles, "
+                  f"{self.message_rate:.0f} msgs/s, seed {self.seed})")
+
     def stop_simulation(self):
         """Stop the simulated MAVLink data generation"""
         self.is_running = False
         if self.simulation_thread:
             self.simulation_thread.join(timeout=1)
         print("Simulated MAVLink data generation stopped")
-    
+
+    def _schedule(self) -> Iterator[Tuple[float, str]]:
+        """(simulated time, store key) of every sample, in time order"""
+        heap = [(0.0, index, key) for index, key in enumerate(self.rates)]
+        heapq.heapify(heap)
+        counts = dict.fromkeys(self.rates, 0)
+        while heap:
+            t, index, key = heap[0]
+            counts[key] += 1
+            heapq.heapreplace(heap, (counts[key] / self.rates[key], index, key))
+            yield t, key
+
     def _simulate_mavlink_data(self):
         """Simulate MAVLink message generation"""
-        while self.is_running:
-            # Simulate HEARTBEAT message
-            self.data_store["HEARTBEAT"] = {
-                "mavpackettype": "HEARTBEAT",
-                "type": 2,  # MAV_TYPE_QUADROTOR
-                "autopilot": 3,  # MAV_AUTOPILOT_ARDUPILOTMEGA
-                "base_mode": 81,
-                "custom_mode": 0,
-                "system_status": 3 if random.random() > 0.1 else 4,  # MAV_STATE_ACTIVE/STANDBY
-                "mavlink_version": 3
-            }
-            
-            # Simulate BATTERY_STATUS message
-            self.data_store["BATTERY_STATUS"] = {
-                "mavpackettype": "BATTERY_STATUS",
-                "voltages": [random.randint(12000, 17000)] + [65535]*9,  # First cell + 9 unused
-                "current_consumed": random.randint(1000, 5000),
-                "energy_consumed": random.randint(50000, 200000),
-                "temperature": random.randint(20, 40),
-                "current": random.uniform(0.5, 2.0),
-                "id": 0,
-                "battery_function": 0,  # MAV_BATTERY_FUNCTION_UNKNOWN
-                "type": 0,  # MAV_BATTERY_TYPE_UNKNOWN
-                "charge_state": 1,  # MAV_BATTERY_CHARGE_STATE_OK
-                "time_remaining": random.randint(300, 1800),
-                "voltage": random.uniform(12.0, 16.8)
-            }
-            
-            # Simulate EKF_STATUS_REPORT message
-            self.data_store["EKF_STATUS_REPORT"] = {
-                "mavpackettype": "EKF_STATUS_REPORT",
-                "flags": random.randint(200, 255),
-                "velocity_variance": random.uniform(0.01, 0.1),
-                "pos_horiz_variance": random.uniform(0.01, 0.1),
-                "pos_vert_variance": random.uniform(0.01, 0.1),
-                "compass_variance": random.uniform(0.01, 0.1),
-                "terrain_alt_variance": random.uniform(0.01, 0.1),
-                "airspeed_variance": random.uniform(0.01, 0.1)
-            }
-            
-            # Simulate AHRS2 message (Attitude and Heading Reference System)
-            self.data_store["AHRS2"] = {
-                "mavpackettype": "AHRS2",
-                "roll": random.uniform(-0.5, 0.5),  # Roll in radians
-                "pitch": random.uniform(-0.5, 0.5),  # Pitch in radians
-                "yaw": random.uniform(-3.14, 3.14),  # Yaw in radians
-                "altitude": random.uniform(200, 220),
-                "lat": 28.6139 + random.uniform(-0.001, 0.001),
-                "lng": 77.209 + random.uniform(-0.001, 0.001)
-            }
-            
-            # Simulate GPS_RAW_INT message
-            self.data_store["GPS"] = {
-                "mavpackettype": "GPS_RAW_INT",
-                "time_usec": int(time.time() * 1000000),
-                "fix_type": 3,  # GPS_FIX_TYPE_3D
-                "lat": 28.6139 + random.uniform(-0.001, 0.001),
-                "lon": 77.209 + random.uniform(-0.001, 0.001),
-                "alt": random.uniform(200, 220),
-                "eph": random.uniform(1.0, 5.0),  # GPS HDOP
-                "epv": random.uniform(1.0, 5.0),  # GPS VDOP
-                "vel": random.uniform(0, 10),  # GPS ground speed
-                "cog": random.uniform(0, 360),  # Course over ground
-                "satellites_visible": random.randint(8, 12),
-                "alt_ellipsoid": random.uniform(200, 220),
-                "h_acc": random.uniform(1.0, 5.0),  # Position uncertainty
-                "v_acc": random.uniform(1.0, 5.0),  # Altitude uncertainty
-                "vel_acc": random.uniform(0.1, 1.0),  # Speed uncertainty
-                "hdg_acc": random.uniform(1.0, 10.0)  # Heading uncertainty
-            }
-            
-            # Simulate VISION_POSITION_ESTIMATE message
-            self.data_store["VISION_POSITION_ESTIMATE"] = {
-                "mavpackettype": "VISION_POSITION_ESTIMATE",
-                "usec": int(time.time() * 1000000),
-                "x": random.uniform(-2, 2),
-                "y": random.uniform(-2, 2),
-                "z": random.uniform(-2, 2),
-                "roll": random.uniform(-0.1, 0.1),
-                "pitch": random.uniform(-0.1, 0.1),
-                "yaw": random.uniform(-3.14, 3.14),
-                "covariance": [0.01] * 21  # 6x6 covariance matrix flattened
-            }
-            
-            # Simulate VISION_SPEED_ESTIMATE message
-            self.data_store["VISION_SPEED_ESTIMATE"] = {
-                "mavpackettype": "VISION_SPEED_ESTIMATE",
-                "usec": int(time.time() * 1000000),
-                "x": random.uniform(-0.5, 0.5),
-                "y": random.uniform(-0.5, 0.5),
-                "z": random.uniform(-0.1, 0.1),
-                "covariance": [0.01] * 9  # 3x3 covariance matrix flattened
-            }
-            
-            # Simulate DISTANCE_SENSOR messages for two sensors
-            self.data_store["DISTANCE_SENSOR_D0"] = {
-                "mavpackettype": "DISTANCE_SENSOR",
-                "time_boot_ms": int(time.time() * 1000),
-                "min_distance": 5,
-                "max_distance": 1200,
-                "current_distance": random.randint(10, 100),
-                "type": 0,  # MAV_DISTANCE_SENSOR_LASER
-                "id": 0,
-                "orientation": 0,  # MAV_SENSOR_ORIENTATION_NONE
-                "covariance": 0.0,
-                "horizontal_fov": 0.0,
-                "vertical_fov": 0.0,
-                "quaternion": [0.0, 0.0, 0.0, 0.0],
-                "signal_quality": random.randint(0, 100)
-            }
-            
-            self.data_store["DISTANCE_SENSOR_D1"] = {
-                "mavpackettype": "DISTANCE_SENSOR",
-                "time_boot_ms": int(time.time() * 1000),
-                "min_distance": 5,
-                "max_distance": 1200,
-                "current_distance": random.randint(10, 100),
-                "type": 0,  # MAV_DISTANCE_SENSOR_LASER
-                "id": 1,
-                "orientation": 0,  # MAV_SENSOR_ORIENTATION_NONE
-                "covariance": 0.0,
-                "horizontal_fov": 0.0,
-                "vertical_fov": 0.0,
-                "quaternion": [0.0, 0.0, 0.0, 0.0],
-                "signal_quality": random.randint(0, 100)
-            }
-            
-            time.sleep(0.1)  # Update every 100ms
-    
+        start = time.monotonic()
+        for t, message_type in self._schedule():
+            if self.speed > 0:
+                # Samples falling behind are sent straight away rather than skipped
+                delay = start + t / self.speed - time.monotonic()
+                while delay > 0 and self.is_running:
+                    time.sleep(min(delay, 0.1))
+                    delay = start + t / self.speed - time.monotonic()
+            if not self.is_running:
+                return
+            self._emit(message_type, t)
+
+    def run(self, seconds: float) -> int:
+        """
+        Generate `seconds` of simulated telemetry on the calling thread, as fast as possible
+
+        Starts from t = 0, so the same seed always produces the same messages.
+
+        Returns:
+            int: Number of messages ingested
+        """
+        self.reset()
+        count = 0
+        for t, message_type in self._schedule():
+            if t >= seconds:
+                break
+            count += self._emit(message_type, t)
+        return count
+
+    def _emit(self, message_type: str, t: float) -> int:
+        if t != self._state_time:
+            # Types sampled at the same instant share one evaluation of the model
+            self._state_time, self._state = t, self.model.state(t)
+        messages = self._builders[message_type](t, self._state, self._noise[message_type])
+        for index, msg in enumerate(messages):
+            self._update(message_type, msg, index + 1, 1)
+        self.messages_sent += len(messages)
+        return len(messages)
+
+    def _heartbeat(self, t: float, state: Dict[str, np.ndarray], rng: np.random.Generator) -> List[Dict]:
+        return [{
+            "mavpackettype": "HEARTBEAT",
+            "type": 2,  # MAV_TYPE_QUADROTOR
+            "autopilot": 3,  # MAV_AUTOPILOT_ARDUPILOTMEGA
+            "base_mode": 81,
+            "custom_mode": 0,
+            "system_status": 4,  # MAV_STATE_ACTIVE
+            "mavlink_version": 3
+        } for _ in range(self.vehicles)]
+
+    def _battery_status(self, t: float, state: Dict[str, np.ndarray], rng: np.random.Generator) -> List[Dict]:
+        n = self.vehicles
+        consumed = self.model.current * t / 3.6  # mAh
+        charge = np.clip(1.0 - consumed / BATTERY_CAPACITY_MAH, 0.0, 1.0)
+        voltage = BATTERY_EMPTY_V + (BATTERY_FULL_V - BATTERY_EMPTY_V) * charge + rng.normal(0.0, 0.02, n)
+        current = self.model.current + rng.normal(0.0, 0.5, n)
+        time_remaining = (BATTERY_CAPACITY_MAH - np.minimum(consumed, BATTERY_CAPACITY_MAH)) * 3.6 / self.model.current
+        temperature = np.minimum(25.0 + t / 60.0, 45.0) + rng.normal(0.0, 0.2, n)
+        return [{
+            "mavpackettype": "BATTERY_STATUS",
+            "voltages": [int(v * 1000)] + [65535] * 9,  # Pack voltage in mV + 9 unused cells
+            "current_consumed": int(mah),
+            "energy_consumed": int(mah * v * 0.036),  # hJ
+            "temperature": int(temp),
+            "current": a,
+            "id": 0,
+            "battery_function": 0,  # MAV_BATTERY_FUNCTION_UNKNOWN
+            "type": 0,  # MAV_BATTERY_TYPE_UNKNOWN
+            "charge_state": 1,  # MAV_BATTERY_CHARGE_STATE_OK
+            "time_remaining": int(remaining),
+            "voltage": v
+        } for v, a, mah, remaining, temp in zip(voltage.tolist(), current.tolist(), consumed.tolist(),
+                                                 time_remaining.tolist(), temperature.tolist())]
+
+    def _ekf_status_report(self, t: float, state: Dict[str, np.ndarray], rng: np.random.Generator) -> List[Dict]:
+        variances = np.clip(rng.normal(0.03, 0.01, (6, self.vehicles)), 0.01, 0.1).tolist()
+        return [{
+            "mavpackettype": "EKF_STATUS_REPORT",
+            "flags": EKF_HEALTHY_FLAGS,
+            "velocity_variance": velocity,
+            "pos_horiz_variance": horizontal,
+            "pos_vert_variance": vertical,
+            "compass_variance": compass,
+            "terrain_alt_variance": terrain,
+            "airspeed_variance": airspeed
+        } for velocity, horizontal, vertical, compass, terrain, airspeed in zip(*variances)]
+
+    def _ahrs2(self, t: float, state: Dict[str, np.ndarray], rng: np.random.Generator) -> List[Dict]:
+        n = self.vehicles
+        roll = self.model.roll + rng.normal(0.0, 0.01, n)
+        pitch = self.model.pitch + rng.normal(0.0, 0.01, n)
+        yaw = state["yaw"] + rng.normal(0.0, 0.005, n)
+        altitude = GROUND_ALT + state["height"] + rng.normal(0.0, 0.05, n)
+        lat, lng = _lat_lon(state)
+        return [{
+            "mavpackettype": "AHRS2",
+            "roll": r,  # Roll in radians
+            "pitch": p,  # Pitch in radians
+            "yaw": y,  # Yaw in radians
+            "altitude": alt,
+            "lat": la,
+            "lng": lo
+        } for r, p, y, alt, la, lo in zip(roll.tolist(), pitch.tolist(), yaw.tolist(), altitude.tolist(),
+                                          lat.tolist(), lng.tolist())]
+
+    def _gps(self, t: float, state: Dict[str, np.ndarray], rng: np.random.Generator) -> List[Dict]:
+        n = self.vehicles
+        # Receiver noise of about a metre on top of the true position
+        noisy = dict(state, east=state["east"] + rng.normal(0.0, 0.7, n),
+                     north=state["north"] + rng.normal(0.0, 0.7, n))
+        lat, lon = _lat_lon(noisy)
+        alt = GROUND_ALT + state["height"] + rng.normal(0.0, 1.0, n)
+        ground_speed = np.hypot(state["v_east"], state["v_north"]) + rng.normal(0.0, 0.1, n)
+        cog = np.degrees(state["yaw"]) % 360.0
+        satellites = rng.integers(9, 13, n)
+        eph, epv = rng.uniform(0.8, 1.5, n), rng.uniform(1.0, 2.0, n)
+        return [{
+            "mavpackettype": "GPS_RAW_INT",
+            "time_usec": int(t * 1000000),
+            "fix_type": 3,  # GPS_FIX_TYPE_3D
+            "lat": la,
+            "lon": lo,
+            "alt": a,
+            "eph": h,  # GPS HDOP
+            "epv": v,  # GPS VDOP
+            "vel": speed,  # GPS ground speed
+            "cog": c,  # Course over ground
+            "satellites_visible": sats,
+            "alt_ellipsoid": a,
+            "h_acc": h * 1.5,  # Position uncertainty
+            "v_acc": v * 1.5,  # Altitude uncertainty
+            "vel_acc": 0.3,  # Speed uncertainty
+            "hdg_acc": 2.0  # Heading uncertainty
+        } for la, lo, a, h, v, speed, c, sats in zip(lat.tolist(), lon.tolist(), alt.tolist(), eph.tolist(),
+                                                     epv.tolist(), ground_speed.tolist(), cog.tolist(),
+                                                     satellites.tolist())]
+
+    def _vision_position_estimate(self, t: float, state: Dict[str, np.ndarray],
+                                  rng: np.random.Generator) -> List[Dict]:
+        n = self.vehicles
+        # Local NED frame around the vehicle's own circle, centimetre noise
+        x = state["north"] - self.model.centre_north + rng.normal(0.0, 0.01, n)
+        y = state["east"] - self.model.centre_east + rng.normal(0.0, 0.01, n)
+        z = -state["height"] + rng.normal(0.0, 0.01, n)
+        roll = self.model.roll + rng.normal(0.0, 0.01, n)
+        pitch = self.model.pitch + rng.normal(0.0, 0.01, n)
+        return [{
+            "mavpackettype": "VISION_POSITION_ESTIMATE",
+            "usec": int(t * 1000000),
+            "x": px,
+            "y": py,
+            "z": pz,
+            "roll": r,
+            "pitch": p,
+            "yaw": yaw,
+            "covariance": [0.01] * 21  # 6x6 covariance matrix flattened
+        } for px, py, pz, r, p, yaw in zip(x.tolist(), y.tolist(), z.tolist(), roll.tolist(), pitch.tolist(),
+                                           state["yaw"].tolist())]
+
+    def _vision_speed_estimate(self, t: float, state: Dict[str, np.ndarray], rng: np.random.Generator) -> List[Dict]:
+        n = self.vehicles
+        noise = rng.normal(0.0, 0.02, (3, n))
+        x = state["v_north"] + noise[0]
+        y = state["v_east"] + noise[1]
+        z = -state["climb"] + noise[2]
+        return [{
+            "mavpackettype": "VISION_SPEED_ESTIMATE",
+            "usec": int(t * 1000000),
+            "x": vx,
+            "y": vy,
+            "z": vz,
+            "covariance": [0.01] * 9  # 3x3 covariance matrix flattened
+        } for vx, vy, vz in zip(x.tolist(), y.tolist(), z.tolist())]
+
+    def _distance_sensor(self, t: float, state: Dict[str, np.ndarray], rng: np.random.Generator,
+                         sensor_id: int) -> List[Dict]:
+        n = self.vehicles
+        if sensor_id == 0:
+            # Downward rangefinder: height above ground
+            distance = state["height"]
+        else:
+            # Forward rangefinder sweeping past obstacles around the circle
+            distance = 8.0 + 3.0 * np.sin(3.0 * (self.model.phase + self.model.turn_rate * t))
+        cm = np.clip(np.rint(distance * 100.0 + rng.normal(0.0, 2.0, n)), RANGE_MIN_CM, RANGE_MAX_CM).astype(int)
+        quality = np.clip(rng.normal(90.0, 5.0, n), 0, 100).astype(int)
+        return [{
+            "mavpackettype": "DISTANCE_SENSOR",
+            "time_boot_ms": int(t * 1000),
+            "min_distance": RANGE_MIN_CM,
+            "max_distance": RANGE_MAX_CM,
+            "current_distance": d,
+            "type": 0,  # MAV_DISTANCE_SENSOR_LASER
+            "id": sensor_id,
+            "orientation": 25 if sensor_id == 0 else 0,  # MAV_SENSOR_ROTATION_PITCH_270 (down) / NONE
+            "covariance": 0.0,
+            "horizontal_fov": 0.0,
+            "vertical_fov": 0.0,
+            "quaternion": [0.0, 0.0, 0.0, 0.0],
+            "signal_quality": q
+        } for d, q in zip(cm.tolist(), quality.tolist())]
+
+    def _update(self, message_type, msg, system_id=1, component_id=1):
+        """Publish a simulated message through the shared ingest path, stamped as received now"""
+        ingest(message_type, msg, system_id, component_id, received=time.monotonic())
+
     def get_message(self, message_type):
         """Get a specific MAVLink message"""
-        return self.data_store.get(message_type)
-    
+        return telemetry_store.get(message_type)
+
     def get_all_messages(self):
         """Get all current MAVLink messages"""
-        return self.data_store.copy()
-    
+        return telemetry_store.copy()
+
     def is_connected(self):
         """Check if MAVLink connection is active"""
-        return self.is_running and len(self.data_store) > 0
+        return self.is_running and len(telemetry_store) > 0
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "seed": self.seed,
+            "vehicles": self.vehicles,
+            "rates": self.rates,
+            "speed": self.speed,
+            "message_rate": self.message_rate,
+            "messages_sent": self.messages_sent
+        }
+
+
+def _lat_lon(state: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Latitude and longitude in degrees of east/north offsets from the origin"""
+    lat = ORIGIN_LAT + state["north"] / METERS_PER_DEGREE
+    lon = ORIGIN_LON + state["east"] / (METERS_PER_DEGREE * math.cos(math.radians(ORIGIN_LAT)))
+    return lat, lon
 
 # Global instance
-simulated_mavlink = SimulatedMAVLink()
\ No newline at end of file
+simulated_mavlink = SimulatedMAVLink()
@@ -0,0 +1,115 @@
+"""
+Stream Decimation
+Per-subscription rate limiting (?hz=) and decimation policies applied before serialization
+"""
+
+import time
+import asyncio
+from typing import Optional
+from telemetry_store import StoreEntry
+from telemetry_history import telemetry_history
+from vehicle_index import vehicle_index
+from field_projection import FieldProjection
+
+# latest: newest value once per interval; aggregate: newest value plus min/max/mean
+# over the interval; nth: every Nth update of the type
+POLICIES = ("latest", "aggregate", "nth")
+
+
+class StreamDecimator:
+    """
+    Decides which updates of one message type a subscriber is sent.
+
+    Decimation happens on store entries before anything is encoded, so a
+    slow client only pays for the samples it receives. The "latest" and
+    "nth" policies return shared (projected) entries and keep using the
+    cached encodings; "aggregate" builds one entry per send from the
+    telemetry history ring buffer.
+    """
+
+    def __init__(self, hz: float = 0.0, policy: str = "latest", n: int = 1,
+                 projection: Optional[FieldProjection] = None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy '{policy}', expected one of {', '.join(POLICIES)}")
+        if hz < 0 or n < 1:
+            raise ValueError("hz must be >= 0 and n must be >= 1")
+        self.hz = hz
+        self.policy = policy
+        self.n = n
+        self.projection = projection
+        self.interval = 1.0 / hz if hz > 0 else 0.0
+        self._next_send = 0.0
+        self._last_count = 0
+        # The first aggregate covers the interval before the subscription
+        self._window_start = time.time() - self.interval
+
+    def delay(self) -> float:
+        """Seconds until the next send slot (0 when a send is due)"""
+        if not self.interval:
+            return 0.0
+        return max(0.0, self._next_send - time.monotonic())
+
+    async def pace(self):
+        """Sleep until the next send slot, letting updates coalesce meanwhile"""
+        delay = self.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def select(self, message_type: str, entry: StoreEntry) -> Optional[StoreEntry]:
+        """
+        Entry to send for the latest update of a type, or None to skip it
+
+        Args:
+            message_type: Store key the entry belongs to
+            entry: Latest store entry, not yet projected
+        """
+        if self.policy == "nth":
+            if entry.count < self._last_count:
+                # The store was cleared, e.g. by a source switch
+                self._last_count = 0
+            if self._last_count and entry.count - self._last_count < self.n:
+                return None
+            self._last_count = entry.count
+            selected = entry.project(self.projection)
+        elif self.policy == "aggregate":
+            selected = self._aggregate(message_type, entry)
+        else:
+            selected = entry.project(self.projection)
+
+        if self.interval:
+            self._next_send = time.monotonic() + self.interval
+        return selected
+
+    def _aggregate(self, message_type: str, entry: StoreEntry) -> StoreEntry:
+        projected = entry.project(self.projection)
+        fields = self.projection.fields if self.projection is not None else None
+        # History is only kept under per-vehicle keys, not under the primary's plain aliases
+        stats = telemetry_history.aggregate(vehicle_index.vehicle_store_key(message_type), self._window_start, fields)
+        data = dict(projected.data)
+        if stats is not None:
+            if stats["samples"]:
+                self._window_start = stats["end"]
+            data["aggregate"] = {
+                "samples": stats["samples"],
+                "min": stats["min"],
+                "max": stats["max"],
+                "mean": stats["mean"]
+            }
+        return StoreEntry(entry.version, data, entry.count, entry.received)
+
+
+def create_decimator(hz: Optional[float] = None, policy: Optional[str] = None, n: Optional[int] = None,
+                     projection: Optional[FieldProjection] = None) -> Optional[StreamDecimator]:
+    """
+    Build a decimator from stream query parameters
+
+    Returns:
+        Optional[StreamDecimator]: None when the client wants every update
+
+    Raises:
+        ValueError: On an unknown policy or out of range hz/n
+    """
+    if not hz and policy in (None, "latest") and n in (None, 1):
+        return None
+    return StreamDecimator(hz or 0.0, policy or ("nth" if n is not None else "latest"),
+                           n if n is not None else 1, projection)
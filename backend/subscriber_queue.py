@@ -0,0 +1,153 @@
+"""
+Subscriber Queues
+Fixed-size per-client send queues with replace-latest slots and slow-consumer accounting
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+from weakref import WeakSet
+from telemetry_metrics import enqueue_to_send
+
+# Frames buffered per client before the oldest are dropped
+DEFAULT_QUEUE_SIZE = 64
+
+
+class SubscriberQueue:
+    """
+    Bounded queue between a stream's producer and the client connection.
+
+    Items put with a key replace the pending item with the same key in
+    place, so a latest-value type never has more than one frame waiting.
+    When the queue is full the oldest item that is not pinned is dropped.
+    Either way the producer never waits for the client. Keyless items are
+    always appended; pinned items (e.g. a schema later frames depend on)
+    are never dropped.
+    The time from put to get of every item goes to the enqueue_to_send
+    histogram under the stream label. Used from a single event loop.
+    """
+
+    def __init__(self, stream: str, client: str = "", maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.stream = stream
+        self.client = client
+        self.maxsize = maxsize
+        self.created = time.time()
+        self.delivered = 0
+        self.replaced = 0
+        self.dropped = 0
+        self.max_depth = 0
+        # Seconds the item last returned by get() waited in the queue
+        self.last_wait = 0.0
+        # When the client last took something or the queue became non-empty
+        self._pending_since: Optional[float] = None
+        # key -> (item, time.monotonic() when it was put)
+        self._items: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        # Keys of pending pinned items
+        self._pinned: Set[Hashable] = set()
+        self._ready = asyncio.Event()
+        register_queue(self)
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def put(self, item: Any, key: Optional[Hashable] = None, pinned: bool = False):
+        """Queue an item, replacing the pending item with the same key; a pinned item is never dropped"""
+        now = time.monotonic()
+        if key is not None and key in self._items:
+            self._items[key] = (item, now)
+            self.replaced += 1
+            return
+        if not self._items:
+            self._pending_since = now
+        elif len(self._items) >= self.maxsize:
+            self._drop_oldest()
+        if key is None:
+            key = object()
+        if pinned:
+            self._pinned.add(key)
+        self._items[key] = (item, now)
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+
+    def _drop_oldest(self):
+        for key in self._items:
+            if key not in self._pinned:
+                del self._items[key]
+                self.dropped += 1
+                return
+
+    async def get(self) -> Any:
+        """Wait for and remove the oldest item"""
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        key, (item, enqueued) = self._items.popitem(last=False)
+        self._pinned.discard(key)
+        self.last_wait = time.monotonic() - enqueued
+        enqueue_to_send.observe(self.stream, self.last_wait)
+        self._taken(1)
+        return item
+
+    async def get_all(self) -> List[Tuple[Hashable, Any]]:
+        """Wait for and remove every pending (key, item) pair, oldest first"""
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        now = time.monotonic()
+        items = []
+        for key, (item, enqueued) in self._items.items():
+            enqueue_to_send.observe(self.stream, now - enqueued)
+            items.append((key, item))
+        self._items.clear()
+        self._pinned.clear()
+        self._taken(len(items))
+        return items
+
+    def _taken(self, count: int):
+        self.delivered += count
+        self._pending_since = time.monotonic() if self._items else None
+
+    def stalled_for(self) -> float:
+        """Seconds items have been waiting without the client taking any"""
+        return time.monotonic() - self._pending_since if self._pending_since is not None else 0.0
+
+    def close(self):
+        """Stop reporting this queue once its client is gone"""
+        unregister_queue(self)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stream": self.stream,
+            "client": self.client,
+            "connected_at": self.created,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "delivered": self.delivered,
+            "replaced": self.replaced,
+            "dropped": self.dropped,
+            "stalled_for": self.stalled_for()
+        }
+
+
+_lock = Lock()
+_queues: "WeakSet[SubscriberQueue]" = WeakSet()
+
+
+def register_queue(queue: SubscriberQueue):
+    with _lock:
+        _queues.add(queue)
+
+
+def unregister_queue(queue: SubscriberQueue):
+    with _lock:
+        _queues.discard(queue)
+
+
+def subscriber_queues() -> List[SubscriberQueue]:
+    """Queues of every connected client"""
+    with _lock:
+        return list(_queues)
@@ -0,0 +1,132 @@
+"""
+Telemetry Encoding
+Opt-in binary wire formats for the streams: packed little-endian records or MessagePack
+
+Packed records:
+    Every record starts with a uint16 schema id followed by float64 values in
+    schema field order (array fields contribute `count` consecutive values).
+    A "schema" event describing the layout is sent before the first record
+    that uses it. Non-numeric fields (e.g. mavpackettype) are not packed.
+
+Over SSE, binary records are base64 encoded into the event data.
+"""
+
+import base64
+import struct
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+ENCODINGS = ("json", "packed", "msgpack")
+
+# Leading field of every packed record
+SCHEMA_ID = struct.Struct("<H")
+
+try:
+    import msgpack
+except ImportError:  # Optional; only needed for ?encoding=msgpack
+    msgpack = None
+
+
+def check_encoding(encoding: str):
+    """Raise ValueError if an encoding is unknown or unavailable"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding '{encoding}', expected one of {', '.join(ENCODINGS)}")
+    if encoding == "msgpack" and msgpack is None:
+        raise ValueError("MessagePack encoding needs the msgpack package")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float))
+
+
+class PackedSchema:
+    """Record layout for one set of numeric fields"""
+
+    __slots__ = ("id", "fields", "struct")
+
+    def __init__(self, schema_id: int, fields: Tuple[Tuple[str, int], ...]):
+        self.id = schema_id
+        # (name, count); count is 0 for scalars, else the array length
+        self.fields = fields
+        self.struct = struct.Struct("<H" + "d" * sum(max(count, 1) for _, count in fields))
+
+    def pack(self, data: Dict[str, Any]) -> bytes:
+        values: List[float] = [self.id]
+        for name, count in self.fields:
+            if count:
+                values.extend(data[name])
+            else:
+                values.append(data[name])
+        return self.struct.pack(*values)
+
+    def describe(self, message_type: Optional[str] = None) -> Dict[str, Any]:
+        """JSON-friendly description sent in the schema event"""
+        return {
+            "schema": self.id,
+            "message_type": message_type,
+            "format": self.struct.format,
+            "size": self.struct.size,
+            "fields": [{"name": name, "count": count} for name, count in self.fields]
+        }
+
+
+_schema_lock = Lock()
+_schemas: Dict[Tuple[Tuple[str, int], ...], PackedSchema] = {}
+_schemas_by_id: Dict[int, PackedSchema] = {}
+
+
+def packed_schema(data: Dict[str, Any]) -> PackedSchema:
+    """Schema matching the numeric layout of a message, shared by every message with that layout"""
+    layout = []
+    for name, value in data.items():
+        if _is_number(value):
+            layout.append((name, 0))
+        elif isinstance(value, (list, tuple)) and value and all(_is_number(v) for v in value):
+            layout.append((name, len(value)))
+    layout = tuple(layout)
+    schema = _schemas.get(layout)
+    if schema is None:
+        with _schema_lock:
+            schema = _schemas.get(layout)
+            if schema is None:
+                if len(_schemas) >= 0xFFFF:
+                    raise ValueError("Out of packed schema ids")
+                schema = _schemas[layout] = PackedSchema(len(_schemas) + 1, layout)
+                _schemas_by_id[schema.id] = schema
+    return schema
+
+
+def record_schema(record: bytes) -> PackedSchema:
+    """Schema of an encoded packed record"""
+    return _schemas_by_id[SCHEMA_ID.unpack_from(record)[0]]
+
+
+def encode_binary(data: Dict[str, Any], encoding: str) -> bytes:
+    """Binary encoding of a message dict"""
+    if encoding == "packed":
+        return packed_schema(data).pack(data)
+    if encoding == "msgpack":
+        return msgpack.packb(data)
+    raise ValueError(f"'{encoding}' is not a binary encoding")
+
+
+def msgpack_map(items: List[Tuple[str, bytes]]) -> bytes:
+    """MessagePack map spliced from already encoded values"""
+    parts = [_msgpack_map_header(len(items))]
+    for key, value in items:
+        parts.append(msgpack.packb(key))
+        parts.append(value)
+    return b"".join(parts)
+
+
+def _msgpack_map_header(size: int) -> bytes:
+    if size < 16:
+        return bytes((0x80 | size,))
+    if size < 0x10000:
+        return b"\xde" + size.to_bytes(2, "big")
+    return b"\xdf" + size.to_bytes(4, "big")
+
+
+def sse_data(payload: bytes) -> str:
+    """Binary payload as SSE event data"""
+    return base64.b64encode(payload).decode("ascii")
@@ -0,0 +1,186 @@
+"""
+Telemetry History
+In-memory time series of numeric message fields, kept in preallocated NumPy ring buffers
+"""
+
+import math
+import time
+import logging
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def numeric_fields(data: Dict[str, Any]) -> List[str]:
+    """Names of the scalar numeric fields of a message dict"""
+    return [
+        name for name, value in data.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+
+
+class MessageHistory:
+    """Ring buffer of timestamps plus one column per numeric field for one message type"""
+
+    def __init__(self, fields: List[str], capacity: int):
+        self.fields = fields
+        self.capacity = capacity
+        self.count = 0
+        self._lock = Lock()
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._columns = {name: np.full(capacity, np.nan, dtype=np.float64) for name in fields}
+
+    def append(self, timestamp: float, data: Any):
+        """Append a message dict, or read the fields straight off a decoded message"""
+        get = data.get if isinstance(data, dict) else lambda name: getattr(data, name, None)
+        with self._lock:
+            index = self.count % self.capacity
+            self._timestamps[index] = timestamp
+            for name, column in self._columns.items():
+                value = get(name)
+                column[index] = value if isinstance(value, (int, float)) else np.nan
+            self.count += 1
+
+    def _ordered(self, array: np.ndarray) -> np.ndarray:
+        """Buffer contents oldest first"""
+        if self.count <= self.capacity:
+            return array[:self.count]
+        split = self.count % self.capacity
+        return np.concatenate((array[split:], array[:split]))
+
+    def slice(self, since: float, fields: Iterable[str]) -> Dict[str, Any]:
+        """Columnar samples with timestamp > since"""
+        with self._lock:
+            timestamps = self._ordered(self._timestamps)
+            start = int(np.searchsorted(timestamps, since, side="right"))
+            return {
+                "timestamps": timestamps[start:].tolist(),
+                "fields": {
+                    name: self._ordered(self._columns[name])[start:].tolist()
+                    for name in fields
+                }
+            }
+
+    def aggregate(self, since: float, fields: Iterable[str]) -> Dict[str, Any]:
+        """Min, max and mean of each field over samples with timestamp > since"""
+        with self._lock:
+            timestamps = self._ordered(self._timestamps)
+            start = int(np.searchsorted(timestamps, since, side="right"))
+            stats = {"samples": len(timestamps) - start, "end": since, "min": {}, "max": {}, "mean": {}}
+            if stats["samples"] == 0:
+                return stats
+            stats["end"] = float(timestamps[-1])
+            for name in fields:
+                values = self._ordered(self._columns[name])[start:]
+                values = values[~np.isnan(values)]
+                if len(values):
+                    stats["min"][name] = float(values.min())
+                    stats["max"][name] = float(values.max())
+                    stats["mean"][name] = float(values.mean())
+            return stats
+
+
+class TelemetryHistory:
+    """
+    Per-type time-series history fed from the ingest path.
+
+    Each message type gets a ring buffer sized for `retention` seconds at
+    `max_rate` Hz; types sent faster than `max_rate` keep a proportionally
+    shorter window. Only scalar numeric fields present in the first message
+    of a type are recorded.
+    """
+
+    def __init__(self, retention: float = 120.0, max_rate: float = 50.0):
+        self._lock = Lock()
+        self._histories: Dict[str, MessageHistory] = {}
+        self.configure(retention, max_rate)
+
+    def configure(self, retention: float, max_rate: float):
+        """Set the retention window; existing history is discarded"""
+        with self._lock:
+            self.retention = retention
+            self.max_rate = max_rate
+            self.capacity = max(1, math.ceil(retention * max_rate))
+            self._histories = {}
+        logger.info(f"Telemetry history: {retention}s retention, {self.capacity} samples per type")
+
+    def record(self, message_type: str, data: Any, timestamp: Optional[float] = None):
+        """
+        Append a message to its type's history
+
+        Args:
+            message_type: Store key (e.g. AHRS2, DISTANCE_SENSOR_D0)
+            data: Decoded message fields, or a decoded message with to_dict()
+            timestamp: Receive time in seconds since the epoch (defaults to now)
+        """
+        history = self._histories.get(message_type)
+        if history is None:
+            with self._lock:
+                history = self._histories.get(message_type)
+                if history is None:
+                    fields = data if isinstance(data, dict) else data.to_dict()
+                    history = MessageHistory(numeric_fields(fields), self.capacity)
+                    self._histories[message_type] = history
+        history.append(time.time() if timestamp is None else timestamp, data)
+
+    def message_types(self) -> List[str]:
+        return list(self._histories.keys())
+
+    def fields(self, message_type: str) -> Optional[List[str]]:
+        """Recorded fields of a message type, or None if it has no history"""
+        history = self._histories.get(message_type)
+        return history.fields if history is not None else None
+
+    def query(self, message_type: str, since: Optional[float] = None,
+              fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Columnar slice of a message type's history
+
+        Args:
+            message_type: Store key to query
+            since: Only return samples newer than this epoch time; negative values
+                are relative to now (e.g. -60 for the last minute)
+            fields: Subset of fields to return (defaults to all recorded fields)
+
+        Returns:
+            Optional[Dict]: {"timestamps": [...], "fields": {name: [...]}}, or
+            None if the type has no history
+        """
+        history = self._histories.get(message_type)
+        if history is None:
+            return None
+        now = time.time()
+        if since is None:
+            since = now - self.retention
+        elif since < 0:
+            since = now + since
+        since = max(since, now - self.retention)
+        selected = history.fields if fields is None else [f for f in fields if f in history.fields]
+        return history.slice(since, selected)
+
+    def aggregate(self, message_type: str, since: float,
+                  fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Summary statistics of a message type's samples newer than `since`
+
+        Returns:
+            Optional[Dict]: {"samples": n, "end": newest timestamp, "min": {...},
+            "max": {...}, "mean": {...}}, or None if the type has no history
+        """
+        history = self._histories.get(message_type)
+        if history is None:
+            return None
+        selected = history.fields if fields is None else [f for f in fields if f in history.fields]
+        return history.aggregate(since, selected)
+
+    def clear(self):
+        with self._lock:
+            self._histories = {}
+
+
+# Global instance
+telemetry_history = TelemetryHistory()
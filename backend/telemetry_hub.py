@@ -0,0 +1,157 @@
+"""
+Telemetry Fan-out Hub
+Push-based publish/subscribe layer between the MAVLink ingest side and the SSE streams
+"""
+
+import asyncio
+import logging
+from threading import Lock, get_ident
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A single stream's interest in a set of message types.
+
+    Publishers may run on any thread; the wakeup is handed to the event loop
+    the subscription was created on. Repeated publishes before the subscriber
+    runs are coalesced into a single wakeup.
+    """
+
+    def __init__(self, hub: "TelemetryHub", types: Optional[Iterable[str]], loop: asyncio.AbstractEventLoop):
+        self.hub = hub
+        self.types = frozenset(types) if types is not None else None
+        self._loop = loop
+        self._loop_thread = get_ident()
+        self._event = asyncio.Event()
+        self._lock = Lock()
+        self._pending: Set[str] = set()
+        self._scheduled = False
+
+    def notify(self, message_types: Iterable[str]):
+        """Mark message types as changed, e.g. to force the subscriber to resend them"""
+        for message_type in message_types:
+            self._notify(message_type)
+
+    def _notify(self, message_type: str):
+        """Record a change and wake the subscriber (safe to call from any thread)"""
+        with self._lock:
+            self._pending.add(message_type)
+            if self._scheduled:
+                return
+            self._scheduled = True
+
+        if get_ident() == self._loop_thread:
+            self._event.set()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # Event loop already closed; the subscriber is gone
+            pass
+
+    async def wait(self) -> Set[str]:
+        """
+        Wait until at least one subscribed message type changes
+
+        Returns:
+            Set[str]: Message types published since the previous call
+        """
+        while True:
+            await self._event.wait()
+            changed = self.poll()
+            if changed:
+                return changed
+
+    def poll(self) -> Set[str]:
+        """Return the message types published since the previous call without waiting"""
+        self._event.clear()
+        with self._lock:
+            changed, self._pending = self._pending, set()
+            self._scheduled = False
+        return changed
+
+    def close(self):
+        """Detach this subscription from its hub"""
+        self.hub.unsubscribe(self)
+
+
+class TelemetryHub:
+    """
+    Central publish/subscribe hub for telemetry updates.
+
+    Subscriber lists are copy-on-write tuples, so publish() never takes the
+    hub lock and costs nothing when nobody is listening to a message type.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._by_type: Dict[str, Tuple[Subscription, ...]] = {}
+        self._wildcard: Tuple[Subscription, ...] = ()
+
+    def subscribe(self, types: Optional[Iterable[str]] = None) -> Subscription:
+        """
+        Subscribe the calling event loop to a set of message types
+
+        Args:
+            types: Message types to watch, or None for every type
+
+        Returns:
+            Subscription: Handle to await changes on
+        """
+        subscription = Subscription(self, types, asyncio.get_running_loop())
+        with self._lock:
+            self._add(subscription)
+        return subscription
+
+    def resubscribe(self, subscription: Subscription, types: Optional[Iterable[str]]):
+        """Change the message types an existing subscription watches"""
+        with self._lock:
+            self._remove(subscription)
+            subscription.types = frozenset(types) if types is not None else None
+            self._add(subscription)
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscription; unknown subscriptions are ignored"""
+        with self._lock:
+            self._remove(subscription)
+
+    def _add(self, subscription: Subscription):
+        if subscription.types is None:
+            self._wildcard = self._wildcard + (subscription,)
+        else:
+            for message_type in subscription.types:
+                self._by_type[message_type] = self._by_type.get(message_type, ()) + (subscription,)
+
+    def _remove(self, subscription: Subscription):
+        if subscription.types is None:
+            self._wildcard = tuple(s for s in self._wildcard if s is not subscription)
+            return
+        for message_type in subscription.types:
+            remaining = tuple(s for s in self._by_type.get(message_type, ()) if s is not subscription)
+            if remaining:
+                self._by_type[message_type] = remaining
+            else:
+                self._by_type.pop(message_type, None)
+
+    def publish(self, message_type: str):
+        """Announce that the latest value of a message type has changed"""
+        for subscription in self._by_type.get(message_type, ()):
+            subscription._notify(message_type)
+        for subscription in self._wildcard:
+            subscription._notify(message_type)
+
+    def subscriber_count(self, message_type: Optional[str] = None) -> int:
+        """Number of subscriptions watching a message type (or in total)"""
+        if message_type is None:
+            unique = {id(s) for subs in self._by_type.values() for s in subs}
+            return len(unique) + len(self._wildcard)
+        return len(self._by_type.get(message_type, ())) + len(self._wildcard)
+
+
+# Global instance
+telemetry_hub = TelemetryHub()
@@ -0,0 +1,67 @@
+"""
+Telemetry Ingest
+Single entry point through which every telemetry source feeds the store, history and streams
+"""
+
+from typing import Any, Optional
+from telemetry_store import telemetry_store
+from telemetry_hub import telemetry_hub
+from telemetry_history import telemetry_history
+from telemetry_log import get_log
+from vehicle_index import vehicle_index
+
+ingest_log = get_log("ingest")
+
+
+def ingest(store_key: str, data: Any, system_id: Optional[int] = None, component_id: Optional[int] = None,
+           received: Optional[float] = None) -> int:
+    """
+    Publish the latest value of a message type to the rest of the backend
+
+    Args:
+        store_key: Per-type key (e.g. AHRS2, DISTANCE_SENSOR_D0); messages are
+            stored as TYPE@system.component, and those of the primary vehicle
+            under the plain key too
+        data: Decoded message fields, or a decoded message whose to_dict() is
+            deferred until something reads it
+        system_id: Sending system (defaults to the primary vehicle)
+        component_id: Sending component
+        received: time.monotonic() when the message came off the link (defaults to now)
+
+    Returns:
+        int: Store version assigned to this update
+    """
+    store_key, alias = vehicle_index.record(store_key, system_id, component_id)
+    version = telemetry_store.update(store_key, data, received)
+    telemetry_history.record(store_key, data)
+    telemetry_hub.publish(store_key)
+    if alias is not None:
+        telemetry_store.alias(alias, store_key)
+        telemetry_hub.publish(alias)
+    ingest_log.count(alias or store_key)
+    ingest_log.debug(store_key, "Updated %s (version %d)", store_key, version)
+    return version
+
+
+def set_primary_vehicle(system_id: int, component_id: int):
+    """
+    Make a vehicle the primary one and point the plain keys at its latest messages
+
+    Plain keys the new primary has not sent are dropped rather than left
+    showing the previous primary; streams on them are woken either way.
+    """
+    previous = vehicle_index.primary
+    if previous == (system_id, component_id):
+        return
+    vehicle_index.set_primary(system_id, component_id)
+    targets = vehicle_index.aliases((system_id, component_id))
+    for alias in targets.keys() | vehicle_index.aliases(previous).keys():
+        if telemetry_store.rebind(alias, targets.get(alias)):
+            telemetry_hub.publish(alias)
+
+
+def clear_telemetry():
+    """Drop the latest values and history, e.g. when switching sources"""
+    telemetry_store.clear()
+    telemetry_history.clear()
+    vehicle_index.clear()
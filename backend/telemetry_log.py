@@ -0,0 +1,119 @@
+"""
+Telemetry Logging
+Per-category, level-gated and rate-limited diagnostics with aggregated counters for the hot paths
+
+Categories map to loggers named telemetry.<category> (e.g. telemetry.ingest,
+telemetry.stream), so their levels can be set independently, at startup via
+TELEMETRY_LOG_LEVELS="stream=DEBUG,ingest=INFO" or at runtime via /logging.
+"""
+
+import os
+import time
+import logging
+from threading import Lock
+from typing import Any, Dict
+from telemetry_metrics import ThreadCounters
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+
+# Minimum seconds between two emitted records of the same event
+DEFAULT_SAMPLE_INTERVAL = 1.0
+
+
+class TelemetryLog:
+    """
+    Diagnostics for one category of the ingest or stream path.
+
+    count() increments a per-thread counter table (ThreadCounters), so it
+    takes no lock and is cheap enough to call per message. debug()/info()
+    check the level before doing anything else and then emit at most one
+    record per event every `sample_interval` seconds, noting how many were
+    suppressed in between. Messages use logging's lazy %-formatting, so
+    arguments are only formatted for records that are actually emitted.
+    """
+
+    def __init__(self, category: str, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.category = category
+        self.logger = logging.getLogger(f"telemetry.{category}")
+        self.sample_interval = sample_interval
+        self._counters = ThreadCounters()
+        self._last_emit: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def count(self, event: str, n: int = 1):
+        """Add to an event counter"""
+        self._counters.add(event, n)
+
+    def counters(self) -> Dict[str, int]:
+        """Totals of every counter across threads"""
+        return self._counters.totals()
+
+    def sampled(self, level: int, event: str, msg: str, *args: Any):
+        """Emit a record for an event if the level is enabled and its sample slot is open"""
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        if now - self._last_emit.get(event, 0.0) < self.sample_interval:
+            self._suppressed[event] = self._suppressed.get(event, 0) + 1
+            return
+        self._last_emit[event] = now
+        suppressed = self._suppressed.pop(event, 0)
+        if suppressed:
+            msg += f" ({suppressed} similar suppressed)"
+        self.logger.log(level, msg, *args)
+
+    def debug(self, event: str, msg: str, *args: Any):
+        self.sampled(logging.DEBUG, event, msg, *args)
+
+    def info(self, event: str, msg: str, *args: Any):
+        self.sampled(logging.INFO, event, msg, *args)
+
+    def set_level(self, level: str):
+        self.logger.setLevel(level.upper())
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "level": logging.getLevelName(self.logger.getEffectiveLevel()),
+            "sample_interval": self.sample_interval,
+            "counters": self.counters()
+        }
+
+
+_lock = Lock()
+_logs: Dict[str, TelemetryLog] = {}
+
+
+def get_log(category: str) -> TelemetryLog:
+    """Shared TelemetryLog for a category"""
+    log = _logs.get(category)
+    if log is None:
+        with _lock:
+            log = _logs.setdefault(category, TelemetryLog(category))
+    return log
+
+
+def configure_levels(spec: str):
+    """
+    Set category levels from a spec such as "stream=DEBUG,ingest=WARNING"
+
+    Raises:
+        ValueError: On a malformed item or unknown level name
+    """
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        category, _, level = item.partition("=")
+        if not level or not isinstance(logging.getLevelName(level.strip().upper()), int):
+            raise ValueError(f"Invalid log level setting '{item}'")
+        get_log(category.strip()).set_level(level.strip())
+
+
+def log_stats() -> Dict[str, Dict[str, Any]]:
+    """Level, sampling and counters of every category"""
+    with _lock:
+        logs = dict(_logs)
+    return {category: log.get_info() for category, log in logs.items()}
+
+
+configure_levels(os.environ.get("TELEMETRY_LOG_LEVELS", ""))
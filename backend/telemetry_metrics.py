@@ -0,0 +1,196 @@
+"""
+Telemetry Metrics
+Per-thread counters for the hot paths and a Prometheus text exposition writer
+"""
+
+from bisect import bisect_left
+from threading import Lock, local
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+Number = Union[int, float]
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Upper bounds (seconds) of the payload serialization histogram buckets
+SERIALIZATION_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+
+class ThreadCounters:
+    """
+    Keyed counters that never take a lock on the hot path.
+
+    Every thread increments its own plain dict; totals() sums the tables of
+    all threads when metrics are scraped, so writers never contend with
+    each other or with readers.
+    """
+
+    def __init__(self):
+        self._local = local()
+        self._tables_lock = Lock()
+        self._tables: List[Dict[Hashable, Number]] = []
+
+    def _table(self) -> Dict[Hashable, Number]:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = self._local.table = {}
+            with self._tables_lock:
+                self._tables.append(table)
+        return table
+
+    def add(self, key: Hashable, n: Number = 1):
+        table = self._table()
+        table[key] = table.get(key, 0) + n
+
+    def totals(self) -> Dict[Hashable, Number]:
+        """Sum of every key across threads"""
+        with self._tables_lock:
+            tables = list(self._tables)
+        totals: Dict[Hashable, Number] = {}
+        for table in tables:
+            while True:
+                try:
+                    items = list(table.items())
+                    break
+                except RuntimeError:
+                    # Owner thread added a key mid-copy; retry
+                    continue
+            for key, value in items:
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+class LatencyHistogram:
+    """
+    Keyed histograms of latencies in seconds, with fixed buckets.
+
+    observe() is a bisect and three increments; bucket counts are kept per
+    bucket and only made cumulative when scraped. Observed and scraped on
+    the event loop only, so it takes no lock.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # key -> [count per bucket (last is +Inf), sum, count]
+        self._series: Dict[Hashable, list] = {}
+
+    def observe(self, key: Hashable, seconds: float):
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+        series[2] += 1
+
+    def totals(self) -> Dict[Hashable, Tuple[List[int], float, int]]:
+        """Cumulative bucket counts, sum and count of every key"""
+        totals = {}
+        for key, (counts, total, count) in list(self._series.items()):
+            cumulative, running = [], 0
+            for n in counts:
+                running += n
+                cumulative.append(running)
+            totals[key] = (cumulative, total, count)
+        return totals
+
+
+class ThreadHistogram:
+    """
+    Keyed histograms like LatencyHistogram, for values observed on any thread.
+
+    Bucket counts and sums go to ThreadCounters, so observe() takes no lock;
+    they are made cumulative when scraped.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # (key, bucket index) -> count, the last index being +Inf
+        self._counts = ThreadCounters()
+        self._sums = ThreadCounters()
+
+    def observe(self, key: Hashable, seconds: float):
+        self._counts.add((key, bisect_left(self.buckets, seconds)))
+        self._sums.add(key, seconds)
+
+    def totals(self) -> Dict[Hashable, Tuple[List[int], float, int]]:
+        """Cumulative bucket counts, sum and count of every key"""
+        counts = self._counts.totals()
+        totals = {}
+        for key, total in self._sums.totals().items():
+            cumulative, running = [], 0
+            for index in range(len(self.buckets) + 1):
+                running += counts.get((key, index), 0)
+                cumulative.append(running)
+            totals[key] = (cumulative, total, running)
+        return totals
+
+
+# Stream events and bytes handed to clients, keyed by stream label
+events_sent = ThreadCounters()
+bytes_sent = ThreadCounters()
+
+# Time spent building payloads, keyed by encoding
+serialization_seconds = ThreadHistogram(SERIALIZATION_BUCKETS)
+
+# Link level counters summed over every connection: bytes, parse_errors, bad_data
+link_counters = ThreadCounters()
+
+# Link receive to a stream queueing the message, keyed by store key
+receive_to_enqueue = LatencyHistogram()
+
+# Queued to taken for sending by the client's connection, keyed by stream label
+enqueue_to_send = LatencyHistogram()
+
+
+def record_sent(stream: str, size: int):
+    """Count one event of `size` bytes sent on a stream"""
+    events_sent.add(stream)
+    bytes_sent.add(stream, size)
+
+
+def record_serialization(encoding: str, seconds: float):
+    serialization_seconds.observe(encoding, seconds)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsWriter:
+    """Builds a Prometheus text format (0.0.4) exposition"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def family(self, name: str, metric_type: str, help_text: str):
+        """Start a metric family (counter, gauge or summary)"""
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name: str, value: Number, labels: Optional[Dict[str, str]] = None):
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            self._lines.append(f"{name}{{{label_text}}} {value}")
+        else:
+            self._lines.append(f"{name} {value}")
+
+    def counter(self, name: str, help_text: str, values: Dict[str, Number], label: str):
+        """Counter family with one sample per value of a single label"""
+        self.family(name, "counter", help_text)
+        for key, value in sorted(values.items()):
+            self.sample(name, value, {label: key})
+
+    def histogram(self, name: str, help_text: str, histogram: Union[LatencyHistogram, ThreadHistogram], label: str):
+        """Histogram family with one series per value of a single label"""
+        self.family(name, "histogram", help_text)
+        bounds = [f"{bound:g}" for bound in histogram.buckets] + ["+Inf"]
+        for key, (cumulative, total, count) in sorted(histogram.totals().items()):
+            for bound, value in zip(bounds, cumulative):
+                self.sample(f"{name}_bucket", value, {label: key, "le": bound})
+            self.sample(f"{name}_sum", total, {label: key})
+            self.sample(f"{name}_count", count, {label: key})
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
@@ -0,0 +1,444 @@
+"""
+Telemetry Sources
+Pluggable producers (simulator, serial/UDP/TCP MAVLink links, log replay) behind one interface
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from pymavlink import mavutil
+from simulated_mavlink import SimulatedMAVLink
+from bg_process import INTERESTED_TYPES, PARSER_FILTER, start_background_thread, stop_background_thread, process_message
+from flight_recorder import FlightRecorder
+from mavlink_forwarder import MavlinkForwarder, create_forwarder
+from log_replay import LogReplay
+from async_mavlink import AsyncMavlinkReader
+from telemetry_ingest import clear_telemetry, set_primary_vehicle
+from telemetry_metrics import link_counters
+from link_dedup import SequenceDeduplicator
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SOURCE_KINDS = ("simulator", "mavlink", "mavlink_async", "multilink", "replay")
+
+
+class TelemetrySource:
+    """
+    Base class for anything that feeds the shared telemetry pipeline.
+
+    Sources publish through telemetry_ingest.ingest(), so every stream,
+    history and plot works the same way regardless of where data comes from.
+    Thread-based sources implement the blocking start()/stop(), which open()
+    and close() run off the event loop; loop-native sources override
+    open()/close() instead.
+    """
+
+    kind = "base"
+
+    def __init__(self):
+        self.system_id: Optional[int] = None
+        self.component_id: Optional[int] = None
+        self.connection_time: Optional[float] = None
+        # Relays received frames to other ground stations (link sources only)
+        self.forwarder: Optional[MavlinkForwarder] = None
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    async def open(self):
+        await asyncio.to_thread(self.start)
+
+    async def close(self):
+        await asyncio.to_thread(self.stop)
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "source": self.kind,
+            "system_id": self.system_id,
+            "component_id": self.component_id,
+            "connection_time": self.connection_time,
+            "forwarding": self.forwarder.get_info() if self.forwarder else None
+        }
+
+
+class SimulatorSource(TelemetrySource):
+    """Simulated flight controller data: system 1 is the primary vehicle, further vehicles are systems 2..N"""
+
+    kind = "simulator"
+
+    def __init__(self, seed: Optional[int] = 0, vehicles: int = 1, rates: Optional[Dict[str, float]] = None,
+                 speed: float = 1.0):
+        super().__init__()
+        self.simulator = SimulatedMAVLink(seed=seed, vehicles=vehicles, rates=rates, speed=speed)
+
+    def start(self):
+        self.system_id = 1
+        self.component_id = 1
+        set_primary_vehicle(self.system_id, self.component_id)
+        self.simulator.start_simulation()
+        self.connection_time = time.time()
+
+    def stop(self):
+        self.simulator.stop_simulation()
+
+    def get_info(self) -> Dict[str, Any]:
+        info = super().get_info()
+        info["simulator"] = self.simulator.get_info()
+        return info
+
+
+class MavlinkSource(TelemetrySource):
+    """Real flight controller over serial, UDP or TCP via pymavlink"""
+
+    kind = "mavlink"
+
+    def __init__(self, device: str, baud: int = 115200, log_path: Optional[str] = None,
+                 heartbeat_timeout: float = 10.0, forward: Optional[str] = None):
+        super().__init__()
+        self.forwarder = create_forwarder(forward)
+        self.device = device
+        self.baud = baud
+        self.log_path = log_path
+        self.heartbeat_timeout = heartbeat_timeout
+        self.master = None
+        self.recorder: Optional[FlightRecorder] = None
+
+    def start(self):
+        try:
+            self._connect()
+        except Exception:
+            # Release the link and the forwarding sockets opened with the source
+            self.stop()
+            raise
+
+    def _connect(self):
+        logger.info(f"Establishing MAVLink connection to {self.device} at {self.baud} baud")
+        self.master = mavutil.mavlink_connection(self.device, baud=self.baud)
+
+        # Wait for heartbeat to confirm connection
+        logger.info("Waiting for heartbeat...")
+        if self.master.wait_heartbeat(timeout=self.heartbeat_timeout) is None:
+            raise TimeoutError(f"No heartbeat from {self.device} within {self.heartbeat_timeout}s")
+        logger.info("Heartbeat received! Connection established.")
+        self.system_id = self.master.target_system
+        self.component_id = self.master.target_component
+        self.connection_time = time.time()
+        # Other systems on the link are kept under their own store keys
+        set_primary_vehicle(self.system_id, self.component_id)
+
+        # Record raw frames if a flight log was requested
+        if self.log_path:
+            self.recorder = FlightRecorder(self.log_path)
+            self.recorder.start()
+
+        start_background_thread(self.master, self.recorder, self.forwarder)
+
+    def stop(self):
+        stop_background_thread()
+        if self.forwarder:
+            self.forwarder.close()
+        # Finish the flight log once no more frames can arrive
+        if self.recorder:
+            self.recorder.stop()
+            self.recorder = None
+        if self.master:
+            self.master.close()
+            self.master = None
+
+    def get_info(self) -> Dict[str, Any]:
+        info = super().get_info()
+        info.update({
+            "device": self.device,
+            "baud": self.baud,
+            "recorder": self.recorder.get_info() if self.recorder else None
+        })
+        return info
+
+
+class AsyncMavlinkSource(TelemetrySource):
+    """Real flight controller read with asyncio transports on the event loop"""
+
+    kind = "mavlink_async"
+
+    def __init__(self, device: str, baud: int = 115200, log_path: Optional[str] = None,
+                 heartbeat_timeout: float = 10.0, forward: Optional[str] = None):
+        super().__init__()
+        self.log_path = log_path
+        self.heartbeat_timeout = heartbeat_timeout
+        self.recorder: Optional[FlightRecorder] = None
+        self.forwarder = create_forwarder(forward)
+        self.reader = AsyncMavlinkReader(device, baud, handler=process_message,
+                                         message_types=INTERESTED_TYPES if PARSER_FILTER else None,
+                                         forwarder=self.forwarder)
+
+    async def open(self):
+        try:
+            if self.log_path:
+                self.recorder = FlightRecorder(self.log_path)
+                self.recorder.start()
+                self.reader.recorder = self.recorder
+            await self.reader.open(self.heartbeat_timeout)
+        except Exception:
+            # Release the link and the forwarding sockets opened with the source
+            await self.close()
+            raise
+        self.system_id = self.reader.target_system
+        self.component_id = self.reader.target_component
+        self.connection_time = time.time()
+        set_primary_vehicle(self.system_id, self.component_id)
+
+    async def close(self):
+        self.reader.close()
+        if self.forwarder:
+            self.forwarder.close()
+        if self.recorder:
+            await asyncio.to_thread(self.recorder.stop)
+            self.recorder = None
+
+    def get_info(self) -> Dict[str, Any]:
+        info = super().get_info()
+        info.update(self.reader.get_info())
+        info["recorder"] = self.recorder.get_info() if self.recorder else None
+        return info
+
+
+def parse_links(devices: str, baud: int = 115200) -> List[Tuple[str, int]]:
+    """
+    Split a comma separated link list into (device, baud) pairs
+
+    Args:
+        devices: e.g. "/dev/ttyUSB0@57600,udpin:0.0.0.0:14550"; a trailing @baud
+            overrides `baud` for that link
+        baud: Baud rate of serial links without their own
+    """
+    links = []
+    for item in devices.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        device, _, link_baud = item.rpartition("@")
+        if device and link_baud.isdigit():
+            links.append((device, int(link_baud)))
+        else:
+            links.append((item, baud))
+    if not links:
+        raise ValueError("No links given")
+    return links
+
+
+class MultiLinkSource(TelemetrySource):
+    """
+    Several links to the same vehicles at once (e.g. a telemetry radio plus USB or UDP).
+
+    Every link has its own AsyncMavlinkReader on the event loop. Frames from
+    all links go through one SequenceDeduplicator before anything is
+    recorded, forwarded or ingested, so a frame that arrives on two links is
+    processed once and losing a link only loses its unique frames. Forwarded
+    frames are sent together once the current event loop callback is done.
+    """
+
+    kind = "multilink"
+
+    def __init__(self, devices: str, baud: int = 115200, log_path: Optional[str] = None,
+                 heartbeat_timeout: float = 10.0, forward: Optional[str] = None):
+        super().__init__()
+        self.log_path = log_path
+        self.heartbeat_timeout = heartbeat_timeout
+        self.recorder: Optional[FlightRecorder] = None
+        self.forwarder = create_forwarder(forward)
+        self._flush_scheduled = False
+        self.dedup = SequenceDeduplicator()
+        message_types = INTERESTED_TYPES if PARSER_FILTER else None
+        self.readers = [
+            AsyncMavlinkReader(device, link_baud, handler=lambda msg, index=index: self._handle(index, msg),
+                               message_types=message_types,
+                               unknown_handler=lambda frame, header, index=index: self._relay(index, frame, header))
+            for index, (device, link_baud) in enumerate(parse_links(devices, baud))
+        ]
+        self.accepted = [0] * len(self.readers)
+        self.duplicates = [0] * len(self.readers)
+        # device -> reason, for links that did not come up
+        self.failed: Dict[str, str] = {}
+
+    def _handle(self, index: int, msg):
+        if not self.dedup.accept(msg):
+            self.duplicates[index] += 1
+            link_counters.add("duplicates")
+            return
+        self.accepted[index] += 1
+        if self.recorder is not None:
+            self.recorder.record(msg.get_msgId(), msg.get_msgbuf(), getattr(msg, "_timestamp", None))
+        if self.forwarder is not None:
+            self._forward(msg.get_msgbuf())
+        process_message(msg)
+
+    def _relay(self, index: int, frame: bytes, header):
+        """Record and forward a frame of an unknown message id once, whichever link it came over first"""
+        if not self.dedup.accept_frame(*header):
+            self.duplicates[index] += 1
+            link_counters.add("duplicates")
+            return
+        self.accepted[index] += 1
+        if self.recorder is not None:
+            self.recorder.record(header[3], frame)
+        if self.forwarder is not None:
+            self._forward(frame)
+
+    def _forward(self, frame: bytes):
+        self.forwarder.forward(frame)
+        if not self._flush_scheduled:
+            # One send per endpoint for everything the links deliver in this loop iteration
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        self.forwarder.flush()
+
+    async def open(self):
+        if self.log_path:
+            self.recorder = FlightRecorder(self.log_path)
+            try:
+                self.recorder.start()
+            except Exception:
+                await self.close()
+                raise
+        results = await asyncio.gather(
+            *(reader.open(self.heartbeat_timeout) for reader in self.readers), return_exceptions=True
+        )
+        opened = []
+        for reader, result in zip(self.readers, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Link {reader.device} did not come up: {result}")
+                self.failed[reader.device] = str(result)
+                reader.close()
+            else:
+                opened.append(reader)
+        if not opened:
+            await self.close()
+            raise ConnectionError(f"No link came up: {'; '.join(f'{d}: {e}' for d, e in self.failed.items())}")
+
+        # The first link listed that came up names the primary vehicle
+        self.system_id = opened[0].target_system
+        self.component_id = opened[0].target_component
+        self.connection_time = time.time()
+        set_primary_vehicle(self.system_id, self.component_id)
+
+    async def close(self):
+        for reader in self.readers:
+            reader.close()
+        if self.forwarder:
+            self.forwarder.close()
+        if self.recorder:
+            await asyncio.to_thread(self.recorder.stop)
+            self.recorder = None
+
+    def get_info(self) -> Dict[str, Any]:
+        info = super().get_info()
+        links = []
+        for index, reader in enumerate(self.readers):
+            link = reader.get_info()
+            link.update({
+                "accepted": self.accepted[index],
+                "duplicates": self.duplicates[index],
+                "error": self.failed.get(reader.device)
+            })
+            links.append(link)
+        info.update({
+            "links": links,
+            "dedup": self.dedup.get_info(),
+            "recorder": self.recorder.get_info() if self.recorder else None
+        })
+        return info
+
+
+class ReplaySource(TelemetrySource):
+    """Recorded flight played back through the live pipeline"""
+
+    kind = "replay"
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        super().__init__()
+        self.replay = LogReplay(path, process_message, speed=speed, loop=loop)
+
+    def start(self):
+        self.connection_time = time.time()
+        self.replay.start()
+
+    def stop(self):
+        self.replay.stop()
+
+    def get_info(self) -> Dict[str, Any]:
+        info = super().get_info()
+        info["replay"] = self.replay.get_info()
+        return info
+
+
+def create_source(kind: str, device: str = "", baud: int = 115200, log_path: Optional[str] = None,
+                  speed: float = 1.0, loop: bool = False, forward: Optional[str] = None, seed: Optional[int] = 0,
+                  vehicles: int = 1, rates: Optional[Dict[str, float]] = None) -> TelemetrySource:
+    """
+    Build a telemetry source
+
+    Args:
+        kind: One of SOURCE_KINDS
+        device: Serial device or connection string for mavlink/mavlink_async, comma separated
+            links for multilink (see parse_links), log file path for replay
+        baud: Serial baud rate for mavlink/mavlink_async/multilink
+        log_path: Optional flight recorder log for mavlink/mavlink_async/multilink
+        speed: Replay or simulation speed multiple (0 = as fast as possible)
+        loop: Restart the replay when it reaches the end
+        forward: Comma separated udpout:host:port / tcp:host:port endpoints that
+            receive every frame of mavlink/mavlink_async/multilink as it arrived
+        seed: Simulator random seed (None = random)
+        vehicles: Number of simulated vehicles
+        rates: Simulated messages per second per store key (see simulated_mavlink.DEFAULT_RATES)
+
+    Returns:
+        TelemetrySource: Source ready to be activated
+    """
+    if kind == "simulator":
+        return SimulatorSource(seed, vehicles, rates, speed)
+    if kind == "mavlink":
+        return MavlinkSource(device, baud, log_path, forward=forward)
+    if kind == "mavlink_async":
+        return AsyncMavlinkSource(device, baud, log_path, forward=forward)
+    if kind == "multilink":
+        return MultiLinkSource(device, baud, log_path, forward=forward)
+    if kind == "replay":
+        return ReplaySource(device, speed, loop)
+    raise ValueError(f"Unknown telemetry source '{kind}', expected one of {', '.join(SOURCE_KINDS)}")
+
+
+# The source currently feeding the pipeline
+active_source: Optional[TelemetrySource] = None
+
+
+async def activate_source(source: TelemetrySource) -> TelemetrySource:
+    """Stop the current source, clear its telemetry and start `source`"""
+    global active_source
+    await deactivate_source()
+    await source.open()
+    active_source = source
+    logger.info(f"Telemetry source '{source.kind}' active")
+    return source
+
+
+async def deactivate_source():
+    """Stop the current source and clear its telemetry"""
+    global active_source
+    if active_source is not None:
+        await active_source.close()
+        logger.info(f"Telemetry source '{active_source.kind}' stopped")
+        active_source = None
+    clear_telemetry()
+
+
+def get_active_source() -> Optional[TelemetrySource]:
+    return active_source
@@ -0,0 +1,222 @@
+"""
+Versioned Telemetry Store
+Latest value per MAVLink message type, stamped with a monotonic sequence number
+"""
+
+import json
+import time
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sse_starlette.sse import ServerSentEvent
+from field_projection import FieldProjection
+from telemetry_encoding import encode_binary, sse_data
+from telemetry_metrics import record_serialization
+
+
+class StoreEntry:
+    """
+    Immutable snapshot of one message type at one version.
+
+    The entry doubles as the serialization cache: the JSON payload and the
+    encoded SSE frame are built on first read and shared by every subscriber.
+    Projected views and binary encodings are cached the same way.
+    A new write replaces the entry, which discards the cached encodings.
+
+    An entry can also hold a decoded message (anything with to_dict(),
+    e.g. a pymavlink message) instead of a dict; the dict is then built on
+    first read, so types nobody reads never pay for it.
+
+    `received` is the time.monotonic() at which the message came off the
+    link, carried into every view so streams can report their latency.
+    """
+
+    __slots__ = ("version", "count", "received", "_data", "_record", "_payload", "_frame", "_views", "_encoded")
+
+    def __init__(self, version: int, data: Any, count: int = 1, received: Optional[float] = None):
+        self.version = version
+        # Number of writes to this type since the store was last cleared
+        self.count = count
+        self.received = received if received is not None else time.monotonic()
+        if isinstance(data, dict):
+            self._data, self._record = data, None
+        else:
+            self._data, self._record = None, data
+        self._payload: Optional[str] = None
+        self._frame: Optional[bytes] = None
+        self._views: Optional[Dict[str, "StoreEntry"]] = None
+        # encoding -> (binary payload, SSE frame)
+        self._encoded: Optional[Dict[str, Tuple[bytes, bytes]]] = None
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Message fields as a dict"""
+        data = self._data
+        if data is None:
+            data = self._data = self._record.to_dict()
+        return data
+
+    def project(self, projection: Optional[FieldProjection]) -> "StoreEntry":
+        """Entry carrying only the projected fields, at the same version"""
+        if projection is None:
+            return self
+        views = self._views
+        if views is None:
+            views = self._views = {}
+        view = views.get(projection.key)
+        if view is None:
+            view = views[projection.key] = StoreEntry(self.version, projection.apply(self.data), self.count,
+                                                        self.received)
+        return view
+
+    def payload(self) -> str:
+        """JSON encoding of the message data"""
+        payload = self._payload
+        if payload is None:
+            start = time.perf_counter()
+            payload = self._payload = json.dumps(self.data)
+            record_serialization("json", time.perf_counter() - start)
+        return payload
+
+    def _binary_encoding(self, encoding: str) -> Tuple[bytes, bytes]:
+        encoded = self._encoded
+        if encoded is None:
+            encoded = self._encoded = {}
+        cached = encoded.get(encoding)
+        if cached is None:
+            start = time.perf_counter()
+            binary = encode_binary(self.data, encoding)
+            record_serialization(encoding, time.perf_counter() - start)
+            frame = ServerSentEvent(sse_data(binary), event="message", id=str(self.version)).encode()
+            cached = encoded[encoding] = (binary, frame)
+        return cached
+
+    def binary(self, encoding: str) -> bytes:
+        """Binary encoding ("packed" or "msgpack") of the message data"""
+        return self._binary_encoding(encoding)[0]
+
+    def sse_frame(self, encoding: str = "json") -> bytes:
+        """Complete SSE 'message' event carrying this version as its id"""
+        if encoding != "json":
+            return self._binary_encoding(encoding)[1]
+        frame = self._frame
+        if frame is None:
+            frame = self._frame = ServerSentEvent(
+                self.payload(), event="message", id=str(self.version)
+            ).encode()
+        return frame
+
+
+class TelemetryStore:
+    """
+    Dict-like store of the latest message per type.
+
+    Every write takes the next value of a store-wide sequence number, so a
+    reader can tell whether a type changed with a single integer comparison
+    instead of comparing whole message dicts. Entries are replaced, never
+    mutated, so readers on other threads always see a consistent pair of
+    version and data without locking.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._sequence = 0
+        self._entries: Dict[str, StoreEntry] = {}
+
+    @property
+    def sequence(self) -> int:
+        """Version assigned to the most recent write"""
+        return self._sequence
+
+    def update(self, message_type: str, data: Any, received: Optional[float] = None) -> int:
+        """
+        Store the latest message for a type
+
+        Args:
+            message_type: Store key (e.g. AHRS2, DISTANCE_SENSOR_D0)
+            data: Decoded message fields, or a decoded message with to_dict()
+            received: time.monotonic() when the message was received (defaults to now)
+
+        Returns:
+            int: Version assigned to this write
+        """
+        with self._lock:
+            self._sequence += 1
+            version = self._sequence
+            previous = self._entries.get(message_type)
+            count = previous.count + 1 if previous is not None else 1
+            self._entries[message_type] = StoreEntry(version, data, count, received)
+        return version
+
+    def alias(self, alias: str, message_type: str):
+        """Show the current entry of a key under another key too (same entry, same version)"""
+        entry = self._entries.get(message_type)
+        if entry is not None:
+            self._entries[alias] = entry
+
+    def rebind(self, alias: str, message_type: Optional[str]) -> bool:
+        """
+        Point an alias at the latest entry of a key under a new version, so
+        streams on the alias pick it up, or drop the alias when the key has no entry
+
+        Returns:
+            bool: Whether the alias changed
+        """
+        with self._lock:
+            entry = self._entries.get(message_type) if message_type is not None else None
+            if entry is None:
+                return self._entries.pop(alias, None) is not None
+            self._sequence += 1
+            data = entry._data if entry._data is not None else entry._record
+            self._entries[alias] = StoreEntry(self._sequence, data, entry.count, entry.received)
+        return True
+
+    def get_entry(self, message_type: str) -> Optional[StoreEntry]:
+        """Get the versioned entry for a message type"""
+        return self._entries.get(message_type)
+
+    def version(self, message_type: str) -> int:
+        """Version of the latest write for a type, or 0 if never written"""
+        entry = self._entries.get(message_type)
+        return entry.version if entry is not None else 0
+
+    def changed_since(self, message_type: str, version: int) -> bool:
+        """Check whether a type was written after the given version"""
+        return self.version(message_type) > version
+
+    def get(self, message_type: str, default: Any = None) -> Any:
+        entry = self._entries.get(message_type)
+        return entry.data if entry is not None else default
+
+    def keys(self) -> List[str]:
+        return list(self._entries.keys())
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        return [(message_type, entry.data) for message_type, entry in list(self._entries.items())]
+
+    def copy(self) -> Dict[str, Dict[str, Any]]:
+        """Plain dict snapshot of the latest messages"""
+        return dict(self.items())
+
+    def clear(self):
+        """Drop all entries; the sequence keeps counting so versions stay monotonic"""
+        with self._lock:
+            self._entries = {}
+
+    def __setitem__(self, message_type: str, data: Dict[str, Any]):
+        self.update(message_type, data)
+
+    def __getitem__(self, message_type: str) -> Dict[str, Any]:
+        return self._entries[message_type].data
+
+    def __contains__(self, message_type: object) -> bool:
+        return message_type in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Global instance shared by every telemetry source and stream
+telemetry_store = TelemetryStore()
@@ -0,0 +1,266 @@
+"""
+WebSocket Telemetry Sessions
+One connection carrying any set of message types, steered by a small JSON control protocol
+
+Client -> server (JSON text):
+    {"op": "subscribe", "types": ["AHRS2"], "fields": "roll,pitch", "hz": 5, "policy": "latest", "n": 1}
+    {"op": "subscribe", "types": ["AHRS2"], "system_id": 2, "component_id": 1}
+        Any op can name a vehicle; without one it applies to the primary vehicle
+    {"op": "unsubscribe", "types": ["AHRS2"]}       omit types to drop every subscription
+    {"op": "set_rate", "types": ["AHRS2"], "hz": 1, "policy": "aggregate"}   omit types for all
+    {"op": "snapshot", "types": ["AHRS2"]}          resend current values; omit types for all
+    {"op": "status"}
+
+Server -> client:
+    {"type": "message", "message_type": "AHRS2", "id": 42, "data": {...}}
+        Same data as /stream/{message_type}; binary MessagePack maps with the
+        same keys when the session uses encoding=msgpack. Types of vehicles
+        other than the primary one are named TYPE@system.component
+    {"type": "ack", "op": "...", "subscribed": [...]}
+    {"type": "status", "subscribed": [...], "queued": 0, "dropped": 0, "replaced": 0, "sent": 0}
+    {"type": "error", "message": "..."}
+"""
+
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+from fastapi import WebSocket, WebSocketDisconnect
+from telemetry_hub import telemetry_hub
+from telemetry_store import StoreEntry, telemetry_store
+from field_projection import FieldProjection, compile_projection
+from stream_decimation import StreamDecimator, create_decimator
+from telemetry_encoding import check_encoding, msgpack, msgpack_map
+from subscriber_queue import DEFAULT_QUEUE_SIZE, SubscriberQueue
+from vehicle_index import vehicle_index
+from telemetry_metrics import receive_to_enqueue, record_sent
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_ENCODINGS = ("json", "msgpack")
+
+# A client that takes nothing from its queue for this long is disconnected
+SLOW_CLIENT_TIMEOUT = 10.0
+
+# Close code for clients that cannot keep up ("try again later")
+CLOSE_SLOW_CLIENT = 1013
+
+
+class _TypeStream:
+    """Per-type state of a session: projection, decimation and last version sent"""
+
+    __slots__ = ("projection", "decimator", "last_version")
+
+    def __init__(self, projection: Optional[FieldProjection], decimator: Optional[StreamDecimator]):
+        self.projection = projection
+        self.decimator = decimator
+        self.last_version = 0
+
+    def select(self, message_type: str, entry: StoreEntry) -> Optional[StoreEntry]:
+        if self.decimator is not None:
+            return self.decimator.select(message_type, entry)
+        return entry.project(self.projection)
+
+
+class TelemetrySession:
+    """
+    A WebSocket client and the message types it currently watches.
+
+    A pump task turns store updates into frames on a bounded send queue and
+    a sender task drains it, so a slow socket never blocks the pump or other
+    clients. A pending frame is replaced by a newer one of the same type and
+    the oldest frame is dropped when the queue is full; a client that takes
+    nothing for SLOW_CLIENT_TIMEOUT seconds is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket, allowed_types: Iterable[str], encoding: str = "json",
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        if encoding not in WEBSOCKET_ENCODINGS:
+            raise ValueError(f"Unsupported WebSocket encoding '{encoding}', expected one of {', '.join(WEBSOCKET_ENCODINGS)}")
+        check_encoding(encoding)
+        self.websocket = websocket
+        self.allowed_types = frozenset(allowed_types)
+        self.encoding = encoding
+        client = f"{websocket.client.host}:{websocket.client.port}" if websocket.client else ""
+        self.queue = SubscriberQueue("/ws", client, queue_size)
+        self._streams: Dict[str, _TypeStream] = {}
+        self._deferred: Set[str] = set()
+        self._subscription = None
+
+    async def run(self, types: Optional[List[str]] = None):
+        """Serve the connection until the client disconnects or falls too far behind"""
+        await self.websocket.accept()
+        self._subscription = telemetry_hub.subscribe([])
+        if types:
+            self.queue.put(json.dumps(self.handle({"op": "subscribe", "types": types})))
+        tasks = [
+            asyncio.create_task(self._receive()),
+            asyncio.create_task(self._pump()),
+            asyncio.create_task(self._send())
+        ]
+        try:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None \
+                        and not isinstance(task.exception(), WebSocketDisconnect):
+                    logger.error(f"WebSocket session failed: {task.exception()}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._subscription.close()
+            self.queue.close()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply one control message and build the reply"""
+        try:
+            op = request.get("op")
+            if op == "status":
+                return self.status()
+            if op == "subscribe":
+                types = self._types(request.get("types"), request)
+                projection = compile_projection(request.get("fields"))
+                for message_type in types:
+                    self._streams[message_type] = _TypeStream(
+                        projection, create_decimator(request.get("hz"), request.get("policy"), request.get("n"), projection)
+                    )
+                self._retarget()
+                # New subscribers start with the current value
+                self._subscription.notify(types)
+            elif op == "unsubscribe":
+                for message_type in self._selected(request.get("types"), request):
+                    self._streams.pop(message_type, None)
+                    self._deferred.discard(message_type)
+                self._retarget()
+            elif op == "set_rate":
+                for message_type in self._selected(request.get("types"), request):
+                    stream = self._streams[message_type]
+                    stream.decimator = create_decimator(
+                        request.get("hz"), request.get("policy"), request.get("n"), stream.projection
+                    )
+            elif op == "snapshot":
+                types = self._selected(request.get("types"), request)
+                for message_type in types:
+                    self._streams[message_type].last_version = 0
+                self._subscription.notify(types)
+            else:
+                raise ValueError(f"Unknown op '{op}'")
+            return {"type": "ack", "op": op, "subscribed": sorted(self._streams)}
+        except (ValueError, TypeError, AttributeError) as e:
+            return {"type": "error", "message": str(e)}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "type": "status",
+            "subscribed": sorted(self._streams),
+            "encoding": self.encoding,
+            "queued": self.queue.depth,
+            "dropped": self.queue.dropped,
+            "replaced": self.queue.replaced,
+            "sent": self.queue.delivered
+        }
+
+    def _types(self, types: Any, request: Dict[str, Any]) -> List[str]:
+        """
+        Validate a types list (or comma separated string) against the allowed types
+
+        Returns:
+            List[str]: Store keys of the types for the vehicle the request names
+        """
+        if isinstance(types, str):
+            types = [t for t in types.split(",") if t]
+        if not types:
+            raise ValueError("No message types given")
+        unsupported = [t for t in types if t not in self.allowed_types]
+        if unsupported:
+            raise ValueError(f"Unsupported message type: {', '.join(unsupported)}")
+        system_id, component_id = request.get("system_id"), request.get("component_id")
+        for value in (system_id, component_id):
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                raise ValueError("system_id and component_id must be integers")
+        return [vehicle_index.resolve(t, system_id, component_id) for t in types]
+
+    def _selected(self, types: Any, request: Dict[str, Any]) -> List[str]:
+        """Subscribed types named in a request, or all of them when none are named"""
+        if types is None:
+            return list(self._streams)
+        types = self._types(types, request)
+        missing = [t for t in types if t not in self._streams]
+        if missing:
+            raise ValueError(f"Not subscribed to: {', '.join(missing)}")
+        return types
+
+    def _retarget(self):
+        telemetry_hub.resubscribe(self._subscription, list(self._streams))
+
+    async def _receive(self):
+        while True:
+            message = await self.websocket.receive_text()
+            try:
+                request = json.loads(message)
+            except ValueError:
+                request = None
+            if isinstance(request, dict):
+                reply = self.handle(request)
+            else:
+                reply = {"type": "error", "message": "Control messages must be JSON objects"}
+            self.queue.put(json.dumps(reply))
+
+    async def _pump(self):
+        while True:
+            # Wake for new data, or when a rate-limited type's next slot opens
+            delays = [
+                self._streams[t].decimator.delay() for t in self._deferred
+                if self._streams[t].decimator is not None
+            ]
+            try:
+                changed = await asyncio.wait_for(self._subscription.wait(), min(delays) if delays else None)
+            except asyncio.TimeoutError:
+                changed = set()
+            changed |= self._deferred
+            self._deferred = set()
+
+            for message_type in changed:
+                stream = self._streams.get(message_type)
+                if stream is None:
+                    continue
+                if stream.decimator is not None and stream.decimator.delay() > 0:
+                    self._deferred.add(message_type)
+                    continue
+                entry = telemetry_store.get_entry(message_type)
+                if entry is None or entry.version == stream.last_version:
+                    continue
+                stream.last_version = entry.version
+                entry = stream.select(message_type, entry)
+                if entry is not None:
+                    receive_to_enqueue.observe(message_type, time.monotonic() - entry.received)
+                    # A newer frame of a type replaces the one still waiting
+                    self.queue.put(self._frame(message_type, entry), message_type)
+
+            if self.queue.stalled_for() > SLOW_CLIENT_TIMEOUT:
+                logger.warning(f"Disconnecting slow WebSocket client after dropping {self.queue.dropped} frames")
+                await self.websocket.close(code=CLOSE_SLOW_CLIENT)
+                return
+
+    def _frame(self, message_type: str, entry: StoreEntry) -> Union[str, bytes]:
+        """Message frame around the entry's cached encoding"""
+        if self.encoding == "msgpack":
+            return msgpack_map([
+                ("type", msgpack.packb("message")),
+                ("message_type", msgpack.packb(message_type)),
+                ("id", msgpack.packb(entry.version)),
+                ("data", entry.binary("msgpack"))
+            ])
+        return f'{{"type":"message","message_type":"{message_type}","id":{entry.version},"data":{entry.payload()}}}'
+
+    async def _send(self):
+        while True:
+            frame = await self.queue.get()
+            if isinstance(frame, str):
+                await self.websocket.send_text(frame)
+            else:
+                await self.websocket.send_bytes(frame)
+            record_sent(self.queue.stream, len(frame))
@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+from app import app
+from telemetry_ingest import clear_telemetry, ingest
+
+
+@pytest.fixture
+def client():
+    # Without the context manager startup does not run, so no source feeds the store
+    clear_telemetry()
+    yield TestClient(app)
+    clear_telemetry()
+
+
+def test_messages_lists_plain_types_and_types_per_vehicle(client):
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    ingest("GPS", {"lat": 1.0}, 1, 1)
+    ingest("AHRS2", {"roll": 0.2}, 2, 1)
+    body = client.get("/mavlink/messages").json()
+    assert sorted(body["messages"]) == ["AHRS2", "GPS"]
+    assert [(v["system_id"], v["component_id"], sorted(v["messages"])) for v in body["vehicles"]] == [
+        (1, 1, ["AHRS2", "GPS"]), (2, 1, ["AHRS2"])
+    ]
+
+
+def test_status_of_unknown_vehicle_is_404(client):
+    ingest("HEARTBEAT", {"mavlink_version": 3}, 1, 1)
+    assert client.get("/mavlink/status", params={"system_id": 9}).status_code == 404
+    assert client.get("/mavlink/status", params={"system_id": 1}).status_code == 200
+
+
+def test_packed_schema_survives_a_full_queue(client):
+    import asyncio
+
+    from app import pump_message_type
+    from subscriber_queue import SubscriberQueue
+
+    async def run():
+        queue = SubscriberQueue("/stream/AHRS2", maxsize=1)
+        ingest("AHRS2", {"roll": 0.1}, 1, 1)
+        pump = asyncio.create_task(pump_message_type("AHRS2", queue, None, None, "packed"))
+        await asyncio.sleep(0.01)
+        for roll in (0.2, 0.3):
+            ingest("AHRS2", {"roll": roll}, 1, 1)
+            await asyncio.sleep(0.01)
+        pump.cancel()
+        frames = [await queue.get() for _ in range(queue.depth)]
+        queue.close()
+        return queue.dropped, frames
+
+    dropped, frames = asyncio.run(run())
+    assert dropped
+    assert frames[0]["event"] == "schema"
+    assert len(frames) == 2
+
+
+@pytest.mark.parametrize("hz", [-1, 0])
+def test_stream_all_rejects_non_positive_hz(client, hz):
+    assert client.get("/stream/all", params={"hz": hz}).status_code == 400
+
+
+def test_single_type_stream_rejects_bad_decimation(client):
+    assert client.get("/stream/AHRS2", params={"hz": -1}).status_code == 400
+    assert client.get("/stream/AHRS2", params={"policy": "bogus"}).status_code == 400
+    assert client.get("/stream/AHRS2", params={"n": 0}).status_code == 400
@@ -0,0 +1,28 @@
+from field_projection import FieldProjection, compile_projection, compile_type_projections
+
+
+def test_empty_selects_whole_message():
+    assert compile_projection(None) is None
+    assert compile_projection("") is None
+    assert compile_projection(" , ,") is None
+
+
+def test_order_and_duplicates_share_one_projection():
+    projection = compile_projection("yaw,roll,yaw")
+    assert projection.fields == ("roll", "yaw")
+    assert projection.key == "roll,yaw"
+    assert compile_projection(" roll , yaw") is projection
+
+
+def test_apply_keeps_selected_fields_only():
+    projection = compile_projection("roll,altitude")
+    assert projection.apply({"roll": 0.1, "pitch": 0.2, "yaw": 0.3}) == {"roll": 0.1}
+    assert FieldProjection([]).apply({"roll": 0.1}) == {}
+
+
+def test_type_projections():
+    projections = compile_type_projections("AHRS2.roll,AHRS2.yaw,GPS.lat,bogus,GPS.")
+    assert sorted(projections) == ["AHRS2", "GPS"]
+    assert projections["AHRS2"].fields == ("roll", "yaw")
+    assert projections["GPS"] is compile_projection("lat")
+    assert compile_type_projections(None) == {}
@@ -0,0 +1,106 @@
+import shutil
+
+import pytest
+from pymavlink import mavutil
+
+from flight_recorder import FlightLog, FlightRecorder, index_path
+
+
+def heartbeat_frame(seq: int) -> bytes:
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    mav.seq = seq
+    return bytes(mavutil.mavlink.MAVLink_heartbeat_message(2, 3, 0, seq, 4, 3).pack(mav))
+
+
+def attitude_frame(seq: int, roll: float) -> bytes:
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    mav.seq = seq
+    return bytes(mavutil.mavlink.MAVLink_attitude_message(seq, roll, 0.0, 0.0, 0.0, 0.0, 0.0).pack(mav))
+
+
+def record(path, frames):
+    recorder = FlightRecorder(str(path))
+    recorder.start()
+    for timestamp, msg_id, frame in frames:
+        recorder.record(msg_id, frame, timestamp)
+    recorder.stop()
+    return recorder
+
+
+@pytest.fixture
+def frames():
+    frames = []
+    for i in range(20):
+        if i % 4 == 0:
+            frames.append((1000.0 + i, mavutil.mavlink.MAVLINK_MSG_ID_HEARTBEAT, heartbeat_frame(i)))
+        else:
+            frames.append((1000.0 + i, mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, attitude_frame(i, i / 10)))
+    return frames
+
+
+def test_round_trip(tmp_path, frames):
+    path = tmp_path / "flight.bin"
+    recorder = record(path, frames)
+    assert recorder.records == len(frames)
+
+    log = FlightLog(str(path))
+    try:
+        assert len(log) == len(frames)
+        assert (log.start_time, log.end_time) == (1000.0, 1019.0)
+        assert log.message_types() == {"HEARTBEAT": 5, "ATTITUDE": 15}
+        for (timestamp, frame), (expected_time, _, expected) in zip(log.frames(), frames):
+            assert timestamp == expected_time
+            assert bytes(frame) == expected
+            # Views into the map must be released before the log is closed
+            frame.release()
+        rolls = [msg.roll for _, msg in log.messages("ATTITUDE", start=1010.0)]
+        assert rolls == pytest.approx([i / 10 for i in range(10, 20) if i % 4])
+    finally:
+        log.close()
+
+
+def test_reads_without_index(tmp_path, frames):
+    path = tmp_path / "flight.bin"
+    record(path, frames)
+    index = index_path(str(path))
+    shutil.move(index, index + ".bak")
+
+    log = FlightLog(str(path))
+    try:
+        assert len(log) == len(frames)
+        assert len(log.positions("HEARTBEAT")) == 5
+    finally:
+        log.close()
+
+
+def test_rerecording_drops_stale_index(tmp_path, frames):
+    path = tmp_path / "flight.bin"
+    record(path, frames)
+    saved = tmp_path / "saved.idx.npz"
+    shutil.copy(index_path(str(path)), saved)
+
+    # A new recording at the same path must not be read through the old index
+    recorder = FlightRecorder(str(path))
+    recorder.start()
+    assert not (tmp_path / "flight.bin.idx.npz").exists()
+    for timestamp, msg_id, frame in frames[:3]:
+        recorder.record(msg_id, frame, timestamp)
+    recorder.stop()
+    log = FlightLog(str(path))
+    try:
+        assert len(log) == 3
+    finally:
+        log.close()
+
+    # An index describing another file is ignored and rebuilt from the log
+    shutil.copy(saved, index_path(str(path)))
+    log = FlightLog(str(path))
+    try:
+        assert len(log) == 3
+        recorded = []
+        for _, frame in log.frames():
+            recorded.append(bytes(frame))
+            frame.release()
+        assert recorded == [frame for _, _, frame in frames[:3]]
+    finally:
+        log.close()
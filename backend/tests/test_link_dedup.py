@@ -0,0 +1,58 @@
+from pymavlink import mavutil
+
+from link_dedup import SequenceDeduplicator
+
+
+def parse(frame: bytes):
+    """Decode a frame with a fresh parser, as each link has its own"""
+    parser = mavutil.mavlink.MAVLink(None)
+    return parser.parse_buffer(frame)[0]
+
+
+def attitude_frame(seq: int, roll: float, system_id: int = 1) -> bytes:
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=system_id, srcComponent=1)
+    mav.seq = seq
+    return bytes(mavutil.mavlink.MAVLink_attitude_message(seq, roll, 0.0, 0.0, 0.0, 0.0, 0.0).pack(mav))
+
+
+def test_copy_from_second_link_is_dropped():
+    dedup = SequenceDeduplicator()
+    frame = attitude_frame(7, 0.5)
+    assert dedup.accept(parse(frame))
+    assert not dedup.accept(parse(frame))
+    assert (dedup.accepted, dedup.duplicates) == (1, 1)
+
+
+def test_different_frames_are_kept():
+    dedup = SequenceDeduplicator()
+    assert dedup.accept(parse(attitude_frame(7, 0.5)))
+    # Same sequence number, different content (CRC)
+    assert dedup.accept(parse(attitude_frame(7, 0.6)))
+    # Same content from another sender
+    assert dedup.accept(parse(attitude_frame(7, 0.6, system_id=2)))
+    assert dedup.accept(parse(attitude_frame(8, 0.6)))
+    assert dedup.duplicates == 0
+    assert dedup.get_info()["senders"] == 2
+
+
+def test_match_outside_window_is_a_new_frame():
+    # With no window, a sequence number that came round again is never taken for a copy
+    dedup = SequenceDeduplicator(window=0.0)
+    frame = attitude_frame(7, 0.5)
+    assert dedup.accept(parse(frame))
+    assert dedup.accept(parse(frame))
+
+
+def test_accept_frame_matches_by_header():
+    dedup = SequenceDeduplicator()
+    assert dedup.accept_frame(1, 1, 3, 60001, 0xBEEF)
+    assert not dedup.accept_frame(1, 1, 3, 60001, 0xBEEF)
+    assert dedup.accept_frame(1, 1, 3, 60001, 0xBEEE)
+
+
+def test_clear_forgets_frames():
+    dedup = SequenceDeduplicator()
+    frame = attitude_frame(7, 0.5)
+    dedup.accept(parse(frame))
+    dedup.clear()
+    assert dedup.accept(parse(frame))
@@ -0,0 +1,83 @@
+import time
+
+from pymavlink import mavutil
+
+from flight_recorder import FlightRecorder
+from log_replay import LogReplay
+
+
+def write_log(path, count: int = 50, step: float = 0.1):
+    """Flight recorder log of ATTITUDE messages whose time_boot_ms is the record index"""
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=1, srcComponent=1)
+    recorder = FlightRecorder(str(path))
+    recorder.start()
+    for i in range(count):
+        mav.seq = i % 256
+        frame = bytes(mavutil.mavlink.MAVLink_attitude_message(i, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0).pack(mav))
+        recorder.record(mavutil.mavlink.MAVLINK_MSG_ID_ATTITUDE, frame, 1000.0 + i * step)
+    recorder.stop()
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_replays_whole_log(tmp_path):
+    write_log(tmp_path / "flight.bin")
+    received = []
+    replay = LogReplay(str(tmp_path / "flight.bin"), received.append, speed=0)
+    try:
+        assert replay.format == "flight_recorder"
+        assert abs(replay.duration - 4.9) < 1e-9
+        replay.start()
+        wait_for(lambda: replay.at_end)
+        assert [msg.time_boot_ms for msg in received] == list(range(50))
+    finally:
+        replay.stop()
+    assert replay.get_info()["format"] == "flight_recorder"
+
+
+def test_seek_after_end_resumes(tmp_path):
+    write_log(tmp_path / "flight.bin")
+    received = []
+    replay = LogReplay(str(tmp_path / "flight.bin"), received.append, speed=0)
+    try:
+        replay.start()
+        wait_for(lambda: replay.at_end)
+        received.clear()
+
+        replay.seek(2.5)
+        wait_for(lambda: len(received) == 25 and replay.at_end)
+        assert [msg.time_boot_ms for msg in received] == list(range(25, 50))
+        assert replay.running
+    finally:
+        replay.stop()
+    assert not replay.running
+
+
+def test_seek_while_paced(tmp_path):
+    write_log(tmp_path / "flight.bin")
+    received = []
+    # 1000 times slower than real time: each 0.1 s step takes 100 s, so the
+    # replay stays parked in the pacing wait until a control call interrupts it
+    replay = LogReplay(str(tmp_path / "flight.bin"), received.append, speed=0.001)
+    try:
+        replay.start()
+        wait_for(lambda: replay.messages_replayed == 1)
+
+        # The seek cuts the wait for record 1 short and plays record 45 straight away
+        replay.seek(4.5)
+        wait_for(lambda: replay.messages_replayed == 2)
+        assert [msg.time_boot_ms for msg in received] == [0, 45]
+        assert abs(replay.get_info()["position"] - 4.5) < 1e-9
+
+        # Full speed plays out the rest
+        replay.set_speed(0)
+        wait_for(lambda: replay.at_end)
+        assert [msg.time_boot_ms for msg in received] == [0, 45, 46, 47, 48, 49]
+        assert replay.messages_replayed == 6
+    finally:
+        replay.stop()
@@ -0,0 +1,160 @@
+import asyncio
+import socket
+
+import pytest
+from pymavlink import mavutil
+
+from mavlink_forwarder import MAX_TCP_BACKLOG, MavlinkForwarder, create_forwarder, unknown_frame, \
+    unknown_frame_header
+from telemetry_sources import MavlinkSource, MultiLinkSource
+
+
+class PartialSocket:
+    """Connected socket whose sendmsg takes a scripted number of bytes per call"""
+
+    def __init__(self, accepted):
+        self.accepted = list(accepted)
+        self.received = b""
+        self.closed = False
+
+    def sendmsg(self, buffers):
+        data = b"".join(bytes(buffer) for buffer in buffers)
+        count = min(self.accepted.pop(0), len(data))
+        self.received += data[:count]
+        return count
+
+    def close(self):
+        self.closed = True
+
+
+def tcp_forwarder(accepted):
+    forwarder = MavlinkForwarder(["tcp:127.0.0.1:9"])
+    endpoint = forwarder.endpoints[0]
+    endpoint.sock = PartialSocket(accepted)
+    return forwarder, endpoint
+
+
+def test_partial_send_keeps_only_the_unsent_tail():
+    forwarder, endpoint = tcp_forwarder([5, 100])
+    forwarder.forward(b"aaaa")
+    forwarder.forward(b"bbbb")
+    forwarder.flush()
+    # The first frame went out whole, one byte of the second
+    assert (endpoint.packets, endpoint.bytes) == (1, 5)
+    assert endpoint._backlog == [b"bbb"]
+
+    forwarder.forward(b"cccc")
+    forwarder.flush()
+    assert endpoint.sock.received == b"aaaabbbbcccc"
+    assert (endpoint.packets, endpoint.bytes, endpoint.dropped) == (3, 12, 0)
+    assert endpoint._backlog == []
+
+
+def test_backlog_overflow_drops_and_reconnects():
+    forwarder, endpoint = tcp_forwarder([0])
+    sock = endpoint.sock
+    frame = b"x" * 1000
+    frames = MAX_TCP_BACKLOG // len(frame) + 1
+    for _ in range(frames):
+        endpoint.send([frame], len(frame))
+        if endpoint.sock is None:
+            break
+        endpoint.sock.accepted.append(0)
+    assert sock.closed
+    assert endpoint.sock is None
+    assert (endpoint.packets, endpoint.bytes, endpoint.dropped) == (0, 0, frames)
+
+
+def test_unreachable_tcp_endpoint_drops_without_blocking():
+    forwarder = MavlinkForwarder(["tcp:127.0.0.1:1"])
+    forwarder.forward(b"frame")
+    forwarder.flush()
+    endpoint = forwarder.endpoints[0]
+    assert (endpoint.packets, endpoint.dropped) == (0, 1)
+    forwarder.close()
+
+
+def test_udp_and_tcp_delivery():
+    udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.bind(("127.0.0.1", 0))
+    udp.settimeout(2)
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    forwarder = create_forwarder(f"udpout:127.0.0.1:{udp.getsockname()[1]}, tcp:127.0.0.1:{listener.getsockname()[1]}")
+    try:
+        # The first send starts the TCP connect; it is dropped unless the connect completes at once
+        forwarder.forward(b"early")
+        forwarder.flush()
+        connection, _ = listener.accept()
+        connection.settimeout(2)
+        forwarder.forward(b"one")
+        forwarder.forward(b"two")
+        forwarder.flush()
+        assert udp.recv(100) == b"early"
+        assert udp.recv(100) == b"onetwo"
+        udp_info, tcp_info = forwarder.get_info()
+        expected = b"earlyonetwo" if tcp_info["packets"] == 3 else b"onetwo"
+        received = b""
+        while len(received) < len(expected):
+            received += connection.recv(100)
+        assert received == expected
+        assert udp_info["packets"] == 3
+        assert tcp_info["packets"] + tcp_info["dropped"] == 3
+        connection.close()
+    finally:
+        forwarder.close()
+        udp.close()
+        listener.close()
+
+
+def test_bad_endpoint_closes_the_ones_before_it():
+    with pytest.raises(ValueError):
+        MavlinkForwarder(["udpout:127.0.0.1:9", "bogus:1"])
+    assert create_forwarder(" , ") is None
+
+
+def test_failed_connect_closes_forwarding_sockets():
+    source = MavlinkSource("udpin:127.0.0.1:0", heartbeat_timeout=0.1, forward="udpout:127.0.0.1:9")
+    sock = source.forwarder.endpoints[0].sock
+    with pytest.raises(TimeoutError):
+        source.start()
+    assert sock.fileno() == -1
+
+
+def test_failed_multilink_closes_forwarding_sockets(tmp_path):
+    source = MultiLinkSource("udpin:127.0.0.1:0", log_path=str(tmp_path / "missing" / "flight.bin"),
+                             forward="udpout:127.0.0.1:9")
+    sock = source.forwarder.endpoints[0].sock
+    with pytest.raises(OSError):
+        asyncio.run(source.open())
+    assert sock.fileno() == -1
+
+
+def unknown_id_frame() -> bytes:
+    """Heartbeat frame relabelled with a message id the dialect does not know"""
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=3, srcComponent=1)
+    frame = bytearray(mavutil.mavlink.MAVLink_heartbeat_message(1, 2, 3, 4, 5, 3).pack(mav))
+    if frame[0] == mavutil.mavlink.PROTOCOL_MARKER_V2:
+        msg_id = next(i for i in range(1000, 1 << 24) if i not in mavutil.mavlink.mavlink_map)
+        frame[7:10] = msg_id.to_bytes(3, "little")
+    else:
+        frame[5] = next(i for i in range(256) if i not in mavutil.mavlink.mavlink_map)
+    return bytes(frame)
+
+
+def test_unknown_id_frames_are_relayed_as_received():
+    frame = unknown_id_frame()
+    header = unknown_frame_header(frame)
+    assert header[:3] == (3, 1, 0)
+    parser = mavutil.mavlink.MAVLink(None)
+    parser.robust_parsing = True
+    msg = parser.parse_buffer(frame)[0]
+    assert unknown_frame(msg) == (frame, header)
+
+
+def test_known_and_truncated_frames_are_not_unknown():
+    mav = mavutil.mavlink.MAVLink(None, srcSystem=3, srcComponent=1)
+    heartbeat = bytes(mavutil.mavlink.MAVLink_heartbeat_message(1, 2, 3, 4, 5, 3).pack(mav))
+    assert unknown_frame_header(heartbeat) is None
+    assert unknown_frame_header(unknown_id_frame()[:-1]) is None
@@ -0,0 +1,62 @@
+import pytest
+
+from simulated_mavlink import SimulatedMAVLink
+
+
+class RecordingSimulator(SimulatedMAVLink):
+    """Keeps what would be ingested instead of publishing it"""
+
+    def reset(self):
+        super().reset()
+        self.sent = []
+
+    def _update(self, message_type, msg, system_id=1, component_id=1):
+        self.sent.append((message_type, system_id, component_id, msg))
+
+
+def simulate(seconds=2.0, **kwargs):
+    simulator = RecordingSimulator(**kwargs)
+    simulator.run(seconds)
+    return simulator.sent
+
+
+def test_same_seed_gives_the_same_flight():
+    assert simulate(seed=7, vehicles=2) == simulate(seed=7, vehicles=2)
+
+
+def test_different_seeds_give_different_flights():
+    assert simulate(seed=7) != simulate(seed=8)
+
+
+def test_runs_restart_from_the_beginning():
+    simulator = RecordingSimulator(seed=3)
+    simulator.run(1.0)
+    first = simulator.sent
+    simulator.run(1.0)
+    assert simulator.sent == first
+
+
+def test_a_types_values_do_not_depend_on_the_other_types():
+    alone = simulate(seed=5, rates={"AHRS2": 50})
+    together = [sent for sent in simulate(seed=5) if sent[0] == "AHRS2"]
+    assert alone == together
+
+
+def test_random_seed_is_reported_for_repeating_the_run():
+    simulator = RecordingSimulator(seed=None)
+    simulator.run(1.0)
+    assert simulate(1.0, seed=simulator.seed) == simulator.sent
+
+
+def test_each_type_is_sent_at_its_rate_for_every_vehicle():
+    sent = simulate(1.0, rates={"AHRS2": 50, "GPS": 5}, vehicles=3)
+    assert sum(1 for message_type, *_ in sent if message_type == "AHRS2") == 150
+    assert sum(1 for message_type, *_ in sent if message_type == "GPS") == 15
+    assert {system_id for _, system_id, component_id, _ in sent} == {1, 2, 3}
+
+
+@pytest.mark.parametrize("kwargs", [{"rates": {"NOT_A_TYPE": 1}}, {"vehicles": 0}, {"speed": -1},
+                                    {"rates": {"AHRS2": -1}}])
+def test_invalid_configuration_is_rejected(kwargs):
+    with pytest.raises(ValueError):
+        SimulatedMAVLink(**kwargs)
@@ -0,0 +1,95 @@
+import pytest
+
+from field_projection import compile_projection
+from stream_decimation import StreamDecimator, create_decimator
+from telemetry_ingest import clear_telemetry, ingest
+from telemetry_store import TelemetryStore, telemetry_store
+
+
+@pytest.fixture(autouse=True)
+def clean_telemetry():
+    clear_telemetry()
+    yield
+    clear_telemetry()
+
+
+def test_create_decimator_only_when_needed():
+    assert create_decimator() is None
+    assert create_decimator(0, "latest", 1) is None
+    assert create_decimator(hz=5).policy == "latest"
+    assert create_decimator(n=3).policy == "nth"
+    assert create_decimator(policy="aggregate").policy == "aggregate"
+
+
+@pytest.mark.parametrize("hz, policy, n", [(-1, None, None), (1, "sometimes", None), (None, "nth", 0)])
+def test_create_decimator_rejects_bad_parameters(hz, policy, n):
+    with pytest.raises(ValueError):
+        create_decimator(hz, policy, n)
+
+
+def test_latest_waits_an_interval_between_sends():
+    store = TelemetryStore()
+    store.update("AHRS2", {"roll": 0.1, "pitch": 0.2})
+    decimator = StreamDecimator(hz=2, projection=compile_projection("roll"))
+    assert decimator.delay() == 0
+
+    selected = decimator.select("AHRS2", store.get_entry("AHRS2"))
+    assert selected.data == {"roll": 0.1}
+    # The projected view is the entry's shared one, with its cached encodings
+    assert selected is store.get_entry("AHRS2").project(decimator.projection)
+    assert 0 < decimator.delay() <= 0.5
+
+
+def test_unlimited_rate_never_delays():
+    store = TelemetryStore()
+    store.update("AHRS2", {"roll": 0.1})
+    decimator = StreamDecimator(policy="nth", n=1)
+    decimator.select("AHRS2", store.get_entry("AHRS2"))
+    assert decimator.delay() == 0
+
+
+def test_nth_sends_every_nth_update():
+    store = TelemetryStore()
+    decimator = StreamDecimator(policy="nth", n=3)
+    sent = []
+    for roll in range(10):
+        store.update("AHRS2", {"roll": roll})
+        if decimator.select("AHRS2", store.get_entry("AHRS2")) is not None:
+            sent.append(roll)
+    assert sent == [0, 3, 6, 9]
+
+
+def test_nth_starts_over_after_the_store_is_cleared():
+    store = TelemetryStore()
+    decimator = StreamDecimator(policy="nth", n=3)
+    for roll in range(5):
+        store.update("AHRS2", {"roll": roll})
+        decimator.select("AHRS2", store.get_entry("AHRS2"))
+    store.clear()
+    store.update("AHRS2", {"roll": 10})
+    assert decimator.select("AHRS2", store.get_entry("AHRS2")).data == {"roll": 10}
+
+
+def test_aggregate_covers_each_interval_once():
+    decimator = StreamDecimator(hz=1, policy="aggregate", projection=compile_projection("roll"))
+    for roll in (0.1, 0.5, 0.3):
+        ingest("AHRS2", {"roll": roll, "pitch": 0.0}, 1, 1)
+    first = decimator.select("AHRS2", telemetry_store.get_entry("AHRS2")).data
+    assert first["roll"] == 0.3 and "pitch" not in first
+    assert first["aggregate"]["samples"] == 3
+    assert first["aggregate"]["min"] == {"roll": 0.1}
+    assert first["aggregate"]["max"] == {"roll": 0.5}
+    assert first["aggregate"]["mean"]["roll"] == pytest.approx(0.3)
+
+    # The next send only summarises samples recorded since the previous one
+    ingest("AHRS2", {"roll": 0.7, "pitch": 0.0}, 1, 1)
+    second = decimator.select("AHRS2", telemetry_store.get_entry("AHRS2")).data
+    assert second["aggregate"]["samples"] == 1
+    assert second["aggregate"]["mean"] == {"roll": 0.7}
+
+
+def test_aggregate_without_history_sends_the_latest_value():
+    store = TelemetryStore()
+    store.update("AHRS2", {"roll": 0.1})
+    selected = StreamDecimator(policy="aggregate").select("AHRS2", store.get_entry("AHRS2"))
+    assert selected.data == {"roll": 0.1}
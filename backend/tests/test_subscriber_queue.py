@@ -0,0 +1,80 @@
+import asyncio
+
+from subscriber_queue import SubscriberQueue, subscriber_queues
+
+
+def drain(queue: SubscriberQueue):
+    async def take():
+        return [await queue.get() for _ in range(queue.depth)]
+    return asyncio.run(take())
+
+
+def test_full_queue_drops_oldest():
+    queue = SubscriberQueue("/stream/test", maxsize=3)
+    try:
+        for i in range(5):
+            queue.put(i)
+        assert queue.depth == 3
+        assert queue.dropped == 2
+        assert drain(queue) == [2, 3, 4]
+        assert queue.delivered == 3
+        assert queue.max_depth == 3
+    finally:
+        queue.close()
+
+
+def test_keyed_items_replace_pending_in_place():
+    queue = SubscriberQueue("/stream/test", maxsize=3)
+    try:
+        queue.put("ahrs-1", "AHRS2")
+        queue.put("schema")
+        queue.put("ahrs-2", "AHRS2")
+        queue.put("gps-1", "GPS")
+        assert queue.replaced == 1
+        assert queue.dropped == 0
+        # The replacement keeps the original position
+        assert drain(queue) == ["ahrs-2", "schema", "gps-1"]
+        # Once taken, the key queues again
+        queue.put("ahrs-3", "AHRS2")
+        assert drain(queue) == ["ahrs-3"]
+    finally:
+        queue.close()
+
+
+def test_get_all_takes_everything_in_order():
+    queue = SubscriberQueue("/stream/test")
+    try:
+        queue.put(1, "a")
+        queue.put(2, "b")
+        items = asyncio.run(queue.get_all())
+        assert items == [("a", 1), ("b", 2)]
+        assert queue.depth == 0
+        assert queue.stalled_for() == 0.0
+    finally:
+        queue.close()
+
+
+def test_stats_and_registration():
+    queue = SubscriberQueue("/stream/test", "127.0.0.1:5000", maxsize=2)
+    assert queue in subscriber_queues()
+    queue.put(1)
+    queue.put(2)
+    queue.put(3)
+    stats = queue.stats()
+    assert (stats["depth"], stats["capacity"], stats["dropped"], stats["client"]) == (2, 2, 1, "127.0.0.1:5000")
+    assert stats["stalled_for"] >= 0.0
+    queue.close()
+    assert queue not in subscriber_queues()
+
+
+def test_pinned_items_are_never_dropped():
+    queue = SubscriberQueue("/stream/test", maxsize=2)
+    try:
+        queue.put("schema", pinned=True)
+        queue.put("record-1")
+        queue.put("record-2", "AHRS2")
+        queue.put("record-3", "GPS")
+        assert queue.dropped == 2
+        assert drain(queue) == ["schema", "record-3"]
+    finally:
+        queue.close()
@@ -0,0 +1,72 @@
+import base64
+
+import msgpack
+import pytest
+
+from telemetry_encoding import (check_encoding, encode_binary, msgpack_map, packed_schema, record_schema,
+                                sse_data)
+
+MESSAGE = {
+    "mavpackettype": "DISTANCE_SENSOR",
+    "time_boot_ms": 1234,
+    "current_distance": 250,
+    "orientation": 25,
+    "quaternion": [1.0, 0.0, 0.0, 0.0],
+    "signal_quality": 0.5,
+}
+
+
+def unpack_record(record: bytes):
+    """Decode a packed record the way a client does, from its schema description"""
+    schema = record_schema(record)
+    values = list(schema.struct.unpack(record))
+    schema_id = values.pop(0)
+    decoded = {}
+    for field in schema.describe()["fields"]:
+        if field["count"]:
+            decoded[field["name"]] = values[:field["count"]]
+            del values[:field["count"]]
+        else:
+            decoded[field["name"]] = values.pop(0)
+    return schema_id, decoded
+
+
+def test_packed_round_trip():
+    record = encode_binary(MESSAGE, "packed")
+    schema_id, decoded = unpack_record(record)
+    assert schema_id == packed_schema(MESSAGE).id
+    # Non-numeric fields are not packed; numbers come back as float64
+    assert decoded == {name: value for name, value in MESSAGE.items() if name != "mavpackettype"}
+
+
+def test_packed_schema_shared_by_layout():
+    schema = packed_schema(MESSAGE)
+    assert packed_schema(dict(MESSAGE, current_distance=300)) is schema
+    assert packed_schema(dict(MESSAGE, quaternion=[1.0, 0.0])) is not schema
+    description = schema.describe("DISTANCE_SENSOR")
+    assert description["message_type"] == "DISTANCE_SENSOR"
+    assert description["size"] == len(encode_binary(MESSAGE, "packed"))
+
+
+def test_msgpack_round_trip():
+    assert msgpack.unpackb(encode_binary(MESSAGE, "msgpack")) == MESSAGE
+
+
+def test_msgpack_map_splices_encoded_values():
+    items = [(f"TYPE_{i}", encode_binary({"value": i}, "msgpack")) for i in range(20)]
+    assert msgpack.unpackb(msgpack_map(items)) == {f"TYPE_{i}": {"value": i} for i in range(20)}
+    assert msgpack.unpackb(msgpack_map([])) == {}
+
+
+def test_sse_data_is_base64():
+    payload = encode_binary(MESSAGE, "msgpack")
+    assert base64.b64decode(sse_data(payload)) == payload
+
+
+def test_check_encoding():
+    for encoding in ("json", "packed", "msgpack"):
+        check_encoding(encoding)
+    with pytest.raises(ValueError):
+        check_encoding("protobuf")
+    with pytest.raises(ValueError):
+        encode_binary(MESSAGE, "json")
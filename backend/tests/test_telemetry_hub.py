@@ -0,0 +1,95 @@
+import asyncio
+from threading import Thread
+
+from telemetry_hub import TelemetryHub
+
+
+def test_publish_wakes_only_subscribers_of_the_type():
+    async def run():
+        hub = TelemetryHub()
+        ahrs, gps, everything = hub.subscribe(["AHRS2"]), hub.subscribe(["GPS"]), hub.subscribe()
+        hub.publish("AHRS2")
+        assert await asyncio.wait_for(ahrs.wait(), 1) == {"AHRS2"}
+        assert await asyncio.wait_for(everything.wait(), 1) == {"AHRS2"}
+        assert gps.poll() == set()
+
+    asyncio.run(run())
+
+
+def test_publishes_before_the_subscriber_runs_coalesce():
+    async def run():
+        hub = TelemetryHub()
+        subscription = hub.subscribe(["AHRS2", "GPS"])
+        for _ in range(3):
+            hub.publish("AHRS2")
+        hub.publish("GPS")
+        assert await asyncio.wait_for(subscription.wait(), 1) == {"AHRS2", "GPS"}
+        # Everything was handed over by the single wakeup
+        assert subscription.poll() == set()
+
+    asyncio.run(run())
+
+
+def test_publish_from_another_thread_wakes_the_loop():
+    async def run():
+        hub = TelemetryHub()
+        subscription = hub.subscribe(["AHRS2"])
+        publisher = Thread(target=hub.publish, args=("AHRS2",))
+        publisher.start()
+        assert await asyncio.wait_for(subscription.wait(), 1) == {"AHRS2"}
+        publisher.join()
+
+    asyncio.run(run())
+
+
+def test_notify_forces_a_resend():
+    async def run():
+        hub = TelemetryHub()
+        subscription = hub.subscribe([])
+        subscription.notify(["AHRS2"])
+        assert await asyncio.wait_for(subscription.wait(), 1) == {"AHRS2"}
+
+    asyncio.run(run())
+
+
+def test_resubscribe_and_close():
+    async def run():
+        hub = TelemetryHub()
+        subscription = hub.subscribe(["AHRS2"])
+        assert hub.subscriber_count("AHRS2") == 1
+
+        hub.resubscribe(subscription, ["GPS"])
+        hub.publish("AHRS2")
+        assert subscription.poll() == set()
+        assert hub.subscriber_count("AHRS2") == 0 and hub.subscriber_count("GPS") == 1
+
+        subscription.close()
+        hub.publish("GPS")
+        assert subscription.poll() == set()
+        assert hub.subscriber_count() == 0
+        # Closing twice is harmless
+        subscription.close()
+
+    asyncio.run(run())
+
+
+def test_publish_after_the_loop_closed_is_ignored():
+    hub = TelemetryHub()
+
+    async def run():
+        return hub.subscribe(["AHRS2"])
+
+    subscription = asyncio.run(run())
+    errors = []
+
+    def publish():
+        try:
+            hub.publish("AHRS2")
+        except Exception as e:
+            errors.append(e)
+
+    publisher = Thread(target=publish)
+    publisher.start()
+    publisher.join()
+    assert errors == []
+    assert subscription.poll() == {"AHRS2"}
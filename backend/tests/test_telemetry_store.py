@@ -0,0 +1,104 @@
+from field_projection import compile_projection
+from telemetry_store import TelemetryStore
+
+
+class Decoded:
+    """Stands in for a pymavlink message: the dict is built on demand"""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.calls = 0
+
+    def to_dict(self):
+        self.calls += 1
+        return dict(self.fields)
+
+
+def test_every_write_takes_the_next_version():
+    store = TelemetryStore()
+    assert store.version("AHRS2") == 0
+    first = store.update("AHRS2", {"roll": 0.1})
+    second = store.update("GPS", {"lat": 1.0})
+    third = store.update("AHRS2", {"roll": 0.2})
+    assert first < second < third == store.sequence
+    assert store.version("AHRS2") == third
+    assert store["AHRS2"] == {"roll": 0.2}
+    assert store.get_entry("AHRS2").count == 2
+
+
+def test_changed_since():
+    store = TelemetryStore()
+    version = store.update("AHRS2", {"roll": 0.1})
+    assert not store.changed_since("AHRS2", version)
+    store.update("GPS", {"lat": 1.0})
+    assert not store.changed_since("AHRS2", version)
+    store.update("AHRS2", {"roll": 0.2})
+    assert store.changed_since("AHRS2", version)
+    assert not store.changed_since("NEVER_SEEN", 0)
+
+
+def test_clear_keeps_versions_monotonic():
+    store = TelemetryStore()
+    before = store.update("AHRS2", {"roll": 0.1})
+    store.clear()
+    assert len(store) == 0 and store.version("AHRS2") == 0
+    after = store.update("AHRS2", {"roll": 0.2})
+    assert after > before
+    # Write counts start over
+    assert store.get_entry("AHRS2").count == 1
+
+
+def test_decoded_messages_are_converted_once_on_first_read():
+    store = TelemetryStore()
+    message = Decoded(roll=0.1)
+    store.update("AHRS2", message)
+    assert message.calls == 0
+    entry = store.get_entry("AHRS2")
+    assert entry.payload() == '{"roll": 0.1}'
+    assert entry.data == {"roll": 0.1}
+    assert message.calls == 1
+
+
+def test_entries_cache_their_encodings_and_views():
+    store = TelemetryStore()
+    store.update("AHRS2", {"roll": 0.1, "pitch": 0.2})
+    entry = store.get_entry("AHRS2")
+    assert entry.sse_frame() is entry.sse_frame()
+    projection = compile_projection("roll")
+    view = entry.project(projection)
+    assert view is entry.project(projection)
+    assert view.version == entry.version and view.data == {"roll": 0.1}
+    assert entry.project(None) is entry
+
+    # A new write replaces the entry rather than mutating it
+    store.update("AHRS2", {"roll": 0.3, "pitch": 0.2})
+    assert entry.data == {"roll": 0.1, "pitch": 0.2}
+    assert store.get_entry("AHRS2") is not entry
+
+
+def test_alias_shares_the_entry():
+    store = TelemetryStore()
+    store.update("AHRS2@1.1", {"roll": 0.1})
+    store.alias("AHRS2", "AHRS2@1.1")
+    assert store.get_entry("AHRS2") is store.get_entry("AHRS2@1.1")
+    # Aliasing a key without an entry does nothing
+    store.alias("GPS", "GPS@1.1")
+    assert "GPS" not in store
+
+
+def test_rebind_restamps_the_alias_or_drops_it():
+    store = TelemetryStore()
+    store.update("AHRS2@1.1", {"roll": 0.1})
+    store.update("AHRS2@2.1", {"roll": 0.2})
+    store.alias("AHRS2", "AHRS2@1.1")
+    old = store.version("AHRS2")
+
+    assert store.rebind("AHRS2", "AHRS2@2.1")
+    assert store["AHRS2"] == {"roll": 0.2}
+    # A new version, so streams on the alias resend it
+    assert store.version("AHRS2") == store.sequence > old
+    assert store.version("AHRS2@2.1") < store.version("AHRS2")
+
+    assert store.rebind("AHRS2", "AHRS2@3.1")
+    assert "AHRS2" not in store
+    assert not store.rebind("AHRS2", None)
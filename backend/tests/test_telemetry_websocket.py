@@ -0,0 +1,127 @@
+import json
+import time
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+from app import app
+from telemetry_ingest import clear_telemetry, ingest
+from subscriber_queue import subscriber_queues
+from telemetry_metrics import enqueue_to_send, events_sent
+
+
+@pytest.fixture
+def client():
+    # Without the context manager startup does not run, so no source feeds the store
+    clear_telemetry()
+    yield TestClient(app)
+    clear_telemetry()
+
+
+@contextmanager
+def connect(client, path="/ws"):
+    """
+    A WebSocket session that is left only once the server side has ended.
+    The test client cancels the endpoint right after the disconnect, which
+    fails the test when the session has not finished by then.
+    """
+    with client.websocket_connect(path) as websocket:
+        try:
+            yield websocket
+        finally:
+            websocket.close()
+            deadline = time.monotonic() + 5
+            while any(queue.stream == "/ws" for queue in subscriber_queues()):
+                assert time.monotonic() < deadline, "WebSocket session did not end"
+                time.sleep(0.01)
+
+
+def request(websocket, **message):
+    websocket.send_text(json.dumps(message))
+    return websocket.receive_json()
+
+
+def test_subscribe_sends_the_current_value(client):
+    ingest("AHRS2", {"roll": 0.1, "pitch": 0.2}, 1, 1)
+    with connect(client) as websocket:
+        ack = request(websocket, op="subscribe", types=["AHRS2"], fields="roll")
+        assert ack == {"type": "ack", "op": "subscribe", "subscribed": ["AHRS2"]}
+        message = websocket.receive_json()
+        assert message["type"] == "message" and message["message_type"] == "AHRS2"
+        assert message["data"] == {"roll": 0.1}
+
+        # A snapshot resends the same version
+        assert request(websocket, op="snapshot")["op"] == "snapshot"
+        assert websocket.receive_json() == message
+
+
+def test_types_on_connect_subscribe(client):
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    with connect(client, "/ws?types=AHRS2") as websocket:
+        assert websocket.receive_json()["subscribed"] == ["AHRS2"]
+        assert websocket.receive_json()["data"]["roll"] == 0.1
+
+
+def test_unsubscribe_and_status(client):
+    with connect(client) as websocket:
+        assert request(websocket, op="subscribe", types="AHRS2,GPS")["subscribed"] == ["AHRS2", "GPS"]
+        assert request(websocket, op="unsubscribe", types=["GPS"])["subscribed"] == ["AHRS2"]
+        assert request(websocket, op="unsubscribe")["subscribed"] == []
+        status = request(websocket, op="status")
+        assert status["type"] == "status" and status["subscribed"] == []
+
+
+def test_subscribe_to_another_vehicle(client):
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    ingest("AHRS2", {"roll": 0.2}, 2, 1)
+    with connect(client) as websocket:
+        assert request(websocket, op="subscribe", types=["AHRS2"], system_id=2, component_id=1)["subscribed"] == ["AHRS2@2.1"]
+        message = websocket.receive_json()
+        assert message["message_type"] == "AHRS2@2.1" and message["data"]["roll"] == 0.2
+
+
+@pytest.mark.parametrize("message, error", [
+    ({"op": "subscribe", "types": ["NOT_A_TYPE"]}, "Unsupported message type"),
+    ({"op": "subscribe", "types": []}, "No message types given"),
+    ({"op": "subscribe", "types": ["AHRS2"], "hz": -1}, "hz"),
+    ({"op": "subscribe", "types": ["AHRS2"], "system_id": "2"}, "must be integers"),
+    ({"op": "set_rate", "types": ["AHRS2"], "hz": 1}, "Not subscribed"),
+    ({"op": "launch"}, "Unknown op"),
+])
+def test_invalid_requests_are_answered_with_an_error(client, message, error):
+    with connect(client) as websocket:
+        reply = request(websocket, **message)
+        assert reply["type"] == "error" and error in reply["message"]
+        # The session keeps serving after an error
+        assert request(websocket, op="status")["type"] == "status"
+
+
+def test_non_object_control_messages_are_rejected(client):
+    with connect(client) as websocket:
+        websocket.send_text("[1, 2]")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_text("not json")
+        assert websocket.receive_json()["type"] == "error"
+
+
+def test_set_rate_changes_the_policy(client):
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    with connect(client) as websocket:
+        request(websocket, op="subscribe", types=["AHRS2"])
+        websocket.receive_json()
+        assert request(websocket, op="set_rate", hz=1, policy="nth", n=2)["op"] == "set_rate"
+        reply = request(websocket, op="set_rate", hz=1, policy="sometimes")
+        assert reply["type"] == "error"
+
+
+def test_queue_and_sent_metrics_share_one_stream_label(client):
+    sent_before = events_sent.totals().get("/ws", 0)
+    waits_before = enqueue_to_send.totals().get("/ws", ([], 0.0, 0))[2]
+    with connect(client) as websocket:
+        request(websocket, op="status")
+    assert events_sent.totals().get("/ws", 0) == sent_before + 1
+    assert enqueue_to_send.totals()["/ws"][2] == waits_before + 1
+    assert "ws" not in events_sent.totals() and "ws" not in enqueue_to_send.totals()
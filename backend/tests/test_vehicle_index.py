@@ -0,0 +1,68 @@
+import pytest
+
+from stream_decimation import StreamDecimator
+from telemetry_history import telemetry_history
+from telemetry_ingest import clear_telemetry, ingest, set_primary_vehicle
+from telemetry_store import telemetry_store
+from vehicle_index import vehicle_index
+
+
+@pytest.fixture(autouse=True)
+def clean_telemetry():
+    clear_telemetry()
+    yield
+    clear_telemetry()
+
+
+def test_primary_is_also_shown_under_plain_keys():
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    ingest("AHRS2", {"roll": 0.2}, 2, 1)
+    assert vehicle_index.primary == (1, 1)
+    assert telemetry_store.get("AHRS2") == {"roll": 0.1}
+    assert telemetry_store.get("AHRS2@1.1") == {"roll": 0.1}
+    assert telemetry_store.get("AHRS2@2.1") == {"roll": 0.2}
+    # The alias is the same entry, so encodings are built once
+    assert telemetry_store.get_entry("AHRS2") is telemetry_store.get_entry("AHRS2@1.1")
+
+
+def test_vehicle_key_does_not_depend_on_the_primary():
+    # A stream naming a vehicle before anything was heard keeps its key
+    key = vehicle_index.resolve("AHRS2", 1)
+    assert key == "AHRS2@1.1"
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    assert telemetry_store.get(key) == {"roll": 0.1}
+    assert vehicle_index.resolve("AHRS2") == "AHRS2"
+
+
+def test_set_primary_repoints_and_drops_plain_keys():
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    ingest("GPS", {"lat": 1.0}, 1, 1)
+    ingest("AHRS2", {"roll": 0.2}, 2, 1)
+    version = telemetry_store.version("AHRS2")
+
+    set_primary_vehicle(2, 1)
+    assert telemetry_store.get("AHRS2") == {"roll": 0.2}
+    # A new version, so streams on the plain key send it
+    assert telemetry_store.version("AHRS2") > version
+    # Vehicle 2 never sent GPS; the plain key no longer shows vehicle 1's
+    assert "GPS" not in telemetry_store
+    assert telemetry_store.get("GPS@1.1") == {"lat": 1.0}
+
+
+def test_history_is_kept_per_vehicle():
+    ingest("AHRS2", {"roll": 0.1}, 1, 1)
+    ingest("AHRS2", {"roll": 0.2}, 2, 1)
+    assert telemetry_history.query("AHRS2") is None
+    assert telemetry_history.query(vehicle_index.resolve_vehicle("AHRS2"))["fields"]["roll"] == [0.1]
+    assert telemetry_history.query(vehicle_index.resolve_vehicle("AHRS2", 2))["fields"]["roll"] == [0.2]
+
+
+@pytest.mark.parametrize("store_key", ["AHRS2", "AHRS2@1.1"])
+def test_aggregate_on_plain_and_vehicle_keys(store_key):
+    decimator = StreamDecimator(hz=1, policy="aggregate")
+    for roll in (0.1, 0.3, 0.2):
+        ingest("AHRS2", {"roll": roll}, 1, 1)
+    selected = decimator.select(store_key, telemetry_store.get_entry(store_key))
+    assert selected.data["roll"] == 0.2
+    assert selected.data["aggregate"]["samples"] == 3
+    assert selected.data["aggregate"]["max"] == {"roll": 0.3}
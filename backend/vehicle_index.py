@@ -0,0 +1,164 @@
+"""
+Vehicle Index
+Vehicles (MAVLink system/component pairs) heard on the active source and the store keys of their messages
+"""
+
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+# Component assumed when a request names only a system (MAV_COMP_ID_AUTOPILOT1)
+DEFAULT_COMPONENT_ID = 1
+
+VehicleId = Tuple[int, int]
+
+
+def vehicle_key(message_type: str, system_id: int, component_id: int) -> str:
+    """Store key of a message type from one vehicle, e.g. AHRS2@2.1"""
+    return f"{message_type}@{system_id}.{component_id}"
+
+
+class Vehicle:
+    """Counters of one system/component and the store keys its message types map to"""
+
+    __slots__ = ("system_id", "component_id", "first_seen", "last_seen", "message_count", "keys")
+
+    def __init__(self, system_id: int, component_id: int):
+        self.system_id = system_id
+        self.component_id = component_id
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+        self.message_count = 0
+        # message type -> per-vehicle store key, built once per type
+        self.keys: Dict[str, str] = {}
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            "system_id": self.system_id,
+            "component_id": self.component_id,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "message_count": self.message_count,
+            "message_types": sorted(self.keys)
+        }
+
+
+class VehicleIndex:
+    """
+    Maps (system_id, component_id, type) to the store key a message is kept under.
+
+    Every vehicle's messages are kept under TYPE@system.component keys, so a
+    second airframe or a companion computer on the same link no longer
+    overwrites the first, and a stream that names a vehicle keeps its key
+    whichever vehicle is primary. The primary vehicle (the one the source
+    connected to, or else the first one heard) is also shown under plain
+    keys such as AHRS2, so the existing streams, the 3D plot and the REST
+    endpoints follow it unchanged; set_primary_vehicle() in telemetry_ingest
+    repoints them. A stream subscribes to one key per type, so its cost does
+    not depend on how many vehicles are on the link.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._vehicles: Dict[VehicleId, Vehicle] = {}
+        self._primary: Optional[VehicleId] = None
+
+    @property
+    def primary(self) -> Optional[VehicleId]:
+        return self._primary
+
+    def set_primary(self, system_id: int, component_id: int):
+        """Make a vehicle the one whose messages are also shown under plain store keys"""
+        with self._lock:
+            self._primary = (system_id, component_id)
+
+    def record(self, message_type: str, system_id: Optional[int] = None,
+               component_id: Optional[int] = None) -> Tuple[str, Optional[str]]:
+        """
+        Count a message and return the store keys it is kept under
+
+        Args:
+            message_type: Message type or per-type key (e.g. DISTANCE_SENSOR_D0)
+            system_id: Sending system, or None for the primary vehicle
+            component_id: Sending component
+
+        Returns:
+            Tuple[str, Optional[str]]: Per-vehicle key, and the plain key it is
+                also shown under when the message is from the primary vehicle
+        """
+        ids = (system_id, component_id) if system_id is not None else self._primary
+        if ids is None:
+            # Nothing has named a vehicle yet
+            return message_type, None
+        vehicle = self._vehicles.get(ids)
+        if vehicle is None:
+            with self._lock:
+                vehicle = self._vehicles.get(ids)
+                if vehicle is None:
+                    if self._primary is None:
+                        self._primary = ids
+                    vehicle = self._vehicles[ids] = Vehicle(*ids)
+        vehicle.message_count += 1
+        vehicle.last_seen = time.time()
+        key = vehicle.keys.get(message_type)
+        if key is None:
+            key = vehicle.keys[message_type] = vehicle_key(message_type, *ids)
+        return key, message_type if ids == self._primary else None
+
+    def resolve(self, message_type: str, system_id: Optional[int] = None,
+                component_id: Optional[int] = None) -> str:
+        """
+        Store key of a type for a vehicle, or its plain key when system_id is
+        None, which follows whichever vehicle is primary
+        """
+        if system_id is None:
+            return message_type
+        return vehicle_key(message_type, system_id, component_id if component_id is not None else DEFAULT_COMPONENT_ID)
+
+    def resolve_vehicle(self, message_type: str, system_id: Optional[int] = None,
+                        component_id: Optional[int] = None) -> str:
+        """Per-vehicle store key of a type, the current primary vehicle's when system_id is None"""
+        if system_id is None:
+            if self._primary is None:
+                return message_type
+            system_id, component_id = self._primary
+        return self.resolve(message_type, system_id, component_id)
+
+    def vehicle_store_key(self, store_key: str) -> str:
+        """Per-vehicle key behind a store key: the primary's for a plain key, else the key itself"""
+        if self._primary is None or "@" in store_key:
+            return store_key
+        return vehicle_key(store_key, *self._primary)
+
+    def aliases(self, ids: Optional[VehicleId]) -> Dict[str, str]:
+        """Plain key -> per-vehicle key of every type heard from a vehicle"""
+        vehicle = self._vehicles.get(ids) if ids is not None else None
+        return dict(vehicle.keys) if vehicle is not None else {}
+
+    def get(self, system_id: int, component_id: Optional[int] = None) -> Optional[Vehicle]:
+        return self._vehicles.get((system_id, component_id if component_id is not None else DEFAULT_COMPONENT_ID))
+
+    def vehicles(self) -> List[Dict[str, Any]]:
+        """Info of every vehicle heard, primary first"""
+        with self._lock:
+            vehicles = list(self._vehicles.values())
+        infos = []
+        for vehicle in sorted(vehicles, key=lambda v: ((v.system_id, v.component_id) != self._primary,
+                                                       v.system_id, v.component_id)):
+            info = vehicle.get_info()
+            info["primary"] = (vehicle.system_id, vehicle.component_id) == self._primary
+            infos.append(info)
+        return infos
+
+    def clear(self):
+        """Forget every vehicle, e.g. when switching sources"""
+        with self._lock:
+            self._vehicles = {}
+            self._primary = None
+
+    def __len__(self) -> int:
+        return len(self._vehicles)
+
+
+# Global instance shared by the ingest path and the API
+vehicle_index = VehicleIndex()
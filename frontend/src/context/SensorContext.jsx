@@ -8,6 +8,9 @@ import React, {
 
 const SensorContext = createContext(null);
 
+// Number of points kept per lidar by the backend 3D plot buffer
+const THREE_D_PLOT_CAPACITY = 100;
+
 export const useSensorData = () => {
   const context = useContext(SensorContext);
   if (!context) {
@@ -75,86 +78,37 @@ export const SensorProvider = ({ children }) => {
 
     const sources = {};
 
-    // Battery status stream
-    sources.battery = new EventSource(
-      "http://localhost:8000/stream/BATTERY_STATUS"
-    );
-    sources.battery.onmessage = (event) => {
-      console.log("Battery data received:", event.data);
-      const data = JSON.parse(event.data);
-      setSensorData((prev) => ({
-        ...prev,
-        voltages: data.voltages,
-      }));
-    };
-    sources.battery.onopen = () => console.log("Battery stream connected");
-    sources.battery.onerror = (error) =>
-      console.log("Battery stream error:", error);
-
-    // EKF status stream
-    sources.ekf = new EventSource(
-      "http://localhost:8000/stream/EKF_STATUS_REPORT"
-    );
-    sources.ekf.onmessage = (event) => {
-      console.log("EKF data received:", event.data);
-      const data = JSON.parse(event.data);
-      setSensorData((prev) => ({
-        ...prev,
-        EKF_STATUS_REPORTS: { flags: data.flags },
-      }));
-    };
-    sources.ekf.onopen = () => console.log("EKF stream connected");
-    sources.ekf.onerror = (error) => console.log("EKF stream error:", error);
+    // Backfill the distance charts from the server-side history window
+    const historyUrl = (messageType) =>
+      `http://localhost:8000/history/${messageType}?fields=current_distance&since=-${timeWindow}`;
+    Promise.all([
+      fetch(historyUrl("DISTANCE_SENSOR_D0")).then((response) => response.json()),
+      fetch(historyUrl("DISTANCE_SENSOR_D1")).then((response) => response.json()),
+    ])
+      .then(([d0, d1]) => {
+        if (d0.status !== "success" || d1.status !== "success") {
+          return;
+        }
+        // The sensors are sampled independently: merge both onto one timeline,
+        // with null where a sensor has no sample at that time
+        const samples = [
+          ...d0.timestamps.map((t, i) => [t, d0.fields.current_distance[i], null]),
+          ...d1.timestamps.map((t, i) => [t, null, d1.fields.current_distance[i]]),
+        ].sort((a, b) => a[0] - b[0]);
+        setHistoricalData((prev) => ({
+          timestamps: samples.map(([t]) => t * 1000),
+          values: {
+            ...prev.values,
+            D0: samples.map(([, d0Value]) => d0Value),
+            D1: samples.map(([, , d1Value]) => d1Value),
+          },
+        }));
+      })
+      .catch((error) => console.log("History backfill failed:", error));
 
-    // Vision position estimate stream
-    sources.visionPosition = new EventSource(
-      "http://localhost:8000/stream/VISION_POSITION_ESTIMATE"
-    );
-    sources.visionPosition.onmessage = (event) => {
-      console.log("Vision position data received:", event.data);
-      const data = JSON.parse(event.data);
-      setSensorData((prev) => ({
-        ...prev,
-        VISION_POSITION_ESTIMATE: { x: data.x, y: data.y, z: data.z },
-      }));
-    };
-    sources.visionPosition.onopen = () =>
-      console.log("Vision position stream connected");
-    sources.visionPosition.onerror = (error) =>
-      console.log("Vision position stream error:", error);
-
-    // Vision speed estimate stream
-    sources.visionSpeed = new EventSource(
-      "http://localhost:8000/stream/VISION_SPEED_ESTIMATE"
-    );
-    sources.visionSpeed.onmessage = (event) => {
-      console.log("Vision speed data received:", event.data);
-      const data = JSON.parse(event.data);
-      setSensorData((prev) => ({
-        ...prev,
-        VISION_SPEED_ESTIMATE: { x: data.x, y: data.y },
-      }));
-    };
-    sources.visionSpeed.onopen = () =>
-      console.log("Vision speed stream connected");
-    sources.visionSpeed.onerror = (error) =>
-      console.log("Vision speed stream error:", error);
-
-    // Distance sensor D0 stream
-    sources.distance0 = new EventSource(
-      "http://localhost:8000/stream/distance_sensor/0"
-    );
-    sources.distance0.onmessage = (event) => {
-      console.log("Distance D0 data received:", event.data);
-      const data = JSON.parse(event.data);
+    // Append a distance reading to the rolling history window
+    const appendDistanceHistory = (key, distance) => {
       const timestamp = Date.now();
-
-      setSensorData((prev) => ({
-        ...prev,
-        D0: data.current_distance,
-      }));
-
-      // Update historical data
       setHistoricalData((prev) => {
         const newTimestamps = [...prev.timestamps, timestamp];
         const newValues = { ...prev.values };
@@ -164,9 +118,9 @@ export const SensorProvider = ({ children }) => {
           .filter(({ t }) => t >= cutoffTime)
           .map(({ i }) => i);
 
-        newValues.D0 = [
-          ...prev.values.D0.filter((_, i) => validIndices.includes(i)),
-          data.current_distance,
+        newValues[key] = [
+          ...prev.values[key].filter((_, i) => validIndices.includes(i)),
+          distance,
         ];
 
         return {
@@ -175,52 +129,69 @@ export const SensorProvider = ({ children }) => {
         };
       });
     };
-    sources.distance0.onopen = () =>
-      console.log("Distance D0 stream connected");
-    sources.distance0.onerror = (error) =>
-      console.log("Distance D0 stream error:", error);
-
-    // Distance sensor D1 stream
-    sources.distance1 = new EventSource(
-      "http://localhost:8000/stream/distance_sensor/1"
-    );
-    sources.distance1.onmessage = (event) => {
-      console.log("Distance D1 data received:", event.data);
-      const data = JSON.parse(event.data);
-      const timestamp = Date.now();
-
-      setSensorData((prev) => ({
-        ...prev,
-        D1: data.current_distance,
-      }));
-
-      // Update historical data
-      setHistoricalData((prev) => {
-        const newTimestamps = [...prev.timestamps, timestamp];
-        const newValues = { ...prev.values };
-        const cutoffTime = timestamp - timeWindow * 1000;
-        const validIndices = newTimestamps
-          .map((t, i) => ({ t, i }))
-          .filter(({ t }) => t >= cutoffTime)
-          .map(({ i }) => i);
 
-        newValues.D1 = [
-          ...prev.values.D1.filter((_, i) => validIndices.includes(i)),
-          data.current_distance,
-        ];
+    // Handlers for each message type carried by the multiplexed stream
+    const handlers = {
+      BATTERY_STATUS: (data) =>
+        setSensorData((prev) => ({
+          ...prev,
+          voltages: data.voltages,
+        })),
+      EKF_STATUS_REPORT: (data) =>
+        setSensorData((prev) => ({
+          ...prev,
+          EKF_STATUS_REPORTS: { flags: data.flags },
+        })),
+      VISION_POSITION_ESTIMATE: (data) =>
+        setSensorData((prev) => ({
+          ...prev,
+          VISION_POSITION_ESTIMATE: { x: data.x, y: data.y, z: data.z },
+        })),
+      VISION_SPEED_ESTIMATE: (data) =>
+        setSensorData((prev) => ({
+          ...prev,
+          VISION_SPEED_ESTIMATE: { x: data.x, y: data.y },
+        })),
+      DISTANCE_SENSOR_D0: (data) => {
+        setSensorData((prev) => ({
+          ...prev,
+          D0: data.current_distance,
+        }));
+        appendDistanceHistory("D0", data.current_distance);
+      },
+      DISTANCE_SENSOR_D1: (data) => {
+        setSensorData((prev) => ({
+          ...prev,
+          D1: data.current_distance,
+        }));
+        appendDistanceHistory("D1", data.current_distance);
+      },
+      AHRS2: (data) =>
+        setSensorData((prev) => ({
+          ...prev,
+          AHRS2: { roll: data.roll, pitch: data.pitch, yaw: data.yaw },
+        })),
+    };
 
-        return {
-          timestamps: newTimestamps.filter((_, i) => validIndices.includes(i)),
-          values: newValues,
-        };
+    // One connection for all telemetry; each frame batches every type that
+    // changed since the previous frame, keyed by message type
+    sources.telemetry = new EventSource(
+      `http://localhost:8000/stream/all?types=${Object.keys(handlers).join(",")}`
+    );
+    sources.telemetry.onmessage = (event) => {
+      const batch = JSON.parse(event.data);
+      Object.entries(batch).forEach(([messageType, data]) => {
+        const handler = handlers[messageType];
+        if (handler) {
+          handler(data);
+        }
       });
     };
-    sources.distance1.onopen = () =>
-      console.log("Distance D1 stream connected");
-    sources.distance1.onerror = (error) =>
-      console.log("Distance D1 stream error:", error);
+    sources.telemetry.onopen = () => console.log("Telemetry stream connected");
+    sources.telemetry.onerror = (error) =>
+      console.log("Telemetry stream error:", error);
 
-    // 3D plot data stream (accumulated data)
+    // 3D plot data stream: a full snapshot on connect/reset, then deltas
     sources.threeDPlot = new EventSource(
       "http://localhost:8000/stream/3d_plot"
     );
@@ -233,26 +204,28 @@ export const SensorProvider = ({ children }) => {
         threeDPlotData: data,
       }));
     };
+    sources.threeDPlot.addEventListener("delta", (event) => {
+      const delta = JSON.parse(event.data);
+      // Append only the new points, keeping the same window as the backend
+      setSensorData((prev) => {
+        const current = prev.threeDPlotData || { lidar_0: [], lidar_1: [] };
+        return {
+          ...prev,
+          threeDPlotData: {
+            lidar_0: [...current.lidar_0, ...delta.lidar_0].slice(
+              -THREE_D_PLOT_CAPACITY
+            ),
+            lidar_1: [...current.lidar_1, ...delta.lidar_1].slice(
+              -THREE_D_PLOT_CAPACITY
+            ),
+          },
+        };
+      });
+    });
     sources.threeDPlot.onopen = () => console.log("3D plot stream connected");
     sources.threeDPlot.onerror = (error) =>
       console.log("3D plot stream error:", error);
 
-    // AHRS2 stream for roll, pitch, yaw
-    sources.ahrs2 = new EventSource("http://localhost:8000/stream/AHRS2");
-    sources.ahrs2.onmessage = (event) => {
-      console.log("AHRS2 data received:", event.data);
-      const data = JSON.parse(event.data);
-      setSensorData((prev) => ({
-        ...prev,
-        AHRS2: { roll: data.roll, pitch: data.pitch, yaw: data.yaw },
-      }));
-    };
-    sources.ahrs2.onopen = () => console.log("AHRS2 stream connected");
-    sources.ahrs2.onerror = (error) => {
-      console.log("AHRS2 stream error:", error);
-      console.log("AHRS2 readyState:", sources.ahrs2.readyState);
-    };
-
     setEventSources(sources);
   }, [timeWindow]);
 